@@ -0,0 +1,117 @@
+"""
+Benchmark of the statements of the hot SQLAlchemy adapter lookups.
+
+Compares the lookups with their statements cached per adapter class to the same lookups
+building a new statement on every call, against an in-memory SQLite database.
+Run it with `python benchmarks/adapter_statements.py`.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+
+from filuta_fastapi_users.filuta_uds import SQLAlchemyBaseUserTableUUID, SQLAlchemyUserDatabase
+from filuta_fastapi_users.filuta_uds.access_token import (
+    SQLAlchemyAccessTokenDatabase,
+    SQLAlchemyBaseAccessTokenTableUUID,
+)
+
+ITERATIONS = 5_000
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class User(SQLAlchemyBaseUserTableUUID, Base):
+    pass
+
+
+class AccessToken(SQLAlchemyBaseAccessTokenTableUUID, Base):
+    pass
+
+
+async def measure(lookup: Callable[[], Awaitable[Any]]) -> float:
+    """Mean duration of a lookup, in microseconds."""
+    await lookup()
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await lookup()
+    return (time.perf_counter() - start) / ITERATIONS * 1e6
+
+
+def build_statements(user_id: Any, max_age: datetime) -> tuple[Any, Any]:
+    """The lookups statements, as built on every call before they were cached."""
+    get_by_token = (
+        select(AccessToken)
+        .where(AccessToken.token == "TOKEN")
+        .where(AccessToken.created_at >= max_age)
+        .where(AccessToken.scopes == "approved")
+    )
+    get = select(User).where(User.id == user_id)
+    return get_by_token, get
+
+
+async def run(session: AsyncSession) -> None:
+    user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(session, User)
+    access_token_db: SQLAlchemyAccessTokenDatabase[AccessToken] = SQLAlchemyAccessTokenDatabase(session, AccessToken)
+    user = await user_db.create({"email": "king.arthur@camelot.bt", "hashed_password": "guinevere"})
+    user_id = user.id
+    await access_token_db.create(
+        {"token": "TOKEN", "user_id": user_id, "scopes": "approved", "mfa_scopes": {"email": 0}}
+    )
+    max_age = datetime.now(UTC) - timedelta(hours=1)
+
+    async def uncached_get_by_token() -> Any:
+        statement, _ = build_statements(user_id, max_age)
+        return (await session.execute(statement)).scalar_one_or_none()
+
+    async def uncached_get() -> Any:
+        _, statement = build_statements(user_id, max_age)
+        return (await session.execute(statement)).unique().scalar_one_or_none()
+
+    def build_and_key() -> None:
+        for statement in build_statements(user_id, max_age):
+            statement._generate_cache_key()
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        build_and_key()
+    overhead = (time.perf_counter() - start) / ITERATIONS * 1e6
+    print(f"Statements build and cache key, saved per get_by_token + get: {overhead:6.1f} µs")
+
+    for name, cached, uncached in [
+        (
+            "get_by_token",
+            lambda: access_token_db.get_by_token("TOKEN", max_age, authorized=True),
+            uncached_get_by_token,
+        ),
+        ("get", lambda: user_db.get(user_id), uncached_get),
+    ]:
+        cached_time = await measure(cached)
+        uncached_time = await measure(uncached)
+        print(
+            f"{name:>12}: {uncached_time:6.1f} µs rebuilt, {cached_time:6.1f} µs cached "
+            f"({uncached_time - cached_time:+5.1f} µs saved)"
+        )
+
+
+async def main() -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with async_sessionmaker(engine)() as session:
+        await run(session)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
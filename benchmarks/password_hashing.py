@@ -0,0 +1,84 @@
+"""
+Benchmark of the `PasswordHelper` executors.
+
+Measures the startup time of each executor, then the latency and throughput of concurrent
+password verifications, like a burst of logins. Run it with `python benchmarks/password_hashing.py`.
+
+Subinterpreters aren't benchmarked: the hashers are built with cffi (argon2-cffi) and PyO3 (bcrypt),
+whose extension modules can't be imported in isolated subinterpreters. The benchmark checks it again
+on Python 3.14 and later, and reports the import error.
+"""
+
+import asyncio
+import statistics
+import time
+from typing import get_args
+
+from pwdlib.hashers.argon2 import Argon2Hasher
+from pwdlib.hashers.bcrypt import BcryptHasher
+
+from filuta_fastapi_users.password import ExecutorKind, PasswordHelper
+
+CONCURRENCY = 32
+ROUNDS = 5
+PASSWORD = "benchmark-password"  # nosec B105
+
+
+async def verify(password_helper: PasswordHelper, hashed_password: str) -> float:
+    start = time.perf_counter()
+    await password_helper.verify_and_update_async(PASSWORD, hashed_password)
+    return time.perf_counter() - start
+
+
+def check_subinterpreters() -> None:
+    try:
+        from concurrent import interpreters  # noqa: PLC0415  # Python 3.14+
+    except ImportError:
+        print("subinterpreters: not available before Python 3.14")
+        return
+
+    for hasher in (Argon2Hasher, BcryptHasher):
+        interpreter = interpreters.create()
+        try:
+            interpreter.exec(f"import {hasher.__module__}")
+        except interpreters.ExecutionFailed as e:
+            print(f"subinterpreters: {hasher.__name__} can't be imported: {e}")
+        else:
+            print(f"subinterpreters: {hasher.__name__} can be imported")
+        finally:
+            interpreter.close()
+
+
+async def run(kind: ExecutorKind) -> None:
+    password_helper = PasswordHelper(executor=kind)
+    hashed_password = password_helper.hash(PASSWORD)
+
+    start = time.perf_counter()
+    # The first operation starts the workers
+    await password_helper.verify_and_update_async(PASSWORD, hashed_password)
+    startup = time.perf_counter() - start
+
+    latencies: list[float] = []
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        latencies += await asyncio.gather(*(verify(password_helper, hashed_password) for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{kind:>7}: startup {startup * 1e3:7.1f} ms, "
+        f"p50 {statistics.median(latencies) * 1e3:7.1f} ms, "
+        f"p99 {statistics.quantiles(latencies, n=100)[98] * 1e3:7.1f} ms, "
+        f"{len(latencies) / elapsed:6.1f} verifications/s"
+    )
+    PasswordHelper.shutdown_executors()
+
+
+async def main() -> None:
+    print(f"{PasswordHelper().max_workers} workers, {CONCURRENCY} concurrent verifications")
+    for kind in get_args(ExecutorKind):
+        await run(kind)
+    check_subinterpreters()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,5 +1,6 @@
 from filuta_fastapi_users.authentication.authenticator import Authenticator
 from filuta_fastapi_users.authentication.backend import AuthenticationBackend
+from filuta_fastapi_users.authentication.principal import Principal, PrincipalCache
 from filuta_fastapi_users.authentication.refresh_token.refresh_token_manager import (
     RefreshTokenManager,
     RefreshTokenManagerDependency,
@@ -7,13 +8,19 @@ from filuta_fastapi_users.authentication.refresh_token.refresh_token_manager imp
 from filuta_fastapi_users.authentication.strategy.base import (
     Strategy,
     StrategyDestroyNotSupportedError,
+    StrategyTokenNotFoundError,
 )
 from filuta_fastapi_users.authentication.strategy.db.adapter import (
     AccessTokenDatabase,
+    JoinedAccessTokenDatabase,
     OtpTokenDatabase,
     RefreshTokenDatabase,
+    RevokedTokenDatabase,
 )
+from filuta_fastapi_users.authentication.strategy.db.cache import AccessTokenCache, NegativeTokenCache
 from filuta_fastapi_users.authentication.strategy.db.strategy import DatabaseStrategy
+from filuta_fastapi_users.authentication.strategy.jwt import JWTAccessToken, JWTStrategy
+from filuta_fastapi_users.authentication.strategy.revocation import RevocationList
 from filuta_fastapi_users.authentication.transport.base import (
     Transport,
     TransportLogoutNotSupportedError,
@@ -21,17 +28,27 @@ from filuta_fastapi_users.authentication.transport.base import (
 from filuta_fastapi_users.authentication.transport.bearer import BearerTransport
 
 __all__ = [
+    "AccessTokenCache",
     "Authenticator",
     "AuthenticationBackend",
     "AccessTokenDatabase",
     "BearerTransport",
     "DatabaseStrategy",
+    "JoinedAccessTokenDatabase",
+    "JWTAccessToken",
+    "JWTStrategy",
+    "NegativeTokenCache",
     "OtpTokenDatabase",
+    "Principal",
+    "PrincipalCache",
     "RefreshTokenDatabase",
     "RefreshTokenManager",
     "RefreshTokenManagerDependency",
+    "RevocationList",
+    "RevokedTokenDatabase",
     "Strategy",
     "StrategyDestroyNotSupportedError",
+    "StrategyTokenNotFoundError",
     "Transport",
     "TransportLogoutNotSupportedError",
 ]
@@ -1,19 +1,30 @@
+import asyncio
 import re
 from collections.abc import Callable, Sequence
 from inspect import Parameter, Signature
 from typing import Any, cast
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.dependencies.models import Dependant
+from fastapi.dependencies.utils import get_dependant, solve_dependencies
+from fastapi.exceptions import RequestValidationError
 from makefun import with_signature
 
-from filuta_fastapi_users import models
+from filuta_fastapi_users import exceptions, models
 from filuta_fastapi_users.authentication.backend import AuthenticationBackend
+from filuta_fastapi_users.authentication.principal import Principal
 from filuta_fastapi_users.authentication.strategy.base import Strategy
+from filuta_fastapi_users.authentication.strategy.token_tag import get_token_tag
 from filuta_fastapi_users.manager import BaseUserManager, UserManagerDependency
 from filuta_fastapi_users.types import DependencyCallable
 
 INVALID_CHARS_PATTERN = re.compile(r"[^0-9a-zA-Z_]")
 INVALID_LEADING_CHARS_PATTERN = re.compile(r"^[^a-zA-Z_]+")
+REQUEST_STATE_RESULTS = "authenticator_results"
+REQUEST_STATE_DEPENDENCY_CACHE = "authenticator_dependency_cache"
+
+# Resolved token: the user or principal, the token, its record and the strategy which read it
+TokenResult = tuple[Any, str, Any, Any]
 
 
 def name_to_variable_name(name: str) -> str:
@@ -32,6 +43,45 @@ class DuplicateBackendNamesError(Exception):
     pass
 
 
+UserChecks = tuple[tuple[str, int, str], ...]
+
+
+def get_user_checks(active: bool, verified: bool, superuser: bool, poweruser: bool) -> UserChecks:
+    """
+    Compile the user requirements into an ordered list of checks.
+
+    :return: Tuples of the user attribute that must be truthy,
+    and of the status code and detail of the error raised otherwise.
+    """
+    checks: list[tuple[str, int, str]] = []
+    if active:
+        checks.append(("is_active", status.HTTP_401_UNAUTHORIZED, "no-active"))
+    if verified:
+        checks.append(("is_verified", status.HTTP_403_FORBIDDEN, "no-verified"))
+    if superuser:
+        checks.append(("is_superuser", status.HTTP_403_FORBIDDEN, "no-permissions"))
+    if poweruser:
+        checks.append(("is_poweruser", status.HTTP_403_FORBIDDEN, "no-permissions"))
+    return tuple(checks)
+
+
+def get_strategy_dependant(get_strategy: DependencyCallable[Any]) -> Dependant:
+    """Build a standalone dependant resolving a strategy dependency, for `solve_dependencies`."""
+
+    def strategy_dependency(strategy: Any = Depends(get_strategy)) -> Any:
+        return strategy  # pragma: no cover
+
+    return get_dependant(path="", call=strategy_dependency)
+
+
+def _is_accepted(user: Any, access_token: Any, authorized: bool) -> bool:
+    return user is not None and _is_accepted_record(access_token, authorized)
+
+
+def _is_accepted_record(access_token: Any, authorized: bool) -> bool:
+    return access_token is not None and (not authorized or access_token.scopes == "approved")
+
+
 EnabledBackendsDependency = DependencyCallable[Sequence[AuthenticationBackend[models.UP, models.ID, models.AP]]]
 
 
@@ -43,8 +93,29 @@ class Authenticator[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTokenP
     defined by the end-developer. The first backend yielding a user wins.
     If no backend yields a user, an HTTPException is raised.
 
+    The dependency callables are memoized per set of options, so that FastAPI
+    resolves a dependency used several times by a route only once.
+    Besides, each token is resolved once per request, along with its record,
+    so that sibling dependencies with different requirements only check them in memory.
+    Tokens tagged by a backend, see `AuthenticationBackend.token_tag`, are only read
+    by this backend; untagged ones are tried against each backend in order.
+
     :param backends: List of authentication backends.
     :param get_user_manager: User manager dependency callable.
+    :param lazy_strategies: If `True`, the strategy of a backend is only resolved
+    when its transport found a token in the request, instead of for every backend.
+    Since they are resolved apart from the route dependencies, the strategies
+    and their sub-dependencies, like database sessions, aren't shared with the route,
+    only between the dependencies of the authenticator. Their records are then only
+    handed to the route by `get_token_record` if the route's strategy is the same instance.
+    Defaults to `False`.
+    :param concurrent_backends: If `True`, the token records of several candidate backends
+    are read concurrently; the highest-priority backend yielding a record wins,
+    and the remaining lookups are cancelled before its user is loaded by the user manager,
+    so that the user manager may share its session with a strategy.
+    Useful for tokens that can't be tagged. The strategies mustn't share a database session
+    with each other, which doesn't support concurrent operations: give each backend its own,
+    or use stateless strategies. Defaults to `False`.
     """
 
     backends: Sequence[AuthenticationBackend[UP, ID, AP]]
@@ -53,9 +124,27 @@ class Authenticator[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTokenP
         self,
         backends: Sequence[AuthenticationBackend[UP, ID, AP]],
         get_user_manager: UserManagerDependency[UP, ID],
+        lazy_strategies: bool = False,
+        concurrent_backends: bool = False,
     ):
         self.backends = backends
         self.get_user_manager = get_user_manager
+        self.lazy_strategies = lazy_strategies
+        self.concurrent_backends = concurrent_backends
+        # Backends are fixed, so their dependency parameter names are computed once
+        self._dispatch_plan = tuple(
+            (backend, name_to_variable_name(backend.name), name_to_strategy_variable_name(backend.name))
+            for backend in backends
+        )
+        self._token_tags = frozenset(backend.token_tag for backend in backends if backend.token_tag is not None)
+        self._strategy_dependants: dict[str, Dependant] = {}
+        if lazy_strategies:
+            self._strategy_dependants = {
+                backend.name: get_strategy_dependant(backend.get_strategy) for backend in backends
+            }
+        self._current_user_token_dependencies: dict[tuple[Any, ...], Callable[..., Any]] = {}
+        self._current_user_dependencies: dict[tuple[Any, ...], Callable[..., Any]] = {}
+        self._current_principal_dependencies: dict[tuple[Any, ...], Callable[..., Any]] = {}
 
     def current_user_token(  # type: ignore[no-untyped-def]  # noqa: PLR0913
         self,
@@ -89,23 +178,27 @@ class Authenticator[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTokenP
         Please not however that every backends will appear in the OpenAPI documentation,
         as FastAPI resolves it statically.
         """
+        key = (optional, active, verified, superuser, poweruser, authorized, ignore_expired, get_enabled_backends)
+        dependency = self._current_user_token_dependencies.get(key)
+        if dependency is not None:
+            return dependency
+
         signature = self._get_dependency_signature(get_enabled_backends)  # type: ignore[arg-type]
+        user_checks = get_user_checks(active, verified, superuser, poweruser)
 
         @with_signature(signature)
         async def current_user_token_dependency(*args: Any, **kwargs: Any):  # type: ignore[no-untyped-def]
             return await self._authenticate(
                 *args,
                 optional=optional,
-                active=active,
-                verified=verified,
-                superuser=superuser,
-                poweruser=poweruser,
+                user_checks=user_checks,
                 authorized=authorized,
                 ignore_expired=ignore_expired,
                 **kwargs,
             )
 
-        return current_user_token_dependency
+        # Threads racing on the same options all get the first dependency stored
+        return self._current_user_token_dependencies.setdefault(key, current_user_token_dependency)
 
     def current_user(  # type: ignore  # noqa: PLR0913
         self,
@@ -139,74 +232,407 @@ class Authenticator[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTokenP
         Please not however that every backends will appear in the OpenAPI documentation,
         as FastAPI resolves it statically.
         """
+        key = (optional, active, verified, superuser, poweruser, authorized, ignore_expired, get_enabled_backends)
+        dependency = self._current_user_dependencies.get(key)
+        if dependency is not None:
+            return dependency
+
         signature = self._get_dependency_signature(get_enabled_backends)  # type: ignore[arg-type]
+        user_checks = get_user_checks(active, verified, superuser, poweruser)
 
         @with_signature(signature)
         async def current_user_dependency(*args: Any, **kwargs: Any):  # type: ignore[no-untyped-def]
             user, _ = await self._authenticate(
                 *args,
                 optional=optional,
-                active=active,
-                verified=verified,
-                superuser=superuser,
-                poweruser=poweruser,
+                user_checks=user_checks,
                 authorized=authorized,
                 ignore_expired=ignore_expired,
                 **kwargs,
             )
             return user
 
-        return current_user_dependency
+        return self._current_user_dependencies.setdefault(key, current_user_dependency)
 
-    async def _authenticate(  # noqa: PLR0913, C901
+    def current_principal(  # type: ignore[no-untyped-def]  # noqa: PLR0913
         self,
-        *args: Any,
-        user_manager: BaseUserManager[UP, ID],
         optional: bool = False,
         active: bool = False,
         verified: bool = False,
         superuser: bool = False,
         poweruser: bool = False,
+        authorized: bool = True,
+        ignore_expired: bool = False,
+        get_enabled_backends: EnabledBackendsDependency[models.UP, models.ID, models.AP] | None = None,
+    ):
+        """
+        Return a dependency callable to retrieve the principal of the currently authenticated user.
+
+        Unlike `current_user`, the user record isn't loaded: the principal is read
+        from `BaseUserManager.principal_cache` when possible.
+        It takes the same parameters as `current_user`.
+        """
+        key = (optional, active, verified, superuser, poweruser, authorized, ignore_expired, get_enabled_backends)
+        dependency = self._current_principal_dependencies.get(key)
+        if dependency is not None:
+            return dependency
+
+        signature = self._get_dependency_signature(get_enabled_backends)  # type: ignore[arg-type]
+        user_checks = get_user_checks(active, verified, superuser, poweruser)
+
+        @with_signature(signature)
+        async def current_principal_dependency(*args: Any, **kwargs: Any):  # type: ignore[no-untyped-def]
+            principal, _ = await self._authenticate(
+                *args,
+                optional=optional,
+                user_checks=user_checks,
+                authorized=authorized,
+                ignore_expired=ignore_expired,
+                principal=True,
+                **kwargs,
+            )
+            return principal
+
+        return self._current_principal_dependencies.setdefault(key, current_principal_dependency)
+
+    async def _authenticate(
+        self,
+        *args: Any,
+        request: Request,
+        user_manager: BaseUserManager[UP, ID],
+        optional: bool = False,
+        user_checks: UserChecks = (),
         authorized: bool = False,
         ignore_expired: bool = False,
+        principal: bool = False,
         **kwargs: Any,
-    ) -> tuple[UP | None, str | None]:
-        user: UP | None = None
-        token: str | None = None
-        enabled_backends: Sequence[AuthenticationBackend[UP, ID, AP]] = kwargs.get("enabled_backends", self.backends)
+    ) -> tuple[Any, str | None]:
+        enabled_backends: Sequence[AuthenticationBackend[UP, ID, AP]] | None = kwargs.pop("enabled_backends", None)
+        user: UP | Principal | None
+        if principal:
+            user, token = await self._resolve_principal(
+                request, user_manager, enabled_backends, authorized, ignore_expired, **kwargs
+            )
+        else:
+            user, token = await self._resolve_token(
+                request, user_manager, enabled_backends, authorized, ignore_expired, **kwargs
+            )
 
         detail = "no-user"
-
-        for backend in self.backends:
-            if backend in enabled_backends:
-                token = kwargs[name_to_variable_name(backend.name)]
-                strategy: Strategy[UP, ID, AP] = kwargs[name_to_strategy_variable_name(backend.name)]
-                if token is not None:
-                    user = await strategy.read_token(token, user_manager, authorized, ignore_expired)
-                    if user is not None:
-                        break
-
         status_code = status.HTTP_401_UNAUTHORIZED
         if user is not None:
-            status_code = status.HTTP_403_FORBIDDEN
-            detail = "no-reason"
-            if active and not user.is_active:
-                status_code = status.HTTP_401_UNAUTHORIZED
-                user = None
-                detail = "no-active"
-            elif verified and not user.is_verified:
-                user = None
-                detail = "no-verified"
-            elif superuser and not user.is_superuser:
-                user = None
-                detail = "no-permissions"
-            elif poweruser and not user.is_poweruser:
-                user = None
-                detail = "no-permissions"
+            for attribute, check_status_code, check_detail in user_checks:
+                if not getattr(user, attribute):
+                    user = None
+                    status_code = check_status_code
+                    detail = check_detail
+                    break
         if user is None and not optional:
             raise HTTPException(status_code=status_code, detail=detail)
         return user, token
 
+    async def get_token_record(
+        self,
+        request: Request,
+        backend: AuthenticationBackend[UP, ID, AP],
+        strategy: Strategy[UP, ID, AP],
+        token: str | None,
+    ) -> AP | None:
+        """
+        Get the record of a token, like `Strategy.get_token_record`.
+
+        If the token was resolved while authenticating the request by the same strategy instance,
+        the record read back then is returned instead of querying it again. A record read
+        by another instance may be attached to another database session, so it's read again.
+
+        :param request: The current request.
+        :param backend: The authentication backend the token belongs to.
+        :param strategy: The strategy of this backend.
+        :param token: The token to get the record of.
+        """
+        result = self._get_request_results(request).get((self, backend.name, False))
+        if result is not None and result[1] == token and result[3] is strategy:
+            return result[2]
+        return await strategy.get_token_record(token)
+
+    async def _resolve_token(
+        self,
+        request: Request,
+        user_manager: BaseUserManager[UP, ID],
+        enabled_backends: Sequence[AuthenticationBackend[UP, ID, AP]] | None,
+        authorized: bool,
+        ignore_expired: bool,
+        **kwargs: Any,
+    ) -> tuple[UP | None, str | None]:
+        """
+        Read the token of the first backend yielding a user.
+
+        Each backend token is resolved once per request regardless of its scopes,
+        and stored on the request state along with its record.
+        `authorized` is then checked in memory.
+        """
+        candidates, token = self._get_candidates(enabled_backends, kwargs)
+
+        if self.concurrent_backends and len(candidates) > 1:
+            return await self._resolve_concurrently(
+                candidates, request, user_manager, authorized, ignore_expired, token, kwargs
+            )
+
+        return await self._resolve_sequentially(
+            candidates, request, user_manager, authorized, ignore_expired, token, kwargs
+        )
+
+    async def _resolve_sequentially(
+        self,
+        candidates: list[tuple[AuthenticationBackend[UP, ID, AP], str, str]],
+        request: Request,
+        user_manager: BaseUserManager[UP, ID],
+        authorized: bool,
+        ignore_expired: bool,
+        token: str | None,
+        kwargs: dict[str, Any],
+    ) -> tuple[UP | None, str | None]:
+        for backend, candidate_token, strategy_name in candidates:
+            user, access_token = await self._read_token_record(
+                request, user_manager, backend, candidate_token, ignore_expired, kwargs.get(strategy_name)
+            )
+            if _is_accepted(user, access_token, authorized):
+                return user, candidate_token
+
+        return None, token
+
+    async def _resolve_principal(
+        self,
+        request: Request,
+        user_manager: BaseUserManager[UP, ID],
+        enabled_backends: Sequence[AuthenticationBackend[UP, ID, AP]] | None,
+        authorized: bool,
+        ignore_expired: bool,
+        **kwargs: Any,
+    ) -> tuple[Principal | None, str | None]:
+        """
+        Read the token of the first backend yielding a principal.
+
+        If the user was already resolved during the request, the principal is derived from it.
+        Otherwise, only the token record is read, and the principal is retrieved from the user manager.
+        """
+        candidates, token = self._get_candidates(enabled_backends, kwargs)
+        results = self._get_request_results(request)
+
+        for backend, candidate_token, strategy_name in candidates:
+            result = results.get((self, backend.name, ignore_expired))
+            if result is not None and result[1] == candidate_token:
+                user, _, access_token, _ = result
+                principal = None if user is None else Principal.from_user(user)
+            else:
+                principal, access_token = await self._read_token_principal(
+                    request, user_manager, backend, candidate_token, ignore_expired, kwargs.get(strategy_name)
+                )
+            if _is_accepted(principal, access_token, authorized):
+                return principal, candidate_token
+
+        return None, token
+
+    async def _read_token_principal(
+        self,
+        request: Request,
+        user_manager: BaseUserManager[UP, ID],
+        backend: AuthenticationBackend[UP, ID, AP],
+        token: str,
+        ignore_expired: bool,
+        strategy: Strategy[UP, ID, AP] | None,
+    ) -> tuple[Principal | None, AP | None]:
+        results = self._get_request_results(request)
+        key = (self, backend.name, ignore_expired, Principal)
+        result = results.get(key)
+        if result is not None and result[1] == token:
+            return result[0], result[2]
+
+        if strategy is None:
+            strategy = await self._solve_strategy(request, backend)
+        if ignore_expired:
+            access_token = await strategy.get_token_record_raw(token)
+        else:
+            access_token = await strategy.get_token_record(token)
+
+        principal: Principal | None = None
+        if access_token is not None:
+            try:
+                principal = await user_manager.get_principal(user_manager.parse_id(access_token.user_id))
+            except exceptions.UserNotExists, exceptions.InvalidID:
+                pass
+
+        results[key] = (principal, token, access_token, strategy)
+        return principal, access_token
+
+    def _get_candidates(
+        self,
+        enabled_backends: Sequence[AuthenticationBackend[UP, ID, AP]] | None,
+        kwargs: dict[str, Any],
+    ) -> tuple[list[tuple[AuthenticationBackend[UP, ID, AP], str, str]], str | None]:
+        """
+        List the backends that may have issued the request tokens, by priority.
+
+        :return: The backends along with their token and strategy parameter name,
+        and the token of the last enabled backend.
+        """
+        enabled = None if enabled_backends is None else {id(backend) for backend in enabled_backends}
+
+        candidates: list[tuple[AuthenticationBackend[UP, ID, AP], str, str]] = []
+        token: str | None = None
+        for backend, token_name, strategy_name in self._dispatch_plan:
+            if enabled is not None and id(backend) not in enabled:
+                continue
+            token = kwargs[token_name]
+            if token is None:
+                continue
+            if self._token_tags and not self._may_have_issued(backend, token):
+                continue
+            candidates.append((backend, token, strategy_name))
+        return candidates, token
+
+    async def _resolve_concurrently(
+        self,
+        candidates: list[tuple[AuthenticationBackend[UP, ID, AP], str, str]],
+        request: Request,
+        user_manager: BaseUserManager[UP, ID],
+        authorized: bool,
+        ignore_expired: bool,
+        token: str | None,
+        kwargs: dict[str, Any],
+    ) -> tuple[UP | None, str | None]:
+        """
+        Read the candidate token records concurrently, awaiting them by backend priority.
+
+        Once a backend yields a record, the lookups of the lower-priority ones are cancelled,
+        then its user is loaded. The user manager is thus never used concurrently.
+        """
+        tasks = [
+            asyncio.ensure_future(
+                self._read_record(request, backend, candidate_token, ignore_expired, kwargs.get(strategy_name))
+            )
+            for backend, candidate_token, strategy_name in candidates
+        ]
+        accepted: tuple[int, AP, Strategy[UP, ID, AP]] | None = None
+        try:
+            for index, task in enumerate(tasks):
+                access_token, strategy = await task
+                if access_token is not None and _is_accepted_record(access_token, authorized):
+                    accepted = index, access_token, strategy
+                    break
+        finally:
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            # Let the cancelled lookups unwind before the request goes on with their resources
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if accepted is None:
+            return None, token
+
+        index, access_token, strategy = accepted
+        backend, candidate_token, _ = candidates[index]
+        results = self._get_request_results(request)
+        key = (self, backend.name, ignore_expired)
+        result = results.get(key)
+        if result is not None and result[1] == candidate_token:
+            user = result[0]
+        else:
+            user = await self._get_user(user_manager, access_token)
+            results[key] = (user, candidate_token, access_token, strategy)
+        if user is not None:
+            return user, candidate_token
+
+        # The user of the token is gone, fall back to the lower-priority backends
+        return await self._resolve_sequentially(
+            candidates[index + 1 :], request, user_manager, authorized, ignore_expired, token, kwargs
+        )
+
+    async def _read_record(
+        self,
+        request: Request,
+        backend: AuthenticationBackend[UP, ID, AP],
+        token: str,
+        ignore_expired: bool,
+        strategy: Strategy[UP, ID, AP] | None,
+    ) -> tuple[AP | None, Strategy[UP, ID, AP]]:
+        """Read the record of a token, without its user, unless the request already resolved it."""
+        result = self._get_request_results(request).get((self, backend.name, ignore_expired))
+        if result is not None and result[1] == token:
+            return result[2], result[3]
+        if strategy is None:
+            strategy = await self._solve_strategy(request, backend)
+        if ignore_expired:
+            return await strategy.get_token_record_raw(token), strategy
+        return await strategy.get_token_record(token), strategy
+
+    async def _get_user(self, user_manager: BaseUserManager[UP, ID], access_token: AP) -> UP | None:
+        try:
+            return await user_manager.get(user_manager.parse_id(access_token.user_id))
+        except exceptions.UserNotExists, exceptions.InvalidID:
+            return None
+
+    async def _read_token_record(
+        self,
+        request: Request,
+        user_manager: BaseUserManager[UP, ID],
+        backend: AuthenticationBackend[UP, ID, AP],
+        token: str,
+        ignore_expired: bool,
+        strategy: Strategy[UP, ID, AP] | None,
+    ) -> tuple[UP | None, AP | None]:
+        results = self._get_request_results(request)
+        key = (self, backend.name, ignore_expired)
+        result = results.get(key)
+        if result is not None and result[1] == token:
+            return result[0], result[2]
+
+        if strategy is None:
+            strategy = await self._solve_strategy(request, backend)
+        if hasattr(strategy, "read_token_record"):
+            user, access_token = await strategy.read_token_record(token, user_manager, ignore_expired)
+        else:
+            # Strategy implementations which don't subclass it miss the default implementation
+            user, access_token = await Strategy.read_token_record(strategy, token, user_manager, ignore_expired)
+        results[key] = (user, token, access_token, strategy)
+        return user, access_token
+
+    def _may_have_issued(self, backend: AuthenticationBackend[UP, ID, AP], token: str) -> bool:
+        """Tell whether a backend may have issued a token: untagged and unknown tags could be anyone's."""
+        token_tag = get_token_tag(token)
+        return token_tag is None or token_tag not in self._token_tags or token_tag == backend.token_tag
+
+    async def _solve_strategy(
+        self, request: Request, backend: AuthenticationBackend[UP, ID, AP]
+    ) -> Strategy[UP, ID, AP]:
+        solved = await solve_dependencies(
+            request=request,
+            dependant=self._strategy_dependants[backend.name],
+            dependency_overrides_provider=request.scope.get("app"),
+            dependency_cache=self._get_request_dependency_cache(request),
+            async_exit_stack=request.scope["fastapi_inner_astack"],
+            embed_body_fields=False,
+        )
+        if solved.errors:
+            raise RequestValidationError(solved.errors)
+        return cast(Strategy[UP, ID, AP], solved.values["strategy"])
+
+    @staticmethod
+    def _get_request_results(request: Request) -> dict[tuple[Any, ...], TokenResult]:
+        results: dict[tuple[Any, ...], TokenResult] | None = getattr(request.state, REQUEST_STATE_RESULTS, None)
+        if results is None:
+            results = {}
+            setattr(request.state, REQUEST_STATE_RESULTS, results)
+        return results
+
+    @staticmethod
+    def _get_request_dependency_cache(request: Request) -> dict[Any, Any]:
+        """Get the cache of the lazily resolved dependencies, so that each one is solved once per request."""
+        dependency_cache: dict[Any, Any] | None = getattr(request.state, REQUEST_STATE_DEPENDENCY_CACHE, None)
+        if dependency_cache is None:
+            dependency_cache = {}
+            setattr(request.state, REQUEST_STATE_DEPENDENCY_CACHE, dependency_cache)
+        return dependency_cache
+
     def _get_dependency_signature(
         self,
         get_enabled_backends: EnabledBackendsDependency[UP, ID, AP] | None = None,
@@ -221,26 +647,34 @@ class Authenticator[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTokenP
         """
         try:
             parameters: list[Parameter] = [
+                Parameter(
+                    name="request",
+                    kind=Parameter.POSITIONAL_OR_KEYWORD,
+                    annotation=Request,
+                ),
                 Parameter(
                     name="user_manager",
                     kind=Parameter.POSITIONAL_OR_KEYWORD,
                     default=Depends(self.get_user_manager),
-                )
+                ),
             ]
 
             for backend in self.backends:
-                parameters += [
+                parameters.append(
                     Parameter(
                         name=name_to_variable_name(backend.name),
                         kind=Parameter.POSITIONAL_OR_KEYWORD,
                         default=Depends(cast(Callable, backend.transport.scheme)),  # type: ignore
-                    ),
-                    Parameter(
-                        name=name_to_strategy_variable_name(backend.name),
-                        kind=Parameter.POSITIONAL_OR_KEYWORD,
-                        default=Depends(backend.get_strategy),
-                    ),
-                ]
+                    )
+                )
+                if not self.lazy_strategies:
+                    parameters.append(
+                        Parameter(
+                            name=name_to_strategy_variable_name(backend.name),
+                            kind=Parameter.POSITIONAL_OR_KEYWORD,
+                            default=Depends(backend.get_strategy),
+                        )
+                    )
 
             if get_enabled_backends is not None:
                 parameters += [
@@ -7,6 +7,7 @@ from filuta_fastapi_users.authentication.strategy.base import (
     Strategy,
     StrategyDestroyNotSupportedError,
 )
+from filuta_fastapi_users.authentication.strategy.token_tag import validate_token_tag
 from filuta_fastapi_users.authentication.transport.base import (
     Transport,
     TransportLogoutNotSupportedError,
@@ -24,6 +25,9 @@ class AuthenticationBackend[UP: "models.UserProtocol[Any]", ID, AP: "models.Acce
     :param transport: Authentication transport instance.
     :param get_strategy: Dependency callable returning
     an authentication strategy instance.
+    :param token_tag: Optional tag prefixing the tokens issued by the strategy,
+    which must be configured with the same tag.
+    The authenticator dispatches the tokens bearing it straight to this backend.
     """
 
     name: str
@@ -34,10 +38,12 @@ class AuthenticationBackend[UP: "models.UserProtocol[Any]", ID, AP: "models.Acce
         name: str,
         transport: Transport[AP],
         get_strategy: DependencyCallable[Strategy[UP, ID, AP]],
+        token_tag: str | None = None,
     ) -> None:
         self.name = name
         self.transport = transport
         self.get_strategy = get_strategy
+        self.token_tag = validate_token_tag(token_tag)
 
     async def abd(self) -> None:
         pass
@@ -0,0 +1,56 @@
+from dataclasses import dataclass
+from typing import Any
+
+from filuta_fastapi_users import models
+from filuta_fastapi_users.authentication.strategy.db.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Identity and permission flags of an authenticated user, without the user record."""
+
+    id: Any
+    is_active: bool
+    is_verified: bool
+    is_superuser: bool
+    is_poweruser: bool
+
+    @classmethod
+    def from_user(cls, user: models.UserProtocol[Any]) -> Principal:
+        return cls(
+            id=user.id,
+            is_active=user.is_active,
+            is_verified=user.is_verified,
+            is_superuser=user.is_superuser,
+            is_poweruser=user.is_poweruser,
+        )
+
+
+class PrincipalCache(TTLCache[Any, Principal]):
+    """
+    Cache of principals, keyed by user id.
+
+    Share a single instance between the requests of a process through
+    `BaseUserManager.principal_cache`: the user manager invalidates it
+    when it updates or deletes a user. Other processes only see the changes
+    once the entries expire, so keep the TTL short.
+
+    :param maxsize: Maximum number of entries kept in the cache.
+    :param ttl_seconds: Maximum lifetime of an entry, in seconds.
+    :param invalidation_grace_seconds: How long an invalidated user can't be cached again, in seconds.
+    Otherwise, a lookup which read the user before its update could put the stale principal back.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl_seconds: float = 30.0, invalidation_grace_seconds: float = 5.0):
+        super().__init__(maxsize, ttl_seconds, invalidation_grace_seconds)
+
+    def set(self, key: Any, value: Principal, ttl_seconds: float | None = None) -> None:
+        with self._lock:
+            if self._is_invalidated(key):
+                return
+            super().set(key, value, ttl_seconds)
+
+    def invalidate(self, user_id: Any) -> None:
+        with self._lock:
+            self._mark_invalidated(user_id)
+            self._remove(user_id)
@@ -8,6 +8,10 @@ class StrategyDestroyNotSupportedError(Exception):
     pass
 
 
+class StrategyTokenNotFoundError(Exception):
+    pass
+
+
 class Strategy[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTokenProtocol[Any]"](Protocol):
     async def read_token(
         self,
@@ -17,6 +21,27 @@ class Strategy[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTokenProtoc
         ignore_expired: bool = False,
     ) -> UP | None: ...  # pragma: no cover
 
+    async def read_token_record(
+        self,
+        token: str | None,
+        user_manager: BaseUserManager[UP, ID],
+        ignore_expired: bool = False,
+    ) -> tuple[UP | None, AP | None]:
+        """
+        Resolve a token regardless of its scopes, along with its user.
+
+        The default implementation reads the record, then the user with `read_token`.
+        Strategies able to get both with a single lookup should override it.
+        """
+        if ignore_expired:
+            access_token = await self.get_token_record_raw(token)
+        else:
+            access_token = await self.get_token_record(token)
+        if access_token is None:
+            return None, None
+        user = await self.read_token(token, user_manager, ignore_expired=ignore_expired)
+        return user, access_token
+
     async def update_token(self, access_token: AP, data: dict[str, Any]) -> AP: ...  # pragma: no cover
 
     async def get_token_record_raw(self, token: str | None) -> AP | None: ...  # pragma: no cover
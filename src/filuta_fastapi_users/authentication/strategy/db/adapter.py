@@ -1,5 +1,6 @@
+from collections.abc import Sequence
 from datetime import datetime
-from typing import Any, Protocol
+from typing import Any, Protocol, runtime_checkable
 
 from filuta_fastapi_users import models
 
@@ -38,6 +39,21 @@ class AccessTokenDatabase[AP](Protocol):
         ...  # pragma: no cover
 
 
+@runtime_checkable
+class JoinedAccessTokenDatabase[AP](Protocol):
+    """Optional protocol of the access token databases resolving a token and its user in one query."""
+
+    async def get_by_token_with_user(
+        self,
+        token: str,
+        max_age: datetime | None = None,
+        authorized: bool = False,
+        ignore_expired: bool = False,
+    ) -> tuple[AP, Any] | None:
+        """Get a single access token by token, together with its user, in one query."""
+        ...  # pragma: no cover
+
+
 class RefreshTokenDatabase[RTP](Protocol):
     """Protocol for retrieving, creating and updating refresh tokens from a database."""
 
@@ -62,6 +78,22 @@ class RefreshTokenDatabase[RTP](Protocol):
         ...  # pragma: no cover
 
 
+class RevokedTokenDatabase[RVTP](Protocol):
+    """Protocol for storing and retrieving revocations of stateless access tokens."""
+
+    async def create(self, create_dict: dict[str, Any]) -> RVTP:
+        """Create a revocation."""
+        ...  # pragma: no cover
+
+    async def get_revoked_since(self, since: datetime | None = None) -> Sequence[RVTP]:
+        """Get the revocations that haven't expired yet, optionally only the ones made since a given date."""
+        ...  # pragma: no cover
+
+    async def delete_expired(self) -> None:
+        """Delete the revocations of tokens that have expired anyway."""
+        ...  # pragma: no cover
+
+
 class OtpTokenDatabase[OTPTP](Protocol):
     """Protocol for retrieving, creating and updating OTP tokens from a database."""
 
@@ -0,0 +1,219 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from filuta_fastapi_users import models
+
+
+@dataclass(frozen=True)
+class CachedAccessToken:
+    """Snapshot of an access token record, detached from any database session."""
+
+    token: str
+    user_id: Any
+    created_at: datetime
+    scopes: str
+    mfa_scopes: dict[str, int]
+
+    @classmethod
+    def from_record(cls, access_token: models.AccessTokenProtocol[Any]) -> CachedAccessToken:
+        return cls(
+            token=access_token.token,
+            user_id=access_token.user_id,
+            created_at=access_token.created_at,
+            scopes=access_token.scopes,
+            mfa_scopes=dict(access_token.mfa_scopes),
+        )
+
+
+class TTLCache[K, V]:
+    """
+    Bounded in-process cache with a time-to-live per entry.
+
+    When the cache is full, the least recently used entry is evicted.
+    It's thread-safe, so that it can be shared by event loops running in several threads.
+
+    :param maxsize: Maximum number of entries kept in the cache.
+    :param ttl_seconds: Maximum lifetime of an entry, in seconds.
+    :param invalidation_grace_seconds: How long the keys marked as invalidated by subclasses
+    can't be cached again, in seconds.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl_seconds: float = 60.0, invalidation_grace_seconds: float = 0.0):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.invalidation_grace_seconds = invalidation_grace_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._invalidated_at: OrderedDict[Any, float] = OrderedDict()
+        # Reentrant, so that subclasses can call the public methods from their hooks
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: K, value: V, ttl_seconds: float | None = None) -> None:
+        """
+        Store a value.
+
+        :param ttl_seconds: Optional lifetime of this entry, in seconds.
+        It can't exceed the cache `ttl_seconds`. If it's not positive, the value isn't stored.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        with self._lock:
+            self._remove(key)
+            if ttl <= 0:
+                return
+
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._on_set(key, value)
+            while len(self._entries) > self.maxsize:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def pop(self, key: K) -> V | None:
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _remove(self, key: K) -> V | None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        _, value = entry
+        self._on_remove(key, value)
+        return value
+
+    def _mark_invalidated(self, key: Any) -> None:
+        now = time.monotonic()
+        self._invalidated_at[key] = now
+        self._invalidated_at.move_to_end(key)
+        while self._invalidated_at:
+            oldest_key, invalidated_at = next(iter(self._invalidated_at.items()))
+            if len(self._invalidated_at) <= self.maxsize and now - invalidated_at < self.invalidation_grace_seconds:
+                break
+            del self._invalidated_at[oldest_key]
+
+    def _is_invalidated(self, key: Any) -> bool:
+        invalidated_at = self._invalidated_at.get(key)
+        return invalidated_at is not None and time.monotonic() - invalidated_at < self.invalidation_grace_seconds
+
+    def _on_set(self, key: K, value: V) -> None:
+        pass
+
+    def _on_remove(self, key: K, value: V) -> None:
+        pass
+
+
+class AccessTokenCache(TTLCache[str, CachedAccessToken]):
+    """
+    Cache of access token records, keyed by token.
+
+    Share a single instance between the `DatabaseStrategy` instances of a process
+    and the user manager, so that token deletions invalidate it.
+    Other processes aren't told: a token deleted by one of them, on logout for instance,
+    is still accepted by the others until their entry expires, so keep the TTL short.
+
+    :param maxsize: Maximum number of entries kept in the cache.
+    :param ttl_seconds: Maximum lifetime of an entry, in seconds.
+    :param invalidation_grace_seconds: How long an invalidated token, or the tokens
+    of an invalidated user, can't be cached again, in seconds. Otherwise, a lookup which read
+    the record before its deletion could put it back. Keep it above the time between
+    a deletion and its commit, like the rest of the request in unit-of-work mode.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl_seconds: float = 30.0, invalidation_grace_seconds: float = 5.0):
+        super().__init__(maxsize, ttl_seconds, invalidation_grace_seconds)
+        self._tokens_by_user: dict[Any, set[str]] = {}
+
+    def set(self, key: str, value: CachedAccessToken, ttl_seconds: float | None = None) -> None:
+        with self._lock:
+            if self._is_invalidated(("token", key)) or self._is_invalidated(("user", value.user_id)):
+                return
+            super().set(key, value, ttl_seconds)
+
+    def invalidate(self, token: str) -> None:
+        """Forget a single token."""
+        with self._lock:
+            self._mark_invalidated(("token", token))
+            self._remove(token)
+
+    def invalidate_user(self, user_id: Any) -> None:
+        """Forget every token of a user."""
+        with self._lock:
+            self._mark_invalidated(("user", user_id))
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def _on_set(self, key: str, value: CachedAccessToken) -> None:
+        self._tokens_by_user.setdefault(value.user_id, set()).add(key)
+
+    def _on_remove(self, key: str, value: CachedAccessToken) -> None:
+        tokens = self._tokens_by_user.get(value.user_id)
+        if tokens is not None:
+            tokens.discard(key)
+            if not tokens:
+                del self._tokens_by_user[value.user_id]
+
+
+class NegativeTokenCache(TTLCache[bytes, bool]):
+    """
+    Cache of tokens known not to match any access token.
+
+    Tokens are stored as fixed-size digests,
+    so that oversized garbage tokens don't inflate memory usage.
+    Keep the TTL short: an entry only saves a lookup for a token that doesn't exist.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl_seconds: float = 10.0):
+        super().__init__(maxsize, ttl_seconds)
+
+    def __contains__(self, token: object) -> bool:
+        return isinstance(token, str) and self.get(self._key(token)) is not None
+
+    def add(self, token: str) -> None:
+        self.set(self._key(token), True)
+
+    def discard(self, token: str) -> None:
+        self.pop(self._key(token))
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
@@ -3,15 +3,78 @@ from datetime import UTC, datetime, timedelta
 from typing import Any
 
 from filuta_fastapi_users import exceptions, models
-from filuta_fastapi_users.authentication.strategy.base import Strategy
-from filuta_fastapi_users.authentication.strategy.db.adapter import AccessTokenDatabase
+from filuta_fastapi_users.authentication.strategy.base import Strategy, StrategyTokenNotFoundError
+from filuta_fastapi_users.authentication.strategy.db.adapter import AccessTokenDatabase, JoinedAccessTokenDatabase
+from filuta_fastapi_users.authentication.strategy.db.cache import (
+    AccessTokenCache,
+    CachedAccessToken,
+    NegativeTokenCache,
+)
+from filuta_fastapi_users.authentication.strategy.db.signed_token import (
+    generate_signed_token,
+    is_signed_token,
+    read_signed_token,
+)
+from filuta_fastapi_users.authentication.strategy.token_tag import (
+    TAGGED_TOKEN_RANDOM_BYTES,
+    tag_token,
+    validate_token_tag,
+)
+from filuta_fastapi_users.jwt import SecretType
 from filuta_fastapi_users.manager import BaseUserManager
 
 
 class DatabaseStrategy[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTokenProtocol[Any]"](Strategy[UP, ID, AP]):
-    def __init__(self, access_token_db: AccessTokenDatabase[AP], lifetime_seconds: int | None = None):
+    """
+    Strategy storing access tokens in a database.
+
+    :param access_token_db: Access token database adapter instance.
+    :param lifetime_seconds: Optional lifetime of the access tokens, in seconds.
+    :param joined_user_lookup: If `True`, `read_token` resolves the token and its user
+    in a single query through `JoinedAccessTokenDatabase.get_by_token_with_user`,
+    instead of calling `BaseUserManager.get` afterwards. A `ValueError` is raised
+    if the access token database doesn't implement it. Defaults to `False`.
+    :param cache: Optional access token cache, shared across requests.
+    When set, `read_token` and `get_token_record` only query the database on cache misses
+    for approved tokens. Entries never outlive the token lifetime.
+    :param negative_cache: Optional cache of unknown tokens, shared across requests.
+    When set, tokens that recently matched no access token are rejected without a query.
+    :param token_secret: Optional secret used to sign the generated tokens.
+    When set, new tokens embed their issue date and a checksum,
+    so that forged or expired ones are rejected without a query.
+    :param allow_unsigned_tokens: Whether plain tokens, issued before `token_secret`
+    was set, are still accepted. Disable it once they have all expired. Defaults to `True`.
+    :param token_tag: Optional tag of up to 4 characters prefixing the generated tokens.
+    Set the same tag on the authentication backend, so that the authenticator
+    dispatches the tokens straight to it.
+    """
+
+    def __init__(
+        self,
+        access_token_db: AccessTokenDatabase[AP],
+        lifetime_seconds: int | None = None,
+        joined_user_lookup: bool = False,
+        cache: AccessTokenCache | None = None,
+        negative_cache: NegativeTokenCache | None = None,
+        token_secret: SecretType | None = None,
+        allow_unsigned_tokens: bool = True,
+        token_tag: str | None = None,
+    ):
         self.access_token_db = access_token_db
         self.lifetime_seconds = lifetime_seconds
+        self.joined_user_lookup = joined_user_lookup
+        self._joined_access_token_db: JoinedAccessTokenDatabase[AP] | None = None
+        if joined_user_lookup:
+            if not isinstance(access_token_db, JoinedAccessTokenDatabase):
+                raise ValueError(
+                    "joined_user_lookup requires an access token database implementing get_by_token_with_user."
+                )
+            self._joined_access_token_db = access_token_db
+        self.cache = cache
+        self.negative_cache = negative_cache
+        self.token_secret = token_secret
+        self.allow_unsigned_tokens = allow_unsigned_tokens
+        self.token_tag = validate_token_tag(token_tag)
 
     async def read_token(
         self,
@@ -20,17 +83,137 @@ class DatabaseStrategy[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTok
         authorized: bool = False,
         ignore_expired: bool = False,
     ) -> UP | None:
-        if token is None:
+        if self.cache is None and self.negative_cache is None:
+            return await self._read_token_filtered(token, user_manager, authorized, ignore_expired)
+
+        user, access_token = await self.read_token_record(token, user_manager, ignore_expired)
+        if access_token is None or (authorized and access_token.scopes != "approved"):
+            return None
+        return user
+
+    async def _read_token_filtered(
+        self,
+        token: str | None,
+        user_manager: BaseUserManager[UP, ID],
+        authorized: bool,
+        ignore_expired: bool,
+    ) -> UP | None:
+        """Resolve a token with the flags checked by the database query."""
+        if token is None or self._reject_without_lookup(token, ignore_expired):
             return None
 
-        max_age = None
-        if self.lifetime_seconds is not None:
-            max_age = datetime.now(UTC) - timedelta(seconds=self.lifetime_seconds)
+        max_age = self._get_max_age()
+
+        if self._joined_access_token_db is not None:
+            result = await self._joined_access_token_db.get_by_token_with_user(
+                token, max_age, authorized, ignore_expired
+            )
+            if result is None:
+                return None
+            _, user = result
+            return user
 
         access_token = await self.access_token_db.get_by_token(token, max_age, authorized, ignore_expired)
         if access_token is None:
             return None
 
+        return await self._get_user(access_token, user_manager)
+
+    async def read_token_record(
+        self,
+        token: str | None,
+        user_manager: BaseUserManager[UP, ID],
+        ignore_expired: bool = False,
+    ) -> tuple[UP | None, AP | None]:
+        """
+        Resolve a token regardless of its scopes, along with its user.
+
+        When a cache is set, the record may be a `CachedAccessToken` snapshot,
+        which `update_token` accepts as well.
+        """
+        if token is None or self._reject_without_lookup(token, ignore_expired):
+            return None, None
+
+        max_age = None if ignore_expired else self._get_max_age()
+
+        if self.cache is not None or self.negative_cache is not None:
+            return await self._read_token_unfiltered(token, user_manager, max_age)
+
+        if self._joined_access_token_db is not None:
+            result = await self._joined_access_token_db.get_by_token_with_user(token, max_age)
+            if result is None:
+                return None, None
+            joined_access_token, user = result
+            return user, joined_access_token
+
+        access_token = await self.access_token_db.get_by_token(token, max_age)
+        if access_token is None:
+            return None, None
+        return await self._get_user(access_token, user_manager), access_token
+
+    async def _read_token_unfiltered(
+        self,
+        token: str,
+        user_manager: BaseUserManager[UP, ID] | None,
+        max_age: datetime | None,
+    ) -> tuple[UP | None, AP | None]:
+        """
+        Resolve a token fetched without filters, checking its age in memory.
+
+        This way, both a cached record and an unknown token are valid
+        for any flag combination. The user is only loaded if a user manager is given.
+        """
+        user: UP | None = None
+        access_token: Any = None
+        if self.cache is not None:
+            access_token = self.cache.get(token)
+
+        if access_token is None:
+            access_token, user = await self._fetch_token(token, with_user=user_manager is not None)
+            if access_token is None:
+                if self.negative_cache is not None:
+                    self.negative_cache.add(token)
+                return None, None
+
+            # Tokens still going through the MFA are about to be updated, only approved ones are cached
+            if self.cache is not None and access_token.scopes == "approved":
+                access_token = CachedAccessToken.from_record(access_token)
+                self.cache.set(token, access_token, self._get_remaining_lifetime(access_token))
+
+        if max_age is not None and access_token.created_at < max_age:
+            return None, None
+
+        if user is None and user_manager is not None:
+            user = await self._get_user(access_token, user_manager)
+        return user, access_token
+
+    def _reject_without_lookup(self, token: str, ignore_expired: bool) -> bool:
+        if self.token_secret is not None and not self._check_signature(token, self.token_secret, ignore_expired):
+            return True
+        return self.negative_cache is not None and token in self.negative_cache
+
+    def _check_signature(self, token: str, token_secret: SecretType, ignore_expired: bool) -> bool:
+        if not is_signed_token(token):
+            return self.allow_unsigned_tokens
+
+        issued_at = read_signed_token(token, token_secret)
+        if issued_at is None:
+            return False
+        if self.lifetime_seconds is None or ignore_expired:
+            return True
+        return issued_at + timedelta(seconds=self.lifetime_seconds) > datetime.now(UTC)
+
+    async def _fetch_token(self, token: str, with_user: bool) -> tuple[AP | None, UP | None]:
+        if self._joined_access_token_db is not None and with_user:
+            result = await self._joined_access_token_db.get_by_token_with_user(token)
+            if result is None:
+                return None, None
+            return result
+        return await self.access_token_db.get_by_token(token), None
+
+    async def _get_user(
+        self, access_token: models.AccessTokenProtocol[Any], user_manager: BaseUserManager[UP, ID]
+    ) -> UP | None:
         try:
             parsed_id = user_manager.parse_id(access_token.user_id)
             return await user_manager.get(parsed_id)
@@ -38,46 +221,76 @@ class DatabaseStrategy[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTok
             return None
 
     async def get_token_record(self, token: str | None) -> AP | None:
-        if token is None:
-            return None
-
-        max_age = None
-        if self.lifetime_seconds is not None:
-            max_age = datetime.now(UTC) - timedelta(seconds=self.lifetime_seconds)
-
-        access_token = await self.access_token_db.get_by_token(token, max_age)
-        return access_token
+        return await self._get_token_record(token, ignore_expired=False)
 
     async def get_token_record_raw(self, token: str | None) -> AP | None:
-        if token is None:
+        return await self._get_token_record(token, ignore_expired=True)
+
+    async def _get_token_record(self, token: str | None, ignore_expired: bool) -> AP | None:
+        if token is None or self._reject_without_lookup(token, ignore_expired):
             return None
 
-        access_token = await self.access_token_db.get_by_token(token)
-        return access_token
+        max_age = None if ignore_expired else self._get_max_age()
+        if self.cache is not None or self.negative_cache is not None:
+            _, access_token = await self._read_token_unfiltered(token, None, max_age)
+            return access_token
+
+        return await self.access_token_db.get_by_token(token, max_age)
 
     async def write_token(self, user: UP) -> AP:
         access_token_dict = self._create_access_token_dict(user)
-        access_token = await self.access_token_db.create(access_token_dict)
-        return access_token
+        return await self.insert_token(access_token_dict)
 
     async def insert_token(self, access_token_dict: dict[str, Any]) -> AP:
         access_token = await self.access_token_db.create(access_token_dict)
+        # Clients only learn the token once it's stored, so forgetting it now is enough
+        if self.negative_cache is not None:
+            self.negative_cache.discard(access_token.token)
         return access_token
 
     async def update_token(self, access_token: AP, data: dict[str, Any]) -> AP:
+        if isinstance(access_token, CachedAccessToken):
+            # Snapshots aren't bound to the database session, update the stored record instead
+            stored_access_token = await self.access_token_db.get_by_token(access_token.token)
+            if stored_access_token is None:
+                raise StrategyTokenNotFoundError()
+            access_token = stored_access_token
+
         access_token = await self.access_token_db.update(access_token, data)
+        if self.cache is not None:
+            self.cache.invalidate(access_token.token)
         return access_token
 
     async def destroy_token(self, token: str) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(token)
         access_token = await self.access_token_db.get_by_token(token)
         if access_token is not None:
             await self.access_token_db.delete(access_token)
+        # Again, in case a concurrent lookup cached the token while it was being deleted
+        if self.cache is not None:
+            self.cache.invalidate(token)
+
+    def _get_max_age(self) -> datetime | None:
+        if self.lifetime_seconds is None:
+            return None
+        return datetime.now(UTC) - timedelta(seconds=self.lifetime_seconds)
+
+    def _get_remaining_lifetime(self, access_token: CachedAccessToken) -> float | None:
+        if self.lifetime_seconds is None:
+            return None
+        expires_at = access_token.created_at + timedelta(seconds=self.lifetime_seconds)
+        return (expires_at - datetime.now(UTC)).total_seconds()
 
     def _create_access_token_dict(self, user: UP) -> dict[str, Any]:
         token = self.generate_token()
         return {"token": token, "user_id": user.id, "scopes": "none", "mfa_scopes": {"email": 0}}
 
     def generate_token(self) -> str:
+        if self.token_secret is not None:
+            return generate_signed_token(self.token_secret, tag=self.token_tag)
+        if self.token_tag is not None:
+            return tag_token(secrets.token_urlsafe(TAGGED_TOKEN_RANDOM_BYTES), self.token_tag)
         return secrets.token_urlsafe()
 
     async def get_latest_token_for_user(self, user: UP) -> AP:
@@ -0,0 +1,251 @@
+import secrets
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import jwt
+
+from filuta_fastapi_users import exceptions, models
+from filuta_fastapi_users.authentication.strategy.base import Strategy, StrategyDestroyNotSupportedError
+from filuta_fastapi_users.authentication.strategy.db.adapter import RevokedTokenDatabase
+from filuta_fastapi_users.authentication.strategy.revocation import RevocationList
+from filuta_fastapi_users.authentication.strategy.token_tag import tag_token, untag_token, validate_token_tag
+from filuta_fastapi_users.jwt import SecretType, decode_jwt, generate_jwt
+from filuta_fastapi_users.manager import BaseUserManager
+
+
+@dataclass
+class JWTAccessToken:
+    """Access token record rebuilt from the claims of a JWT."""
+
+    token: str
+    user_id: Any
+    created_at: datetime
+    scopes: str = "none"
+    mfa_scopes: dict[str, int] = field(default_factory=lambda: {"email": 0})
+    expires_at: datetime | None = None
+    jti: str | None = None
+
+
+class JWTStrategy[UP: "models.UserProtocol[Any]", ID](Strategy[UP, ID, JWTAccessToken]):
+    """
+    Stateless strategy issuing JWT access tokens.
+
+    The user id, `scopes` and `mfa_scopes` are carried in the claims,
+    so reading a token doesn't need any access token storage.
+    Since a JWT can't be modified, `update_token` issues a new token
+    with the updated claims and the same expiration date.
+    Since the tokens aren't stored, `get_latest_token_for_user` has nothing to return:
+    the clients renewing their access token must present it along with the refresh token.
+    Without a revocation list, the renewed token stays valid until it expires.
+
+    :param secret: Secret used to sign the tokens.
+    :param lifetime_seconds: Lifetime of the tokens, in seconds.
+    If None, the tokens never expire.
+    :param token_audience: List of valid audiences for the JWT.
+    :param algorithm: JWT signing algorithm. Defaults to HS256.
+    :param public_key: Optional public key to verify the tokens,
+    for asymmetric algorithms.
+    :param revocation_list: Optional revocation list, shared across requests.
+    When set, `destroy_token` revokes the token, and so does `update_token`
+    for the token it replaces.
+    :param revoked_token_db: Optional revoked token database adapter instance,
+    used along with `revocation_list` to share the revocations between workers.
+    :param token_tag: Optional tag of up to 4 characters prefixing the issued tokens.
+    Set the same tag on the authentication backend, so that the authenticator
+    dispatches the tokens straight to it.
+    """
+
+    def __init__(
+        self,
+        secret: SecretType,
+        lifetime_seconds: int | None,
+        token_audience: list[str] = ["fastapi-users:auth"],
+        algorithm: str = "HS256",
+        public_key: SecretType | None = None,
+        revocation_list: RevocationList | None = None,
+        revoked_token_db: RevokedTokenDatabase[Any] | None = None,
+        token_tag: str | None = None,
+    ):
+        self.secret = secret
+        self.lifetime_seconds = lifetime_seconds
+        self.token_audience = token_audience
+        self.algorithm = algorithm
+        self.public_key = public_key
+        self.revocation_list = revocation_list
+        self.revoked_token_db = revoked_token_db
+        self.token_tag = validate_token_tag(token_tag)
+
+    @property
+    def encode_key(self) -> SecretType:
+        return self.secret
+
+    @property
+    def decode_key(self) -> SecretType:
+        return self.public_key or self.secret
+
+    async def read_token(
+        self,
+        token: str | None,
+        user_manager: BaseUserManager[UP, ID],
+        authorized: bool = False,
+        ignore_expired: bool = False,
+    ) -> UP | None:
+        user, access_token = await self.read_token_record(token, user_manager, ignore_expired)
+        if access_token is None or (authorized and access_token.scopes != "approved"):
+            return None
+        return user
+
+    async def read_token_record(
+        self,
+        token: str | None,
+        user_manager: BaseUserManager[UP, ID],
+        ignore_expired: bool = False,
+    ) -> tuple[UP | None, JWTAccessToken | None]:
+        access_token = await self._get_valid_token(token, verify_exp=not ignore_expired)
+        if access_token is None:
+            return None, None
+
+        try:
+            parsed_id = user_manager.parse_id(access_token.user_id)
+            return await user_manager.get(parsed_id), access_token
+        except exceptions.UserNotExists, exceptions.InvalidID:
+            return None, access_token
+
+    async def get_token_record(self, token: str | None) -> JWTAccessToken | None:
+        return await self._get_valid_token(token, verify_exp=True)
+
+    async def get_token_record_raw(self, token: str | None) -> JWTAccessToken | None:
+        return await self._get_valid_token(token, verify_exp=False)
+
+    async def write_token(self, user: UP) -> JWTAccessToken:
+        return await self.insert_token({"user_id": user.id, "scopes": "none", "mfa_scopes": {"email": 0}})
+
+    async def insert_token(self, access_token_dict: dict[str, Any]) -> JWTAccessToken:
+        created_at = datetime.now(UTC)
+        expires_at = None
+        if self.lifetime_seconds is not None:
+            expires_at = created_at + timedelta(seconds=self.lifetime_seconds)
+
+        return self._encode(
+            user_id=str(access_token_dict["user_id"]),
+            scopes=access_token_dict.get("scopes", "none"),
+            mfa_scopes=access_token_dict.get("mfa_scopes", {"email": 0}),
+            created_at=created_at,
+            expires_at=expires_at,
+            jti=access_token_dict.get("token") or self.generate_token(),
+        )
+
+    async def update_token(self, access_token: JWTAccessToken, data: dict[str, Any]) -> JWTAccessToken:
+        if self.revocation_list is not None:
+            await self._revoke(self.revocation_list, access_token)
+
+        return self._encode(
+            user_id=access_token.user_id,
+            scopes=data.get("scopes", access_token.scopes),
+            mfa_scopes=data.get("mfa_scopes", access_token.mfa_scopes),
+            created_at=datetime.now(UTC),
+            expires_at=access_token.expires_at,
+            jti=self.generate_token(),
+        )
+
+    async def destroy_token(self, token: str) -> None:
+        if self.revocation_list is None:
+            raise StrategyDestroyNotSupportedError("A JWT can't be invalidated without a revocation list.")
+
+        access_token = self._decode(token, verify_exp=False)
+        if access_token is not None:
+            await self._revoke(self.revocation_list, access_token)
+
+    def generate_token(self) -> str:
+        return secrets.token_urlsafe()
+
+    async def get_latest_token_for_user(self, user: UP) -> JWTAccessToken | None:  # type: ignore[override]
+        # Issued tokens aren't stored, the renewal reads the presented one instead
+        return None
+
+    async def _get_valid_token(self, token: str | None, verify_exp: bool) -> JWTAccessToken | None:
+        access_token = self._decode(token, verify_exp)
+        if access_token is None or self.revocation_list is None:
+            return access_token
+
+        if self.revoked_token_db is not None and self.revocation_list.needs_sync():
+            await self.revocation_list.sync(self.revoked_token_db)
+        if self.revocation_list.is_revoked(access_token.jti, access_token.user_id, access_token.created_at):
+            return None
+        return access_token
+
+    async def _revoke(self, revocation_list: RevocationList, access_token: JWTAccessToken) -> None:
+        if access_token.jti is None:
+            return
+
+        revocation_list.revoke(access_token.jti, access_token.expires_at)
+        if self.revoked_token_db is not None:
+            await self.revoked_token_db.create(
+                {
+                    "jti": access_token.jti,
+                    "user_id": access_token.user_id,
+                    "revoked_at": datetime.now(UTC),
+                    "expires_at": access_token.expires_at,
+                    "all_user_tokens": False,
+                }
+            )
+
+    def _encode(
+        self,
+        *,
+        user_id: str,
+        scopes: str,
+        mfa_scopes: dict[str, int],
+        created_at: datetime,
+        expires_at: datetime | None,
+        jti: str,
+    ) -> JWTAccessToken:
+        data: dict[str, Any] = {
+            "sub": user_id,
+            "aud": self.token_audience,
+            "scopes": scopes,
+            "mfa_scopes": mfa_scopes,
+            # Sub-second precision, to compare it with user-wide revocations
+            "iat": created_at.timestamp(),
+            "jti": jti,
+        }
+        if expires_at is not None:
+            data["exp"] = expires_at
+        token = generate_jwt(data, self.encode_key, algorithm=self.algorithm)
+        if self.token_tag is not None:
+            token = tag_token(token, self.token_tag)
+        return JWTAccessToken(
+            token=token,
+            user_id=user_id,
+            created_at=created_at,
+            scopes=scopes,
+            mfa_scopes=mfa_scopes,
+            expires_at=expires_at,
+            jti=jti,
+        )
+
+    def _decode(self, token: str | None, verify_exp: bool) -> JWTAccessToken | None:
+        if token is None:
+            return None
+
+        try:
+            data = decode_jwt(
+                untag_token(token),
+                self.decode_key,
+                self.token_audience,
+                algorithms=[self.algorithm],
+                options={"verify_exp": verify_exp},
+            )
+            expires_at = data.get("exp")
+            return JWTAccessToken(
+                token=token,
+                user_id=data["sub"],
+                created_at=datetime.fromtimestamp(data["iat"], UTC),
+                scopes=data["scopes"],
+                mfa_scopes=data["mfa_scopes"],
+                expires_at=datetime.fromtimestamp(expires_at, UTC) if expires_at is not None else None,
+                jti=data.get("jti"),
+            )
+        except jwt.PyJWTError, KeyError, TypeError, ValueError:
+            return None
@@ -0,0 +1,192 @@
+import hashlib
+import math
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from filuta_fastapi_users import models
+from filuta_fastapi_users.authentication.strategy.db.adapter import RevokedTokenDatabase
+
+
+def _timestamp(value: datetime | None) -> float:
+    return math.inf if value is None else value.timestamp()
+
+
+class BloomFilter:
+    """
+    Probabilistic set: membership tests may yield false positives, never false negatives.
+
+    :param capacity: Number of keys the filter is sized for.
+    :param error_rate: False positive rate once `capacity` keys were added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray(math.ceil(self.size / 8))
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def _positions(self, key: str) -> Iterator[int]:
+        # Double hashing: a single digest provides every probe position
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+
+class RevocationList:
+    """
+    Revoked stateless access tokens, kept in memory.
+
+    Checking a token that isn't revoked usually costs a few bloom filter probes;
+    only the filter hits are confirmed against the exact set.
+    Revocations are pruned once the tokens they target have expired anyway.
+
+    Share a single instance per process, it's thread-safe: checks don't lock,
+    updates are serialized. Workers see each other's revocations
+    by syncing it from a `RevokedTokenDatabase`, which also rebuilds it on startup.
+
+    :param capacity: Expected number of live revocations.
+    The filter is rebuilt bigger if it's exceeded.
+    :param error_rate: False positive rate of the bloom filter.
+    :param token_lifetime_seconds: Lifetime of the tokens, used to expire
+    the revocations of every token of a user. None if the tokens never expire.
+    :param prune_interval_seconds: Minimum delay between two prunings.
+    :param sync_interval_seconds: Delay after which `needs_sync` is True again.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 100_000,
+        error_rate: float = 0.001,
+        token_lifetime_seconds: int | None = None,
+        prune_interval_seconds: float = 60.0,
+        sync_interval_seconds: float = 30.0,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.token_lifetime_seconds = token_lifetime_seconds
+        self.prune_interval_seconds = prune_interval_seconds
+        self.sync_interval_seconds = sync_interval_seconds
+        self._tokens: dict[str, float] = {}
+        self._users: dict[str, tuple[float, float]] = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._next_prune = time.time() + prune_interval_seconds
+        self._next_sync = 0.0
+        self._last_sync: datetime | None = None
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._tokens) + len(self._users)
+
+    def revoke(self, jti: str, expires_at: datetime | None) -> None:
+        """Revoke a single token."""
+        with self._lock:
+            self._tokens[jti] = _timestamp(expires_at)
+            if len(self._tokens) > self._bloom.capacity:
+                self._rebuild()
+            else:
+                self._bloom.add(jti)
+
+    def revoke_user(
+        self,
+        user_id: Any,
+        revoked_at: datetime | None = None,
+        expires_at: datetime | None = None,
+    ) -> tuple[datetime, datetime | None]:
+        """
+        Revoke every token of a user issued until `revoked_at`.
+
+        :return: The revocation date and the date after which the revocation is useless.
+        """
+        if revoked_at is None:
+            revoked_at = datetime.now(UTC)
+        if expires_at is None and self.token_lifetime_seconds is not None:
+            expires_at = revoked_at + timedelta(seconds=self.token_lifetime_seconds)
+
+        revoked_before, until = revoked_at.timestamp(), _timestamp(expires_at)
+        with self._lock:
+            previous = self._users.get(str(user_id))
+            if previous is not None:
+                revoked_before, until = max(revoked_before, previous[0]), max(until, previous[1])
+            self._users[str(user_id)] = (revoked_before, until)
+
+        return revoked_at, expires_at
+
+    def is_revoked(self, jti: str | None, user_id: Any = None, issued_at: datetime | None = None) -> bool:
+        now = time.time()
+        if now >= self._next_prune:
+            self._prune_if_due()
+
+        if user_id is not None and self._users:
+            user_revocation = self._users.get(str(user_id))
+            if user_revocation is not None and (issued_at is None or issued_at.timestamp() <= user_revocation[0]):
+                return True
+
+        if jti is None or jti not in self._bloom:
+            return False
+        return self._tokens.get(jti, 0.0) > now
+
+    def prune(self) -> None:
+        """Forget the revocations of expired tokens."""
+        with self._lock:
+            now = time.time()
+            self._tokens = {jti: expires_at for jti, expires_at in self._tokens.items() if expires_at > now}
+            self._users = {user_id: revocation for user_id, revocation in self._users.items() if revocation[1] > now}
+            self._rebuild()
+            self._next_prune = now + self.prune_interval_seconds
+
+    def _prune_if_due(self) -> None:
+        # Non-blocking: when another thread is already pruning, checking its current state is fine
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if time.time() >= self._next_prune:
+                self.prune()
+        finally:
+            self._lock.release()
+
+    def load(self, revoked_tokens: Iterable[models.RevokedTokenProtocol[Any]]) -> None:
+        """Add revocations read from the database."""
+        for revoked_token in revoked_tokens:
+            if revoked_token.all_user_tokens:
+                self.revoke_user(revoked_token.user_id, revoked_token.revoked_at, revoked_token.expires_at)
+            else:
+                self.revoke(revoked_token.jti, revoked_token.expires_at)
+
+    def needs_sync(self) -> bool:
+        return time.time() >= self._next_sync
+
+    async def sync(self, revoked_token_db: RevokedTokenDatabase[Any]) -> None:
+        """Load the revocations made since the last sync, by any worker."""
+        with self._lock:
+            since = self._last_sync
+            if since is not None:
+                # Overlap the previous sync, to tolerate commit delays and clock skew between workers
+                since -= timedelta(seconds=self.sync_interval_seconds)
+            self._last_sync = datetime.now(UTC)
+            self._next_sync = time.time() + self.sync_interval_seconds
+
+        self.load(await revoked_token_db.get_revoked_since(since))
+
+    def _rebuild(self) -> None:
+        capacity = self.capacity
+        while capacity < len(self._tokens):
+            capacity *= 2
+        # Filled before being swapped in, so that concurrent checks never see a partial filter
+        bloom = BloomFilter(capacity, self.error_rate)
+        for jti in self._tokens:
+            bloom.add(jti)
+        self._bloom = bloom
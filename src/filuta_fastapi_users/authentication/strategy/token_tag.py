@@ -0,0 +1,47 @@
+"""
+Short backend tags prefixing access tokens, like `db~<token>`.
+
+A tag tells which authentication backend issued a token,
+so that the authenticator only asks this backend to read it.
+The separator never appears in `secrets.token_urlsafe` tokens nor in JWTs,
+so untagged tokens are told apart.
+"""
+
+import re
+
+TOKEN_TAG_SEPARATOR = "~"
+TOKEN_TAG_MAX_LENGTH = 4
+TOKEN_TAG_PATTERN = re.compile(rf"^[0-9a-zA-Z_-]{{1,{TOKEN_TAG_MAX_LENGTH}}}$")
+
+# Random bytes of a tagged opaque token, so that it fits the 43 characters of the access token column
+TAGGED_TOKEN_RANDOM_BYTES = 28
+
+
+def validate_token_tag(tag: str | None) -> str | None:
+    """
+    Check a token tag.
+
+    :raises ValueError: The tag is longer than 4 characters, or isn't made of URL-safe characters.
+    """
+    if tag is not None and TOKEN_TAG_PATTERN.match(tag) is None:
+        raise ValueError(f"Invalid token tag {tag!r}: expected 1 to {TOKEN_TAG_MAX_LENGTH} URL-safe characters.")
+    return tag
+
+
+def tag_token(token: str, tag: str) -> str:
+    return f"{tag}{TOKEN_TAG_SEPARATOR}{token}"
+
+
+def get_token_tag(token: str) -> str | None:
+    index = token.find(TOKEN_TAG_SEPARATOR, 0, TOKEN_TAG_MAX_LENGTH + 1)
+    if index <= 0:
+        return None
+    return token[:index]
+
+
+def untag_token(token: str) -> str:
+    """Strip the tag of a token, if any."""
+    tag = get_token_tag(token)
+    if tag is None:
+        return token
+    return token[len(tag) + len(TOKEN_TAG_SEPARATOR) :]
@@ -1,3 +1,4 @@
+from collections.abc import Sequence
 from typing import Any
 
 from filuta_fastapi_users.models import ID, OAP, UOAP, UP
@@ -19,10 +20,24 @@ class BaseUserDatabase[UP, ID]:
         """Get a single user by OAuth account id."""
         raise NotImplementedError()
 
+    async def get_existing_emails(self, emails: Sequence[str]) -> set[str]:
+        """Get the lowercased emails, among the given ones, already used by a user."""
+        raise NotImplementedError()
+
     async def create(self, create_dict: dict[str, Any]) -> UP:
         """Create a user."""
         raise NotImplementedError()
 
+    async def create_many(self, create_dicts: Sequence[dict[str, Any]]) -> list[Exception | None]:
+        """
+        Create users in bulk.
+
+        :param create_dicts: Values of the users to create.
+        :return: For each user, the error which prevented its creation, or `None`.
+        A failing user doesn't prevent the others from being created.
+        """
+        raise NotImplementedError()
+
     async def update(self, user: UP, update_dict: dict[str, Any]) -> UP:
         """Update a user."""
         raise NotImplementedError()
@@ -31,6 +46,16 @@ class BaseUserDatabase[UP, ID]:
         """Delete a user."""
         raise NotImplementedError()
 
+    async def update_password_hashes(self, updates: Sequence[tuple[ID, str, str]]) -> int:
+        """
+        Replace password hashes in a batch.
+
+        :param updates: Tuples of a user id, the hash the password is expected to have
+        and the new hash. A user whose hash changed in the meantime is left untouched.
+        :return: The number of updated users.
+        """
+        raise NotImplementedError()
+
     async def add_oauth_account(self: BaseUserDatabase[UOAP, ID], user: UOAP, create_dict: dict[str, Any]) -> UOAP:
         """Create an OAuth account and add it to the user."""
         raise NotImplementedError()
@@ -36,3 +36,8 @@ class InvalidResetPasswordToken(FastAPIUsersException):
 class InvalidPasswordException(FastAPIUsersException):
     def __init__(self, reason: Any) -> None:
         self.reason = reason
+
+
+class PasswordHashingOverloaded(FastAPIUsersException):
+    def __init__(self, retry_after: int) -> None:
+        self.retry_after = retry_after
@@ -37,9 +37,15 @@ class FastAPIUsers[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTokenPr
     :param get_user_manager: Dependency callable getter to inject the
     user manager class instance.
     :param auth_backends: List of authentication backends.
+    :param lazy_strategies: If `True`, the strategy of a backend is only resolved
+    when its transport found a token in the request. See `Authenticator`.
+    :param concurrent_backends: If `True`, the tokens of several backends
+    are read concurrently. See `Authenticator`.
 
     :attribute current_user: Dependency callable getter to inject authenticated user
     with a specific set of parameters.
+    :attribute current_principal: Dependency callable getter to inject the principal
+    of the authenticated user, without loading the user record.
     """
 
     authenticator: Authenticator[UP, ID, AP]
@@ -52,11 +58,19 @@ class FastAPIUsers[UP: "models.UserProtocol[Any]", ID, AP: "models.AccessTokenPr
         get_otp_manager: OtpManagerDependency[models.OTPTP],
         requires_verification: bool = False,
         refresh_token_lifetime_seconds: int | None = None,
+        lazy_strategies: bool = False,
+        concurrent_backends: bool = False,
     ):
-        self.authenticator = Authenticator(auth_backends, get_user_manager)
+        self.authenticator = Authenticator(
+            auth_backends,
+            get_user_manager,
+            lazy_strategies=lazy_strategies,
+            concurrent_backends=concurrent_backends,
+        )
         self.get_user_manager = get_user_manager
         self.get_refresh_token_manager = get_refresh_token_manager
         self.current_user = self.authenticator.current_user
+        self.current_principal = self.authenticator.current_principal
         self.get_otp_manager = get_otp_manager
         self.requires_verification = requires_verification
         self.refresh_token_lifetime_seconds = refresh_token_lifetime_seconds
@@ -1,9 +1,11 @@
 """FastAPI Users database adapter for SQLAlchemy."""
 
 import uuid
-from typing import TYPE_CHECKING, Any
+from collections.abc import Sequence
+from typing import TYPE_CHECKING, Any, ClassVar
 
-from sqlalchemy import Boolean, ForeignKey, Integer, String, func, select
+from sqlalchemy import Boolean, ForeignKey, Integer, String, and_, bindparam, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, declared_attr, mapped_column
 from sqlalchemy.sql import Select
@@ -11,7 +13,8 @@ from sqlalchemy.sql import Select
 from filuta_fastapi_users import models
 from filuta_fastapi_users.db.base import BaseUserDatabase
 
-from .generics import GUID
+from .generics import GUID, commit, commit_and_load
+from .replica import ReadRouter, RecentWrites
 
 __version__ = "6.0.1"
 
@@ -47,6 +50,23 @@ class SQLAlchemyBaseUserTableUUID(SQLAlchemyBaseUserTable[UUID_ID]):
         id: Mapped[UUID_ID] = mapped_column(GUID, primary_key=True, default=uuid.uuid4)
 
 
+class SQLAlchemyNormalizedEmailMixin:
+    """
+    Lowercased copy of the email, for case-insensitive lookups using a plain unique index.
+
+    Without it, `SQLAlchemyUserDatabase` compares `lower(email)`, which can't use the index on `email`.
+    A functional index serves that comparison too, like `Index("ix_user_email_lower", func.lower(email), unique=True)`
+    in the table arguments, or `CREATE UNIQUE INDEX ix_user_email_lower ON "user" (lower(email))`.
+    The adapter fills the column on writes. Existing users are found by `lower(email)` until
+    `SQLAlchemyUserDatabase.backfill_normalized_emails` has filled theirs, see `normalized_emails_backfilled`.
+    """
+
+    if TYPE_CHECKING:  # pragma: no cover
+        normalized_email: str | None
+    else:
+        normalized_email: Mapped[str | None] = mapped_column(String(length=320), unique=True, index=True, nullable=True)
+
+
 class SQLAlchemyBaseOAuthAccountTable[ID]:
     """Base SQLAlchemy OAuth account table definition."""
 
@@ -92,29 +112,50 @@ class SQLAlchemyUserDatabase[
     :param session: SQLAlchemy session instance.
     :param user_table: SQLAlchemy user model.
     :param oauth_account_table: Optional SQLAlchemy OAuth accounts model.
+    :param insert_chunk_size: Maximum number of users inserted per statement by `create_many`.
+    :param autocommit: Whether each write commits. Disable it when the session
+    is committed once per request, see `get_unit_of_work_dependency`: writes are then only flushed.
+    :param read_session: Optional session on a read replica, for the lookups. See `ReadRouter`.
+    :param recent_writes: Optional tracker of the rows written recently, read from the primary.
+    :param normalized_emails_backfilled: Whether every user has a normalized email, see
+    `SQLAlchemyNormalizedEmailMixin`. Until then, the email lookups also compare `lower(email)`
+    for the users without one, which can't use the index of the normalized email.
     """
 
     session: AsyncSession
     user_table: type[UOAP]
     oauth_account_table: type[SQLAlchemyBaseOAuthAccountTable[uuid.UUID]] | None
 
+    _lookup_statements: ClassVar[dict[tuple[Any, str, bool], Select[Any]]] = {}
+
     def __init__(
         self,
         session: AsyncSession,
         user_table: type[UOAP],
         oauth_account_table: type[SQLAlchemyBaseOAuthAccountTable[uuid.UUID]] | None = None,
+        insert_chunk_size: int = 500,
+        autocommit: bool = True,
+        read_session: AsyncSession | None = None,
+        recent_writes: RecentWrites | None = None,
+        normalized_emails_backfilled: bool = False,
     ):
         self.session = session
         self.user_table = user_table
         self.oauth_account_table = oauth_account_table
+        self.insert_chunk_size = insert_chunk_size
+        self.autocommit = autocommit
+        self.reads = ReadRouter(session, read_session, recent_writes)
+        self.normalized_emails_backfilled = normalized_emails_backfilled
 
     async def get(self, id: ID) -> UOAP | None:
-        statement = select(self.user_table).where(self.user_table.id == id)
-        return await self._get_user(statement)
+        statement = self._get_lookup_statement("id")
+        return await self.reads.scalar_one_or_none(statement, {"id": id}, retry_miss=True)
 
     async def get_by_email(self, email: str) -> UOAP | None:
-        statement = select(self.user_table).where(func.lower(self.user_table.email) == func.lower(email))
-        return await self._get_user(statement)
+        statement = self._get_lookup_statement("email")
+        return await self.reads.scalar_one_or_none(
+            statement, {"email": email, "normalized_email": email.lower()}, retry_miss=True
+        )
 
     async def get_by_oauth_account(self, oauth: str, account_id: str) -> UOAP | None:
         if self.oauth_account_table is None:
@@ -129,23 +170,165 @@ class SQLAlchemyUserDatabase[
         return await self._get_user(statement)
 
     async def create(self, create_dict: dict[str, Any]) -> UOAP:
-        user = self.user_table(**create_dict)
+        user = self.user_table(**self._normalize_email(create_dict))
         self.session.add(user)
-        await self.session.commit()
-        await self.session.refresh(user)
+        await commit_and_load(self.session, user, inserted=True, autocommit=self.autocommit)
         return user
 
+    async def get_existing_emails(self, emails: Sequence[str]) -> set[str]:
+        lowered_emails = {email.lower() for email in emails}
+        if not lowered_emails:
+            return set()
+
+        if self.normalizes_emails:
+            normalized_email = self.user_table.normalized_email  # type: ignore[attr-defined]
+            statement = select(normalized_email).where(normalized_email.in_(lowered_emails))
+            if not self.normalized_emails_backfilled:
+                lowered_email = func.lower(self.user_table.email)
+                statement = select(func.coalesce(normalized_email, lowered_email)).where(
+                    or_(
+                        normalized_email.in_(lowered_emails),
+                        and_(normalized_email.is_(None), lowered_email.in_(lowered_emails)),
+                    )
+                )
+        else:
+            statement = select(func.lower(self.user_table.email)).where(
+                func.lower(self.user_table.email).in_(lowered_emails)
+            )
+        results = await self.session.execute(statement)
+        return set(results.scalars().all())
+
+    async def create_many(self, create_dicts: Sequence[dict[str, Any]]) -> list[Exception | None]:
+        table: Any = self.user_table.__table__  # type: ignore[attr-defined]
+        errors: list[Exception | None] = [None] * len(create_dicts)
+        create_dicts = [self._normalize_email(create_dict) for create_dict in create_dicts]
+
+        # Multi-row statements need the same columns on every row
+        indexes_by_columns: dict[tuple[str, ...], list[int]] = {}
+        for index, create_dict in enumerate(create_dicts):
+            indexes_by_columns.setdefault(tuple(sorted(create_dict)), []).append(index)
+
+        for indexes in indexes_by_columns.values():
+            for i in range(0, len(indexes), self.insert_chunk_size):
+                chunk = indexes[i : i + self.insert_chunk_size]
+                statement = insert(table).values([create_dicts[index] for index in chunk])
+                if await self._try_insert(statement) is not None:
+                    # Insert the chunk row by row, to tell the failing users apart
+                    for index in chunk:
+                        errors[index] = await self._try_insert(insert(table).values(create_dicts[index]))
+        self.reads.add_inserted(
+            table, [create_dict for create_dict, error in zip(create_dicts, errors, strict=True) if error is None]
+        )
+        return errors
+
+    async def _try_insert(self, statement: Any) -> Exception | None:
+        if not self.autocommit:
+            # Only undo this statement, the rest of the request transaction is kept
+            try:
+                async with self.session.begin_nested():
+                    await self.session.execute(statement)
+            except IntegrityError as e:
+                return e
+            return None
+
+        try:
+            await self.session.execute(statement)
+            await self.session.commit()
+        except IntegrityError as e:
+            await self.session.rollback()
+            return e
+        return None
+
     async def update(self, user: UOAP, update_dict: dict[str, Any]) -> UOAP:
-        for key, value in update_dict.items():
+        for key, value in self._normalize_email(update_dict).items():
             setattr(user, key, value)
         self.session.add(user)
-        await self.session.commit()
-        await self.session.refresh(user)
+        await commit_and_load(self.session, user, inserted=False, autocommit=self.autocommit)
         return user
 
     async def delete(self, user: UOAP) -> None:
         await self.session.delete(user)
-        await self.session.commit()
+        await commit(self.session, self.autocommit)
+
+    async def update_password_hashes(self, updates: Sequence[tuple[ID, str, str]]) -> int:
+        if not updates:
+            return 0
+
+        table: Any = self.user_table.__table__  # type: ignore[attr-defined]
+        # Compare-and-swap, so that a password changed since the hash was read is kept
+        statement = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.hashed_password == bindparam("b_old_hashed_password"))
+            .values(hashed_password=bindparam("b_hashed_password"))
+        )
+        result: Any = await self.session.execute(
+            statement,
+            [
+                {"b_id": id, "b_old_hashed_password": old_hashed_password, "b_hashed_password": hashed_password}
+                for id, old_hashed_password, hashed_password in updates
+            ],
+        )
+        await commit(self.session, self.autocommit)
+        return result.rowcount
+
+    async def backfill_normalized_emails(self, batch_size: int = 1000) -> tuple[int, list[ID]]:
+        """
+        Fill the normalized email of the users created before `SQLAlchemyNormalizedEmailMixin` was added.
+
+        Users are updated in batches, each in its own transaction, to keep the locks short on large tables.
+        Emails are normalized in Python, like on writes and lookups: the `LOWER` of the databases
+        may leave non-ASCII characters untouched.
+
+        Emails only differing by their case collide on the unique normalized email: the first user keeps it,
+        the others are left without one and returned, to be merged or renamed. Once none is left,
+        the column can be made non-nullable and the adapter created with `normalized_emails_backfilled`.
+
+        :param batch_size: Maximum number of users updated per transaction.
+        :return: The number of updated users and the ids of the colliding ones.
+        """
+        if not self.normalizes_emails:
+            raise NotImplementedError()
+
+        table: Any = self.user_table.__table__  # type: ignore[attr-defined]
+        # Paginated by id, so that the colliding users left without a normalized email aren't read again
+        select_statement = (
+            select(table.c.id, table.c.email)
+            .where(table.c.normalized_email.is_(None))
+            .order_by(table.c.id)
+            .limit(batch_size)
+        )
+        update_statement = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(normalized_email=bindparam("b_normalized_email"))
+        )
+        updated = 0
+        collisions: list[ID] = []
+        last_id = None
+        while True:
+            statement = select_statement if last_id is None else select_statement.where(table.c.id > last_id)
+            results = await self.session.execute(statement)
+            rows = results.all()
+            if not rows:
+                return updated, collisions
+
+            values = [{"b_id": id, "b_normalized_email": email.lower()} for id, email in rows]
+            try:
+                await self.session.execute(update_statement, values)
+                await self.session.commit()
+                updated += len(rows)
+            except IntegrityError:
+                await self.session.rollback()
+                # Update the batch user by user, to tell the colliding ones apart
+                for value in values:
+                    try:
+                        await self.session.execute(update_statement, [value])
+                        await self.session.commit()
+                        updated += 1
+                    except IntegrityError:
+                        await self.session.rollback()
+                        collisions.append(value["b_id"])
+            last_id = rows[-1][0]
 
     async def add_oauth_account(self, user: UOAP, create_dict: dict[str, Any]) -> UOAP:
         if self.oauth_account_table is None:
@@ -157,7 +340,7 @@ class SQLAlchemyUserDatabase[
         user.oauth_accounts.append(oauth_account)
         self.session.add(user)
 
-        await self.session.commit()
+        await commit(self.session, self.autocommit)
 
         return user
 
@@ -168,10 +351,42 @@ class SQLAlchemyUserDatabase[
         for key, value in update_dict.items():
             setattr(oauth_account, key, value)
         self.session.add(oauth_account)
-        await self.session.commit()
+        await commit(self.session, self.autocommit)
 
         return user
 
+    def _get_lookup_statement(self, field: str) -> Select[Any]:
+        """Get the statement looking a user up by id or email, built once per user table."""
+        key = (self.user_table, field, self.normalized_emails_backfilled)
+        statement = self._lookup_statements.get(key)
+        if statement is not None:
+            return statement
+
+        lowered_email_matches = func.lower(self.user_table.email) == func.lower(bindparam("email", type_=String))
+        if field == "id":
+            statement = select(self.user_table).where(self.user_table.id == bindparam("id"))
+        elif self.normalizes_emails:
+            normalized_email = self.user_table.normalized_email  # type: ignore[attr-defined]
+            normalized_email_matches = normalized_email == bindparam("normalized_email")
+            if self.normalized_emails_backfilled:
+                statement = select(self.user_table).where(normalized_email_matches)
+            else:
+                statement = select(self.user_table).where(
+                    or_(normalized_email_matches, and_(normalized_email.is_(None), lowered_email_matches))
+                )
+        else:
+            statement = select(self.user_table).where(lowered_email_matches)
+        return self._lookup_statements.setdefault(key, statement)
+
+    @property
+    def normalizes_emails(self) -> bool:
+        """Whether the user table has the `SQLAlchemyNormalizedEmailMixin` column, used by the email lookups."""
+        return hasattr(self.user_table, "normalized_email")
+
+    def _normalize_email(self, values: dict[str, Any]) -> dict[str, Any]:
+        if self.normalizes_emails and values.get("email") is not None:
+            return {**values, "normalized_email": values["email"].lower()}
+        return values
+
     async def _get_user(self, statement: Select[Any]) -> UOAP | None:
-        results = await self.session.execute(statement)
-        return results.unique().scalar_one_or_none()
+        return await self.reads.scalar_one_or_none(statement)
@@ -2,14 +2,16 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING, Any, ClassVar
 
-from sqlalchemy import JSON, ForeignKey, String, select
+from sqlalchemy import JSON, ForeignKey, String, bindparam, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, declared_attr, mapped_column
+from sqlalchemy.sql import Select
 
 from filuta_fastapi_users import models
-from filuta_fastapi_users.authentication import AccessTokenDatabase
+from filuta_fastapi_users.authentication import AccessTokenDatabase, JoinedAccessTokenDatabase
 
-from .generics import GUID, TIMESTAMPAware, now_utc
+from .generics import GUID, TIMESTAMPAware, commit, commit_and_load, now_utc
+from .replica import ReadRouter, RecentWrites
 
 
 class SQLAlchemyBaseAccessTokenTable[ID]:
@@ -40,21 +42,36 @@ class SQLAlchemyBaseAccessTokenTableUUID(SQLAlchemyBaseAccessTokenTable[uuid.UUI
             return mapped_column(GUID, ForeignKey("user.id", ondelete="cascade"), nullable=False)
 
 
-class SQLAlchemyAccessTokenDatabase[AP](AccessTokenDatabase[AP]):
+class SQLAlchemyAccessTokenDatabase[AP](AccessTokenDatabase[AP], JoinedAccessTokenDatabase[AP]):
     """
     Access token database adapter for SQLAlchemy.
 
     :param session: SQLAlchemy session instance.
     :param access_token_table: SQLAlchemy access token model.
+    :param user_table: Optional SQLAlchemy user model.
+    Required by `get_by_token_with_user`.
+    :param autocommit: Whether each write commits. Disable it when the session
+    is committed once per request, see `get_unit_of_work_dependency`: writes are then only flushed.
+    :param read_session: Optional session on a read replica, for the lookups. See `ReadRouter`.
+    :param recent_writes: Optional tracker of the rows written recently, read from the primary.
     """
 
+    _token_statements: ClassVar[dict[tuple[Any, ...], Select[Any]]] = {}
+
     def __init__(
         self,
         session: AsyncSession,
         access_token_table: type[AP],
+        user_table: type[Any] | None = None,
+        autocommit: bool = True,
+        read_session: AsyncSession | None = None,
+        recent_writes: RecentWrites | None = None,
     ):
         self.session = session
         self.access_token_table = access_token_table
+        self.user_table = user_table
+        self.autocommit = autocommit
+        self.reads = ReadRouter(session, read_session, recent_writes)
 
     async def get_by_token(
         self,
@@ -63,24 +80,32 @@ class SQLAlchemyAccessTokenDatabase[AP](AccessTokenDatabase[AP]):
         authorized: bool = False,
         ignore_expired: bool = False,
     ) -> AP | None:
-        statement = select(self.access_token_table).where(self.access_token_table.token == token)  # type: ignore[attr-defined]
-
-        if ignore_expired:
-            max_age = None
-        if max_age is not None:
-            statement = statement.where(self.access_token_table.created_at >= max_age)  # type: ignore[attr-defined]
-
-        if authorized:
-            statement = statement.where(self.access_token_table.scopes == "approved")  # type: ignore[attr-defined]
+        max_age = None if ignore_expired else max_age
+        statement = self._get_token_statement(False, max_age is not None, authorized)
+        return await self.reads.scalar_one_or_none(statement, {"token": token, "max_age": max_age}, retry_miss=True)
 
-        results = await self.session.execute(statement)
-        return results.scalar_one_or_none()
+    async def get_by_token_with_user(
+        self,
+        token: str,
+        max_age: datetime | None = None,
+        authorized: bool = False,
+        ignore_expired: bool = False,
+    ) -> tuple[AP, Any] | None:
+        if self.user_table is None:
+            raise ValueError("Looking up the user along with the token requires the user_table of the adapter.")
+
+        max_age = None if ignore_expired else max_age
+        statement = self._get_token_statement(True, max_age is not None, authorized)
+        row = await self.reads.one_or_none(statement, {"token": token, "max_age": max_age}, retry_miss=True)
+        if row is None:
+            return None
+        access_token, user = row
+        return access_token, user
 
     async def create(self, create_dict: dict[str, Any]) -> AP:
         access_token = self.access_token_table(**create_dict)
         self.session.add(access_token)
-        await self.session.commit()
-        await self.session.refresh(access_token)
+        await commit_and_load(self.session, access_token, inserted=True, autocommit=self.autocommit)
         return access_token
 
     async def update(self, access_token: AP, update_dict: dict[str, Any]) -> AP:
@@ -89,13 +114,12 @@ class SQLAlchemyAccessTokenDatabase[AP](AccessTokenDatabase[AP]):
 
         self.session.add(access_token)
 
-        await self.session.commit()
-        await self.session.refresh(access_token)
+        await commit_and_load(self.session, access_token, inserted=False, autocommit=self.autocommit)
         return access_token
 
     async def delete(self, access_token: AP) -> None:
         await self.session.delete(access_token)
-        await self.session.commit()
+        await commit(self.session, self.autocommit)
 
     async def delete_all_records_for_user(self, user: models.UP) -> None:
         statement = select(self.access_token_table).where(self.access_token_table.user_id == user.id)  # type: ignore[attr-defined]
@@ -105,13 +129,41 @@ class SQLAlchemyAccessTokenDatabase[AP](AccessTokenDatabase[AP]):
         for token in tokens:
             await self.session.delete(token)
 
-        await self.session.commit()
+        await commit(self.session, self.autocommit)
 
     async def get_latest_token_for_user(self, user: models.UP) -> AP:
-        results = await self.session.execute(
+        return await self.reads.scalar_one_or_none(
             select(self.access_token_table)
             .where(self.access_token_table.user_id == user.id)  # type: ignore[attr-defined]
             .order_by(self.access_token_table.created_at.desc())  # type: ignore
             .limit(1)
         )
-        return results.scalar_one_or_none()
+
+    def _get_token_statement(self, with_user: bool, with_max_age: bool, authorized: bool) -> Select[Any]:
+        """
+        Get the token lookup statement, with the token and the maximum age as bound parameters.
+
+        Statements are built once per tables and filters, which also spares SQLAlchemy
+        the computation of their cache key on every lookup.
+        """
+        user_table = self.user_table if with_user else None
+        key = (self.access_token_table, user_table, with_max_age, authorized)
+        statement = self._token_statements.get(key)
+        if statement is not None:
+            return statement
+
+        if user_table is None:
+            statement = select(self.access_token_table)
+        else:
+            statement = select(self.access_token_table, user_table).join(
+                user_table,
+                user_table.id == self.access_token_table.user_id,  # type: ignore[attr-defined]
+            )
+
+        statement = statement.where(self.access_token_table.token == bindparam("token"))  # type: ignore[attr-defined]
+        if with_max_age:
+            statement = statement.where(self.access_token_table.created_at >= bindparam("max_age"))  # type: ignore[attr-defined]
+        if authorized:
+            statement = statement.where(self.access_token_table.scopes == "approved")  # type: ignore[attr-defined]
+
+        return self._token_statements.setdefault(key, statement)
@@ -3,8 +3,11 @@ from typing import Any
 from uuid import UUID
 
 from pydantic import UUID4
+from sqlalchemy import inspect
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.engine import Dialect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import attributes
 from sqlalchemy.types import CHAR, TIMESTAMP, TypeDecorator, TypeEngine
 
 
@@ -66,3 +69,61 @@ class TIMESTAMPAware(TypeDecorator[datetime]):  # pragma: no cover
         if value is not None and dialect.name != "postgresql":
             return value.replace(tzinfo=UTC)
         return value
+
+
+async def commit(session: AsyncSession, autocommit: bool) -> None:
+    """Commit the session, or only flush it if it's committed at the end of the request."""
+    if autocommit:
+        await session.commit()
+    else:
+        await session.flush()
+
+
+async def commit_and_load(session: AsyncSession, instance: Any, inserted: bool, autocommit: bool = True) -> None:
+    """
+    Commit a created or updated instance, keeping its attributes loaded.
+
+    On dialects supporting INSERT/UPDATE ... RETURNING, the flush fetches
+    the server-generated values with the write itself. The loaded state is then
+    restored once the commit has expired it, instead of refreshing the instance
+    with an extra SELECT. Other dialects fall back to a refresh.
+
+    :param session: SQLAlchemy session instance.
+    :param instance: The instance added to the session.
+    :param inserted: Whether the instance is new, rather than updated.
+    :param autocommit: If `False`, the session is only flushed,
+    which doesn't expire the instance.
+    """
+    if not autocommit:
+        await session.flush()
+        unloaded = _get_unloaded_columns(instance, inspect(instance).dict)
+        if unloaded:
+            await session.refresh(instance, attribute_names=unloaded)
+        return
+
+    dialect = session.get_bind().dialect
+    if not (dialect.insert_returning if inserted else dialect.update_returning):
+        await session.commit()
+        await session.refresh(instance)
+        return
+
+    await session.flush()
+    state = inspect(instance)
+    loaded = {key: state.dict[key] for key in state.mapper.attrs.keys() if key in state.dict}
+    if inserted:
+        # Nothing can reference a row which was just inserted
+        for relationship in state.mapper.relationships:
+            if relationship.uselist and relationship.key not in loaded:
+                loaded[relationship.key] = []
+    unloaded = _get_unloaded_columns(instance, loaded)
+
+    await session.commit()
+    for key, value in loaded.items():
+        attributes.set_committed_value(instance, key, value)
+    if unloaded:
+        await session.refresh(instance, attribute_names=unloaded)
+
+
+def _get_unloaded_columns(instance: Any, loaded: dict[str, Any]) -> list[str]:
+    # Server-side values the flush didn't fetch, like those of an `onupdate` server default
+    return [key for key in inspect(instance).mapper.column_attrs.keys() if key not in loaded]
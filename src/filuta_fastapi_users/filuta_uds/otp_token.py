@@ -7,7 +7,8 @@ from sqlalchemy.orm import Mapped, mapped_column
 
 from filuta_fastapi_users.authentication import OtpTokenDatabase
 
-from .generics import TIMESTAMPAware, now_utc
+from .generics import TIMESTAMPAware, commit, commit_and_load, now_utc
+from .replica import ReadRouter, RecentWrites
 
 
 class SQLAlchemyBaseOtpTokenTable[ID]:
@@ -22,7 +23,8 @@ class SQLAlchemyBaseOtpTokenTable[ID]:
         created_at: ClassVar[datetime]
         expire_at: ClassVar[datetime]
     else:
-        access_token: Mapped[str] = mapped_column(String(length=43), primary_key=True)
+        # Unbounded: self-contained access tokens, like the ones of JWTStrategy, have no fixed length
+        access_token: Mapped[str] = mapped_column(String, primary_key=True)
         mfa_type: Mapped[str] = mapped_column(String(length=43), primary_key=True)
         mfa_token: Mapped[str] = mapped_column(String(length=43), primary_key=True)
         created_at: Mapped[datetime] = mapped_column(
@@ -39,23 +41,31 @@ class SQLAlchemyOtpTokenDatabase[OTPTP](OtpTokenDatabase[OTPTP]):
 
     :param session: SQLAlchemy session instance.
     :param otp_token_table: SQLAlchemy OTP token model.
+    :param autocommit: Whether each write commits. Disable it when the session
+    is committed once per request, see `get_unit_of_work_dependency`: writes are then only flushed.
+    :param read_session: Optional session on a read replica, for the lookups. See `ReadRouter`.
+    :param recent_writes: Optional tracker of the rows written recently, read from the primary.
     """
 
     def __init__(
         self,
         session: AsyncSession,
         otp_token_table: type[OTPTP],
+        autocommit: bool = True,
+        read_session: AsyncSession | None = None,
+        recent_writes: RecentWrites | None = None,
     ):
         self.session = session
         self.otp_token_table = otp_token_table
+        self.autocommit = autocommit
+        self.reads = ReadRouter(session, read_session, recent_writes)
 
     async def get_by_access_token(self, access_token: str, max_age: datetime | None = None) -> OTPTP | None:
         statement = select(self.otp_token_table).where(self.otp_token_table.access_token == access_token)  # type: ignore[attr-defined]
         if max_age is not None:
             statement = statement.where(self.otp_token_table.created_at >= max_age)  # type: ignore[attr-defined]
 
-        results = await self.session.execute(statement)
-        return results.scalar_one_or_none()
+        return await self.reads.scalar_one_or_none(statement)
 
     async def find_otp_token(
         self, access_token: str, mfa_type: str, mfa_token: str, only_valid: bool = False
@@ -71,8 +81,7 @@ class SQLAlchemyOtpTokenDatabase[OTPTP](OtpTokenDatabase[OTPTP]):
             current_utc_time = datetime.utcnow()
             statement = statement.where(self.otp_token_table.expire_at > current_utc_time)  # type: ignore[attr-defined]
 
-        results = await self.session.execute(statement)
-        return results.scalar_one_or_none()
+        return await self.reads.scalar_one_or_none(statement)
 
     async def user_has_token(self, access_token: str, mfa_type: str) -> OTPTP | None:
         statement = (
@@ -81,24 +90,21 @@ class SQLAlchemyOtpTokenDatabase[OTPTP](OtpTokenDatabase[OTPTP]):
             .where(self.otp_token_table.mfa_type == mfa_type)  # type: ignore[attr-defined]
         )
 
-        results = await self.session.execute(statement)
-        return results.scalar_one_or_none()
+        return await self.reads.scalar_one_or_none(statement)
 
     async def create(self, create_dict: dict[str, Any]) -> OTPTP:
         otp_token = self.otp_token_table(**create_dict)
         self.session.add(otp_token)
-        await self.session.commit()
-        await self.session.refresh(otp_token)
+        await commit_and_load(self.session, otp_token, inserted=True, autocommit=self.autocommit)
         return otp_token
 
     async def update(self, otp_token: OTPTP, update_dict: dict[str, Any]) -> OTPTP:
         for key, value in update_dict.items():
             setattr(otp_token, key, value)
         self.session.add(otp_token)
-        await self.session.commit()
-        await self.session.refresh(otp_token)
+        await commit_and_load(self.session, otp_token, inserted=False, autocommit=self.autocommit)
         return otp_token
 
     async def delete(self, otp_token: OTPTP) -> None:
         await self.session.delete(otp_token)
-        await self.session.commit()
+        await commit(self.session, self.autocommit)
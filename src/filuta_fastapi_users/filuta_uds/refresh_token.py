@@ -9,7 +9,8 @@ from sqlalchemy.orm import Mapped, declared_attr, mapped_column
 from filuta_fastapi_users import models
 from filuta_fastapi_users.authentication import RefreshTokenDatabase
 
-from .generics import GUID, TIMESTAMPAware, now_utc
+from .generics import GUID, TIMESTAMPAware, commit, commit_and_load, now_utc
+from .replica import ReadRouter, RecentWrites
 
 
 class SQLAlchemyBaseRefreshTokenTable[ID]:
@@ -44,42 +45,48 @@ class SQLAlchemyRefreshTokenDatabase[RTP](RefreshTokenDatabase[RTP]):
 
     :param session: SQLAlchemy session instance.
     :param refresh_token_table: SQLAlchemy refresh token model.
+    :param autocommit: Whether each write commits. Disable it when the session
+    is committed once per request, see `get_unit_of_work_dependency`: writes are then only flushed.
+    :param read_session: Optional session on a read replica, for the lookups. See `ReadRouter`.
+    :param recent_writes: Optional tracker of the rows written recently, read from the primary.
     """
 
     def __init__(
         self,
         session: AsyncSession,
         refresh_token_table: type[RTP],
+        autocommit: bool = True,
+        read_session: AsyncSession | None = None,
+        recent_writes: RecentWrites | None = None,
     ):
         self.session = session
         self.refresh_token_table = refresh_token_table
+        self.autocommit = autocommit
+        self.reads = ReadRouter(session, read_session, recent_writes)
 
     async def get_by_token(self, token: str, max_age: datetime | None = None) -> RTP | None:
         statement = select(self.refresh_token_table).where(self.refresh_token_table.token == token)  # type: ignore[attr-defined]
         if max_age is not None:
             statement = statement.where(self.refresh_token_table.created_at >= max_age)  # type: ignore[attr-defined]
 
-        results = await self.session.execute(statement)
-        return results.scalar_one_or_none()
+        return await self.reads.scalar_one_or_none(statement, retry_miss=True)
 
     async def create(self, create_dict: dict[str, Any]) -> RTP:
         refresh_token = self.refresh_token_table(**create_dict)
         self.session.add(refresh_token)
-        await self.session.commit()
-        await self.session.refresh(refresh_token)
+        await commit_and_load(self.session, refresh_token, inserted=True, autocommit=self.autocommit)
         return refresh_token
 
     async def update(self, refresh_token: RTP, update_dict: dict[str, Any]) -> RTP:
         for key, value in update_dict.items():
             setattr(refresh_token, key, value)
         self.session.add(refresh_token)
-        await self.session.commit()
-        await self.session.refresh(refresh_token)
+        await commit_and_load(self.session, refresh_token, inserted=False, autocommit=self.autocommit)
         return refresh_token
 
     async def delete(self, refresh_token: RTP) -> None:
         await self.session.delete(refresh_token)
-        await self.session.commit()
+        await commit(self.session, self.autocommit)
 
     async def delete_all_records_for_user(self, user: models.UP) -> None:
         statement = select(self.refresh_token_table).where(self.refresh_token_table.user_id == user.id)  # type: ignore[attr-defined]
@@ -89,4 +96,4 @@ class SQLAlchemyRefreshTokenDatabase[RTP](RefreshTokenDatabase[RTP]):
         for token in tokens:
             await self.session.delete(token)
 
-        await self.session.commit()
+        await commit(self.session, self.autocommit)
@@ -0,0 +1,234 @@
+import operator
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable, Iterable, Iterator
+from typing import Any
+
+from sqlalchemy import BindParameter, Column, Row, Table, event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement, Select, visitors
+from sqlalchemy.sql.elements import BinaryExpression
+from sqlalchemy.sql.functions import FunctionElement
+
+WROTE_INFO_KEY = "filuta_fastapi_users_wrote"
+
+
+class RecentWrites:
+    """
+    Identities of the rows written in the last seconds, within this process.
+
+    Replicas may still return the previous version of these rows, or miss the inserted ones,
+    so they're read from the primary until the window has passed. Set the window above the replication lag.
+    Inserted rows are tracked by the values of their lookup columns, see `get_lookup_keys`.
+
+    :param window_seconds: How long a written row is read from the primary, in seconds.
+    :param maxsize: Maximum number of tracked rows. The oldest ones are forgotten first.
+    """
+
+    def __init__(self, window_seconds: float = 5.0, maxsize: int = 100_000):
+        self.window_seconds = window_seconds
+        self.maxsize = maxsize
+        self._written_at: OrderedDict[Any, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._written_at)
+
+    def __contains__(self, identity_key: Any) -> bool:
+        written_at = self._written_at.get(identity_key)
+        return written_at is not None and time.monotonic() - written_at < self.window_seconds
+
+    def add(self, identity_key: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._written_at[identity_key] = now
+            self._written_at.move_to_end(identity_key)
+            while self._written_at:
+                oldest_key, written_at = next(iter(self._written_at.items()))
+                if len(self._written_at) <= self.maxsize and now - written_at < self.window_seconds:
+                    break
+                del self._written_at[oldest_key]
+
+
+_shared_recent_writes = RecentWrites()
+
+
+class ReadRouter:
+    """
+    Routing of the adapters lookups between the primary session and a replica one.
+
+    Lookups go to the replica, except:
+
+    * once the primary session has flushed a write, so that a request reads its own writes;
+    * when the replica has no matching row and the lookup asks for it with `retry_miss`,
+    since the row may have been created a moment ago by another worker, like the access token
+    of a login followed by an authenticated call. The adapters do so for the access tokens,
+    refresh tokens and users: forged tokens are best rejected before the lookup,
+    with signed tokens and a negative cache, see `DatabaseStrategy`;
+    * when the replica has no matching row, but a row matching one of the lookup equality criteria
+    was inserted by this process within the `RecentWrites` window. Other misses end on the replica;
+    * when the replica returns a row updated or deleted within the `RecentWrites` window.
+    `RecentWrites` only knows the writes of this process: the updates made by other workers
+    may be read from the replica until it catches up.
+
+    Rows read from the replica are merged into the primary session, without querying it,
+    so that they can be updated like those read from the primary.
+
+    :param session: The primary session, used for the writes.
+    :param read_session: Optional replica session. Without it, everything goes to the primary.
+    :param recent_writes: Optional tracker of the recently written rows.
+    Defaults to one shared by all the adapters of the process.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        read_session: AsyncSession | None = None,
+        recent_writes: RecentWrites | None = None,
+    ):
+        self.session = session
+        self.read_session = read_session
+        self.recent_writes = recent_writes if recent_writes is not None else _shared_recent_writes
+        if read_session is not None:
+            _track_writes(session.sync_session, self.recent_writes)
+
+    @property
+    def sticky(self) -> bool:
+        """Whether the lookups go to the primary, because the request wrote through it."""
+        return self.session.info.get(WROTE_INFO_KEY, False)
+
+    async def scalar_one_or_none(
+        self, statement: Select[Any], parameters: dict[str, Any] | None = None, retry_miss: bool = False
+    ) -> Any | None:
+        row = await self.one_or_none(statement, parameters, retry_miss)
+        return row[0] if row is not None else None
+
+    async def one_or_none(
+        self, statement: Select[Any], parameters: dict[str, Any] | None = None, retry_miss: bool = False
+    ) -> tuple[Any, ...] | None:
+        """
+        Run a lookup on the replica, or on the primary when it may miss or return a stale row.
+
+        :param statement: The lookup statement.
+        :param parameters: Optional values of its bound parameters.
+        :param retry_miss: Whether a replica miss is always retried on the primary.
+        """
+        if self.read_session is not None and not self.sticky:
+            row = await _one_or_none(self.read_session, statement, parameters)
+            if row is None:
+                if not retry_miss and not self._may_be_recently_inserted(statement, parameters):
+                    return None
+            elif not any(_identity_key(entity) in self.recent_writes for entity in row):
+                return tuple([await self._merge(entity) for entity in row])
+
+        row = await _one_or_none(self.session, statement, parameters)
+        return tuple(row) if row is not None else None
+
+    def add_inserted(self, table: Table, rows: Iterable[dict[str, Any]]) -> None:
+        """Track rows inserted without the ORM, like with multi-row `INSERT` statements."""
+        if self.read_session is None:
+            return
+        self.session.info[WROTE_INFO_KEY] = True
+        for row in rows:
+            for column_name, value in row.items():
+                column = table.c.get(column_name)
+                if column is not None and _is_lookup_column(column) and isinstance(value, Hashable):
+                    self.recent_writes.add(_get_lookup_key(column, value))
+
+    def _may_be_recently_inserted(self, statement: Select[Any], parameters: dict[str, Any] | None) -> bool:
+        lookup_keys = list(get_lookup_keys(statement, parameters))
+        # Without equality criteria, the lookup can't be matched with the inserted rows
+        return not lookup_keys or any(lookup_key in self.recent_writes for lookup_key in lookup_keys)
+
+    async def _merge(self, entity: Any) -> Any:
+        if _identity_key(entity) is None:
+            return entity
+        return await self.session.merge(entity, load=False)
+
+
+async def _one_or_none(
+    session: AsyncSession, statement: Select[Any], parameters: dict[str, Any] | None
+) -> Row[Any] | None:
+    results = await session.execute(statement, parameters)
+    return results.unique().one_or_none()
+
+
+def get_lookup_keys(statement: Select[Any], parameters: dict[str, Any] | None = None) -> Iterator[Hashable]:
+    """
+    Get the keys of the equality criteria of a lookup, like `table.c.token == bindparam("token")`.
+
+    Criteria comparing lowercased values, like `func.lower(table.c.email) == func.lower(email)`, are included.
+    The keys of an inserted row, tracked in `RecentWrites`, are those of its lookup columns:
+    primary key, unique, indexed and foreign key columns.
+    """
+    if statement.whereclause is None:
+        return
+    for element in visitors.iterate(statement.whereclause):
+        if not isinstance(element, BinaryExpression) or element.operator is not operator.eq:
+            continue
+        column, bind = _unwrap_lower(element.left), _unwrap_lower(element.right)
+        if isinstance(column, BindParameter):
+            column, bind = bind, column
+        if not isinstance(column, Column) or not isinstance(bind, BindParameter) or bind.expanding:
+            continue
+        value = parameters[bind.key] if parameters is not None and bind.key in parameters else bind.effective_value
+        if isinstance(value, Hashable):
+            yield _get_lookup_key(column, value)
+
+
+def _unwrap_lower(element: ColumnElement[Any]) -> ColumnElement[Any]:
+    if isinstance(element, FunctionElement) and element.name == "lower":
+        arguments = list(element.clauses)
+        if len(arguments) == 1:
+            return arguments[0]
+    return element
+
+
+def _is_lookup_column(column: Column[Any]) -> bool:
+    return bool(column.primary_key or column.unique or column.index or column.foreign_keys)
+
+
+def _get_lookup_key(column: Column[Any], value: Any) -> Hashable:
+    # Lowercased, so that case-insensitive lookups match; other collisions only cost a primary lookup
+    return (column.table.name, column.name, value.lower() if isinstance(value, str) else value)
+
+
+def _get_instance_lookup_keys(instance: Any) -> Iterator[Hashable]:
+    state = inspect(instance)
+    for prop in state.mapper.column_attrs:
+        value = state.dict.get(prop.key)
+        if value is None or not isinstance(value, Hashable):
+            continue
+        for column in prop.columns:
+            if isinstance(column, Column) and _is_lookup_column(column):
+                yield _get_lookup_key(column, value)
+
+
+def _identity_key(entity: Any) -> Any:
+    state = inspect(entity, raiseerr=False)
+    return getattr(state, "identity_key", None)
+
+
+def _track_writes(session: Session, recent_writes: RecentWrites) -> None:
+    listener_key = (WROTE_INFO_KEY, id(recent_writes))
+    if session.info.get(listener_key):
+        return
+    session.info[listener_key] = True
+
+    @event.listens_for(session, "before_flush")
+    def before_flush(session: Session, flush_context: Any, instances: Any) -> None:
+        if session.new or session.dirty or session.deleted:
+            session.info[WROTE_INFO_KEY] = True
+        for instance in (*session.dirty, *session.deleted):
+            identity_key = _identity_key(instance)
+            if identity_key is not None:
+                recent_writes.add(identity_key)
+
+    @event.listens_for(session, "after_flush")
+    def after_flush(session: Session, flush_context: Any) -> None:
+        # The generated values, like the primary keys, are only known once inserted
+        for instance in session.new:
+            for lookup_key in _get_instance_lookup_keys(instance):
+                recent_writes.add(lookup_key)
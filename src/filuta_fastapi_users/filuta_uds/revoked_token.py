@@ -0,0 +1,90 @@
+import uuid
+from collections.abc import Sequence
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, ClassVar
+
+from sqlalchemy import Boolean, ForeignKey, String, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Mapped, declared_attr, mapped_column
+
+from filuta_fastapi_users.authentication.strategy.db.adapter import RevokedTokenDatabase
+
+from .generics import GUID, TIMESTAMPAware, commit, commit_and_load, now_utc
+
+
+class SQLAlchemyBaseRevokedTokenTable[ID]:
+    """Base SQLAlchemy revoked token table definition."""
+
+    __tablename__ = "revoked_tokens"
+
+    if TYPE_CHECKING:  # pragma: no cover
+        jti: ClassVar[str]
+        user_id: ID
+        revoked_at: ClassVar[datetime]
+        expires_at: ClassVar[datetime | None]
+        all_user_tokens: ClassVar[bool]
+    else:
+        jti: Mapped[str] = mapped_column(String(length=64), primary_key=True)
+        revoked_at: Mapped[datetime] = mapped_column(
+            TIMESTAMPAware(timezone=True), index=True, nullable=False, default=now_utc
+        )
+        expires_at: Mapped[datetime | None] = mapped_column(TIMESTAMPAware(timezone=True), index=True, nullable=True)
+        all_user_tokens: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+
+
+class SQLAlchemyBaseRevokedTokenTableUUID(SQLAlchemyBaseRevokedTokenTable[uuid.UUID]):
+    if TYPE_CHECKING:  # pragma: no cover
+        user_id: uuid.UUID
+    else:
+
+        @declared_attr
+        def user_id(cls) -> Mapped[GUID]:
+            return mapped_column(GUID, ForeignKey("user.id", ondelete="cascade"), nullable=False)
+
+
+class SQLAlchemyRevokedTokenDatabase[RVTP](RevokedTokenDatabase[RVTP]):
+    """
+    Revoked token database adapter for SQLAlchemy.
+
+    :param session: SQLAlchemy session instance.
+    :param revoked_token_table: SQLAlchemy revoked token model.
+    :param autocommit: Whether each write commits. Disable it when the session
+    is committed once per request, see `get_unit_of_work_dependency`: writes are then only flushed.
+    """
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        revoked_token_table: type[RVTP],
+        autocommit: bool = True,
+    ):
+        self.session = session
+        self.revoked_token_table = revoked_token_table
+        self.autocommit = autocommit
+
+    async def create(self, create_dict: dict[str, Any]) -> RVTP:
+        revoked_token = self.revoked_token_table(**create_dict)
+        self.session.add(revoked_token)
+        await commit_and_load(self.session, revoked_token, inserted=True, autocommit=self.autocommit)
+        return revoked_token
+
+    async def get_revoked_since(self, since: datetime | None = None) -> Sequence[RVTP]:
+        statement = select(self.revoked_token_table).where(
+            or_(
+                self.revoked_token_table.expires_at.is_(None),  # type: ignore[attr-defined]
+                self.revoked_token_table.expires_at > now_utc(),  # type: ignore[attr-defined]
+            )
+        )
+        if since is not None:
+            statement = statement.where(self.revoked_token_table.revoked_at >= since)  # type: ignore[attr-defined]
+
+        results = await self.session.execute(statement)
+        return results.scalars().all()
+
+    async def delete_expired(self) -> None:
+        await self.session.execute(
+            delete(self.revoked_token_table).where(
+                self.revoked_token_table.expires_at <= now_utc()  # type: ignore[attr-defined]
+            )
+        )
+        await commit(self.session, self.autocommit)
@@ -0,0 +1,44 @@
+from collections.abc import AsyncGenerator
+from typing import Any
+
+from fastapi import Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from filuta_fastapi_users.types import DependencyCallable
+
+
+def get_unit_of_work_dependency(
+    get_session: DependencyCallable[AsyncSession],
+) -> Any:
+    """
+    Build a dependency committing the request session once, at the end of the request.
+
+    Create the adapters with `autocommit=False` on the session yielded by `get_session`:
+    their writes are only flushed, and the whole request runs in a single transaction.
+    Add the dependency to the routes, or to the app, with the function scope,
+    so that the commit happens before the response is sent:
+
+        unit_of_work = get_unit_of_work_dependency(get_async_session)
+        app.include_router(
+            fastapi_users.get_auth_router(auth_backend),
+            dependencies=[Depends(unit_of_work, scope="function")],
+        )
+
+    The writes are committed as well when the route raises an `HTTPException`, since
+    the adapters committed them in that case before. Other exceptions roll them back.
+
+    :param get_session: The dependency yielding the session shared by the adapters.
+    """
+
+    async def unit_of_work(session: AsyncSession = Depends(get_session)) -> AsyncGenerator[AsyncSession]:
+        try:
+            yield session
+        except HTTPException:
+            await session.commit()
+            raise
+        except BaseException:
+            await session.rollback()
+            raise
+        await session.commit()
+
+    return unit_of_work
@@ -2,6 +2,7 @@ from datetime import UTC, datetime, timedelta
 from typing import Any
 
 import jwt
+from jwt.types import Options
 from pydantic import SecretStr
 
 SecretType = str | SecretStr
@@ -32,10 +33,12 @@ def decode_jwt(
     secret: SecretType,
     audience: list[str],
     algorithms: list[str] = [JWT_ALGORITHM],
+    options: Options | None = None,
 ) -> dict[str, Any]:
     return jwt.decode(
         encoded_jwt,
         _get_secret_value(secret),
         audience=audience,
         algorithms=algorithms,
+        options=options,
     )
@@ -1,22 +1,47 @@
+import asyncio
+import dataclasses
+import secrets
 import uuid
 from abc import ABC, abstractmethod
-from typing import Any, Generic
+from collections.abc import Sequence
+from typing import Any, Generic, cast
 
 import jwt
 from fastapi import Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 
 from filuta_fastapi_users import exceptions, models, schemas
-from filuta_fastapi_users.authentication.strategy.db.adapter import AccessTokenDatabase, RefreshTokenDatabase
+from filuta_fastapi_users.authentication.principal import Principal, PrincipalCache
+from filuta_fastapi_users.authentication.strategy.db.adapter import (
+    AccessTokenDatabase,
+    RefreshTokenDatabase,
+    RevokedTokenDatabase,
+)
+from filuta_fastapi_users.authentication.strategy.db.cache import AccessTokenCache
+from filuta_fastapi_users.authentication.strategy.revocation import RevocationList
 from filuta_fastapi_users.db import BaseUserDatabase
 from filuta_fastapi_users.jwt import SecretType, decode_jwt, generate_jwt
 from filuta_fastapi_users.password import PasswordHelper, PasswordHelperProtocol
+from filuta_fastapi_users.password_upgrade import PasswordHashUpgrader
 from filuta_fastapi_users.types import DependencyCallable
 
 RESET_PASSWORD_TOKEN_AUDIENCE = "fastapi-users:reset"  # nosec B105
 VERIFY_USER_TOKEN_AUDIENCE = "fastapi-users:verify"  # nosec B105
 
 
+@dataclasses.dataclass
+class BulkCreateResult:
+    """
+    Outcome of `BaseUserManager.create_many`.
+
+    :param created: Number of created users.
+    :param errors: Errors of the users which weren't created, by index in the input.
+    """
+
+    created: int = 0
+    errors: dict[int, Exception] = dataclasses.field(default_factory=dict)
+
+
 class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
     """
     User management logic.
@@ -27,8 +52,18 @@ class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
     :attribute verification_token_secret: Secret to encode verification token.
     :attribute verification_token_lifetime_seconds: Lifetime of verification token.
     :attribute verification_token_audience: JWT audience of verification token.
+    :attribute access_token_cache: Optional access token cache shared with
+    the database strategy, invalidated when the user tokens are deleted.
+    :attribute revocation_list: Optional revocation list shared with
+    the JWT strategy, to which deleting the user tokens adds a user-wide revocation.
+    :attribute principal_cache: Optional principal cache, used by `get_principal`
+    and invalidated when a user is updated or deleted.
+    :attribute password_hash_upgrader: Optional background writer of the password hashes
+    upgraded by `authenticate`. When set, the login doesn't wait for the update.
 
     :param user_db: Database adapter instance.
+    :param revoked_token_db: Optional revoked token database adapter instance,
+    persisting the user-wide revocations for the other workers.
     """
 
     reset_password_token_secret: SecretType
@@ -41,16 +76,23 @@ class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
 
     password_helper: PasswordHelperProtocol
 
+    access_token_cache: AccessTokenCache | None = None
+    revocation_list: RevocationList | None = None
+    principal_cache: PrincipalCache | None = None
+    password_hash_upgrader: PasswordHashUpgrader | None = None
+
     def __init__(
         self,
         user_db: BaseUserDatabase[models.UP, models.ID],
         access_token_db: AccessTokenDatabase[models.AP],
         refresh_token_db: RefreshTokenDatabase[models.RTP],
         password_helper: PasswordHelperProtocol | None = None,
+        revoked_token_db: RevokedTokenDatabase[Any] | None = None,
     ):
         self.user_db = user_db
         self.access_token_db = access_token_db
         self.refresh_token_db = refresh_token_db
+        self.revoked_token_db = revoked_token_db
         if password_helper is None:
             self.password_helper = PasswordHelper()
         else:
@@ -82,6 +124,26 @@ class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
 
         return user
 
+    async def get_principal(self, id: models.ID) -> Principal:
+        """
+        Get the principal of a user by id.
+
+        If a principal cache is set, the user is only retrieved on cache misses.
+
+        :param id: Id of the user.
+        :raises UserNotExists: The user does not exist.
+        :return: The principal of the user.
+        """
+        if self.principal_cache is not None:
+            principal = self.principal_cache.get(id)
+            if principal is not None:
+                return principal
+
+        principal = Principal.from_user(await self.get(id))
+        if self.principal_cache is not None:
+            self.principal_cache.set(id, principal)
+        return principal
+
     async def get_by_email(self, user_email: str) -> models.UP:
         """
         Get a user by e-mail.
@@ -140,7 +202,7 @@ class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
 
         user_dict = user_create.create_update_dict() if safe else user_create.create_update_dict_superuser()
         password = user_dict.pop("password")
-        user_dict["hashed_password"] = self.password_helper.hash(password)
+        user_dict["hashed_password"] = await self._hash_password(password)
 
         created_user = await self.user_db.create(user_dict)
 
@@ -148,6 +210,91 @@ class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
 
         return created_user
 
+    async def create_many(
+        self,
+        user_creates: Sequence[schemas.UC],
+        safe: bool = False,
+        chunk_size: int = 1000,
+    ) -> BulkCreateResult:
+        """
+        Create users in bulk, e.g. to import them.
+
+        Unlike `create`, each chunk checks its emails with a single query, hashes
+        its passwords in bulk on the password helper executor and is inserted
+        with multi-row statements. Use a process pool executor in import scripts.
+        The on_after_register handler isn't triggered.
+
+        :param user_creates: The UserCreate models to create.
+        :param safe: If True, sensitive values like is_superuser or is_verified
+        will be ignored during the creation, defaults to False.
+        :param chunk_size: Number of users processed at once, defaults to 1000.
+        :return: The number of created users, and the errors of the others:
+        `InvalidPasswordException`, `UserAlreadyExists` or a database error.
+        A failing user doesn't prevent the others from being created.
+        """
+        result = BulkCreateResult()
+        indexed_user_creates = list(enumerate(user_creates))
+        created_emails: set[str] = set()
+        for start in range(0, len(indexed_user_creates), chunk_size):
+            await self._create_chunk(indexed_user_creates[start : start + chunk_size], safe, created_emails, result)
+        return result
+
+    async def _create_chunk(
+        self,
+        indexed_user_creates: Sequence[tuple[int, schemas.UC]],
+        safe: bool,
+        created_emails: set[str],
+        result: BulkCreateResult,
+    ) -> None:
+        candidates: list[tuple[int, dict[str, Any]]] = []
+        # Repeated emails wait for the outcome of the first one, which may still fail
+        deferred: list[tuple[int, schemas.UC]] = []
+        candidate_emails: set[str] = set()
+        for index, user_create in indexed_user_creates:
+            email = user_create.email.lower()
+            if email in created_emails:
+                result.errors[index] = exceptions.UserAlreadyExists()
+                continue
+            try:
+                await self.validate_password(user_create.password, user_create)
+            except exceptions.InvalidPasswordException as e:
+                result.errors[index] = e
+                continue
+            if email in candidate_emails:
+                deferred.append((index, user_create))
+                continue
+            candidate_emails.add(email)
+            candidates.append(
+                (index, user_create.create_update_dict() if safe else user_create.create_update_dict_superuser())
+            )
+
+        await self._insert_candidates(candidates, created_emails, result)
+        if deferred:
+            await self._create_chunk(deferred, safe, created_emails, result)
+
+    async def _insert_candidates(
+        self, candidates: list[tuple[int, dict[str, Any]]], created_emails: set[str], result: BulkCreateResult
+    ) -> None:
+        existing_emails = await self.user_db.get_existing_emails([user_dict["email"] for _, user_dict in candidates])
+        for index, user_dict in candidates:
+            if user_dict["email"].lower() in existing_emails:
+                result.errors[index] = exceptions.UserAlreadyExists()
+        candidates = [(index, user_dict) for index, user_dict in candidates if index not in result.errors]
+        if not candidates:
+            return
+
+        hashed_passwords = await self._hash_passwords([user_dict.pop("password") for _, user_dict in candidates])
+        for (_, user_dict), hashed_password in zip(candidates, hashed_passwords, strict=True):
+            user_dict["hashed_password"] = hashed_password
+
+        errors = await self.user_db.create_many([user_dict for _, user_dict in candidates])
+        for (index, user_dict), error in zip(candidates, errors, strict=True):
+            if error is None:
+                result.created += 1
+                created_emails.add(user_dict["email"].lower())
+            else:
+                result.errors[index] = error
+
     async def oauth_callback(  # noqa: PLR0913
         self: BaseUserManager[models.UOAP, models.ID],
         oauth_name: str,
@@ -213,7 +360,7 @@ class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
                 password = self.password_helper.generate()
                 user_dict = {
                     "email": account_email,
-                    "hashed_password": self.password_helper.hash(password),
+                    "hashed_password": await self._hash_password(password),
                     "is_verified": is_verified_by_default,
                 }
                 user = await self.user_db.create(user_dict)
@@ -366,7 +513,7 @@ class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
 
         token_data = {
             "sub": str(user.id),
-            "password_fgpt": self.password_helper.hash(user.hashed_password),
+            "password_fgpt": await self._hash_password(user.hashed_password),
             "aud": self.reset_password_token_audience,
         }
         token = generate_jwt(
@@ -413,7 +560,7 @@ class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
 
         user = await self.get(parsed_id)
 
-        valid_password_fingerprint, _ = self.password_helper.verify_and_update(
+        valid_password_fingerprint, _ = await self._verify_and_update_password(
             user.hashed_password, password_fingerprint
         )
         if not valid_password_fingerprint:
@@ -472,6 +619,8 @@ class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
         """
         await self.on_before_delete(user, request)
         await self.user_db.delete(user)
+        if self.principal_cache is not None:
+            self.principal_cache.invalidate(user.id)
         await self.on_after_delete(user, request)
 
     async def validate_password(self, password: str, user: schemas.UC | models.UP) -> None:
@@ -641,20 +790,41 @@ class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
         except exceptions.UserNotExists:
             # Run the hasher to mitigate timing attack
             # Inspired from Django: https://code.djangoproject.com/ticket/20760
-            self.password_helper.hash(credentials.password)
+            await self._hash_password(credentials.password)
             return None
 
-        verified, updated_password_hash = self.password_helper.verify_and_update(
+        verified, updated_password_hash = await self._verify_and_update_password(
             credentials.password, user.hashed_password
         )
         if not verified:
             return None
         # Update password hash to a more robust one if needed
         if updated_password_hash is not None:
-            await self.user_db.update(user, {"hashed_password": updated_password_hash})
+            if self.password_hash_upgrader is not None:
+                self.password_hash_upgrader.enqueue(user.id, user.hashed_password, updated_password_hash)
+            else:
+                await self.user_db.update(user, {"hashed_password": updated_password_hash})
 
         return user
 
+    async def _hash_password(self, password: str) -> str:
+        hash_async = getattr(self.password_helper, "hash_async", None)
+        if hash_async is None:
+            return await asyncio.to_thread(self.password_helper.hash, password)
+        return cast(str, await hash_async(password))
+
+    async def _hash_passwords(self, passwords: Sequence[str]) -> list[str]:
+        hash_many_async = getattr(self.password_helper, "hash_many_async", None)
+        if hash_many_async is None:
+            return await asyncio.to_thread(lambda: [self.password_helper.hash(password) for password in passwords])
+        return cast(list[str], await hash_many_async(passwords))
+
+    async def _verify_and_update_password(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        verify_and_update_async = getattr(self.password_helper, "verify_and_update_async", None)
+        if verify_and_update_async is None:
+            return await asyncio.to_thread(self.password_helper.verify_and_update, plain_password, hashed_password)
+        return cast(tuple[bool, str | None], await verify_and_update_async(plain_password, hashed_password))
+
     async def _update(self, user: models.UP, update_dict: dict[str, Any]) -> models.UP:
         validated_update_dict = {}
         for field, value in update_dict.items():
@@ -667,14 +837,37 @@ class BaseUserManager(Generic[models.UP, models.ID], ABC):  # noqa: UP046
                     validated_update_dict["is_verified"] = False
             elif field == "password" and value is not None:
                 await self.validate_password(value, user)
-                validated_update_dict["hashed_password"] = self.password_helper.hash(value)
+                validated_update_dict["hashed_password"] = await self._hash_password(value)
             else:
                 validated_update_dict[field] = value
-        return await self.user_db.update(user, validated_update_dict)
+        updated_user = await self.user_db.update(user, validated_update_dict)
+        if self.principal_cache is not None:
+            self.principal_cache.invalidate(updated_user.id)
+        return updated_user
 
     async def delete_user_tokens(self, user: models.UP) -> None:
+        if self.access_token_cache is not None:
+            self.access_token_cache.invalidate_user(user.id)
+        if self.revocation_list is not None:
+            await self._revoke_user_tokens(self.revocation_list, user)
         await self.access_token_db.delete_all_records_for_user(user)
         await self.refresh_token_db.delete_all_records_for_user(user)
+        # Again, in case a concurrent lookup cached a token while they were being deleted
+        if self.access_token_cache is not None:
+            self.access_token_cache.invalidate_user(user.id)
+
+    async def _revoke_user_tokens(self, revocation_list: RevocationList, user: models.UP) -> None:
+        revoked_at, expires_at = revocation_list.revoke_user(user.id)
+        if self.revoked_token_db is not None:
+            await self.revoked_token_db.create(
+                {
+                    "jti": secrets.token_urlsafe(),
+                    "user_id": user.id,
+                    "revoked_at": revoked_at,
+                    "expires_at": expires_at,
+                    "all_user_tokens": True,
+                }
+            )
 
 
 class UUIDIDMixin:
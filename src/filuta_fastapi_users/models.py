@@ -72,6 +72,19 @@ class RefreshTokenProtocol(Protocol[ID]):
 RTP = TypeVar("RTP", bound="RefreshTokenProtocol[Any]")
 
 
+class RevokedTokenProtocol(Protocol[ID]):
+    """Revoked token protocol that ORM model should follow."""
+
+    jti: str
+    user_id: ID
+    revoked_at: datetime
+    expires_at: datetime | None
+    all_user_tokens: bool
+
+
+RVTP = TypeVar("RVTP", bound="RevokedTokenProtocol[Any]")
+
+
 class OtpTokenProtocol(Protocol):
     """OTP token protocol that ORM model should follow."""
 
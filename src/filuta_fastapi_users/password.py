@@ -1,12 +1,32 @@
+import asyncio
+import math
+import multiprocessing
+import os
 import secrets
-from typing import Protocol
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, ClassVar, Literal, Protocol
 
 from pwdlib import PasswordHash
 from pwdlib.hashers.argon2 import Argon2Hasher
 from pwdlib.hashers.bcrypt import BcryptHasher
 
+from filuta_fastapi_users import exceptions
+
+ExecutorKind = Literal["thread", "process"]
+
 
 class PasswordHelperProtocol(Protocol):
+    """
+    Password hashing and verification, as used by the user manager.
+
+    Helpers may also implement `verify_and_update_async`, `hash_async` and `hash_many_async`,
+    like `PasswordHelper`. Otherwise, the user manager runs the sync methods in a thread.
+    """
+
     def verify_and_update(
         self, plain_password: str, hashed_password: str
     ) -> tuple[bool, str | None]: ...  # pragma: no cover
@@ -16,8 +36,182 @@ class PasswordHelperProtocol(Protocol):
     def generate(self) -> str: ...  # pragma: no cover
 
 
+# Module-level functions, so that process pools can pickle them
+def _verify_and_update(
+    password_hash: PasswordHash, plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    return password_hash.verify_and_update(plain_password, hashed_password)
+
+
+def _hash(password_hash: PasswordHash, password: str) -> str:
+    return password_hash.hash(password)
+
+
+def _hash_many(password_hash: PasswordHash, passwords: Sequence[str]) -> list[str]:
+    return [password_hash.hash(password) for password in passwords]
+
+
+class HashingScheduler:
+    """
+    Admission control of the password hashing operations of a process.
+
+    Operations beyond `max_in_flight` wait for a slot. Those which can't get one
+    within `max_queue_wait_seconds` raise `PasswordHashingOverloaded`, so that
+    the client is told to retry later instead of piling up requests.
+    Share a single scheduler between the password helpers of a process,
+    even across event loops running in several threads.
+
+    :param max_in_flight: Maximum number of operations running at once.
+    Defaults to the number of CPUs, up to 4.
+    :param max_queue_wait_seconds: Maximum time an operation waits for a slot, in seconds.
+    Defaults to 1 second.
+    :param max_queue_depth: Optional maximum number of waiting operations.
+    When it's reached, new operations are rejected right away.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int | None = None,
+        max_queue_wait_seconds: float = 1.0,
+        max_queue_depth: int | None = None,
+    ) -> None:
+        self.max_in_flight = max_in_flight or min(4, os.cpu_count() or 1)
+        self.max_queue_wait_seconds = max_queue_wait_seconds
+        self.max_queue_depth = max_queue_depth
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        # A thread lock and per-loop futures rather than an asyncio semaphore,
+        # which is bound to a single event loop
+        self._lock = threading.Lock()
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def run[T](self, executor: Executor, function: Callable[..., T], *args: Any) -> T:
+        """Run a hashing function on an executor once a slot is available."""
+        await self._acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(executor, function, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        # The slot is held until the worker is done, even if the caller is cancelled
+        future.add_done_callback(self._release)
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiters),
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "average_wait_seconds": self.total_wait_seconds / self.admitted if self.admitted else 0.0,
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+    async def _acquire(self) -> None:
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                self.admitted += 1
+                return
+
+            if self.max_queue_depth is not None and len(self._waiters) >= self.max_queue_depth:
+                self._reject()
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+
+        start = time.monotonic()
+        try:
+            async with asyncio.timeout(self.max_queue_wait_seconds):
+                await waiter
+        except TimeoutError:
+            # The slot may have been handed over right as the wait timed out
+            if self._withdraw(waiter):
+                with self._lock:
+                    self._reject()
+        except asyncio.CancelledError:
+            if not self._withdraw(waiter):
+                self._release(None)
+            raise
+
+        wait_seconds = time.monotonic() - start
+        with self._lock:
+            self.admitted += 1
+            self.total_wait_seconds += wait_seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    def _withdraw(self, waiter: asyncio.Future[None]) -> bool:
+        """Remove a waiter from the queue, unless it was already given a slot."""
+        with self._lock:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                return False
+            return True
+
+    def _release(self, _: Any) -> None:
+        with self._lock:
+            # Hand the slot over to the next waiter, whichever event loop it runs on
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                try:
+                    waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+                except RuntimeError:  # pragma: no cover
+                    continue  # Its event loop is closed
+                return
+            self.in_flight -= 1
+
+    def _reject(self) -> None:
+        self.rejected += 1
+        raise exceptions.PasswordHashingOverloaded(max(1, math.ceil(self.max_queue_wait_seconds)))
+
+
+def _wake(waiter: asyncio.Future[None]) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
 class PasswordHelper(PasswordHelperProtocol):
-    def __init__(self, password_hash: PasswordHash | None = None) -> None:
+    """
+    Password hashing and verification.
+
+    Hashing is CPU-bound and blocks for tens of milliseconds, so the async methods
+    run it on a dedicated executor instead of the event loop.
+
+    :param password_hash: Optional pwdlib password hash. Defaults to Argon2, with bcrypt
+    hashes still accepted and upgraded. `password_calibration` finds the Argon2 parameters
+    suiting the current machine.
+    :param executor: Executor of the async methods: `"thread"` for a thread pool, `"process"`
+    for a process pool, or an executor instance. Argon2 and bcrypt release the GIL,
+    so threads already hash in parallel. Defaults to `"thread"`.
+    There's no pool of subinterpreters: the Argon2 and bcrypt hashers are built with cffi and PyO3,
+    which can't be imported in isolated subinterpreters, see `benchmarks/password_hashing.py`.
+    :param max_workers: Maximum number of workers of the executor created by the helper.
+    Defaults to the number of CPUs, up to 4.
+    Helpers with the same executor kind and number of workers share the same executor,
+    so that a helper can be instantiated per request.
+    :param scheduler: Optional hashing scheduler, capping the async operations running at once
+    and their time in queue. Without it, operations queue on the executor without limit.
+    """
+
+    _shared_executors: ClassVar[dict[tuple[ExecutorKind, int], Executor]] = {}
+    _shared_executors_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(
+        self,
+        password_hash: PasswordHash | None = None,
+        executor: ExecutorKind | Executor = "thread",
+        max_workers: int | None = None,
+        scheduler: HashingScheduler | None = None,
+    ) -> None:
         if password_hash is None:
             self.password_hash = PasswordHash(
                 (
@@ -28,11 +222,73 @@ class PasswordHelper(PasswordHelperProtocol):
         else:
             self.password_hash = password_hash  # pragma: no cover
 
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._executor = executor
+        self.scheduler = scheduler
+
     def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
         return self.password_hash.verify_and_update(plain_password, hashed_password)
 
     def hash(self, password: str) -> str:
         return self.password_hash.hash(password)
 
+    async def verify_and_update_async(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        return await self._run(_verify_and_update, self.password_hash, plain_password, hashed_password)
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run(_hash, self.password_hash, password)
+
+    async def hash_many_async(self, passwords: Sequence[str]) -> list[str]:
+        """
+        Hash passwords in bulk, spread over the executor workers.
+
+        Each worker gets a slice of the passwords, so that a process pool
+        only pickles the password hash once per slice.
+        """
+        if not passwords:
+            return []
+        size = math.ceil(len(passwords) / self.max_workers)
+        slices = [passwords[i : i + size] for i in range(0, len(passwords), size)]
+        results = await asyncio.gather(*(self._run(_hash_many, self.password_hash, s) for s in slices))
+        return [hashed_password for result in results for hashed_password in result]
+
     def generate(self) -> str:
         return secrets.token_urlsafe(32)
+
+    @property
+    def executor(self) -> Executor:
+        if isinstance(self._executor, Executor):
+            return self._executor
+
+        key = (self._executor, self.max_workers)
+        executor = self._shared_executors.get(key)
+        if executor is not None:
+            return executor
+
+        # Created lazily, so that processes which never hash asynchronously don't spawn workers
+        with self._shared_executors_lock:
+            executor = self._shared_executors.get(key)
+            if executor is None:
+                executor = self._create_executor(self._executor)
+                self._shared_executors[key] = executor
+            return executor
+
+    def _create_executor(self, kind: ExecutorKind) -> Executor:
+        if kind == "process":
+            # Forking a process running an event loop and threads may deadlock the children
+            return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+
+    @classmethod
+    def shutdown_executors(cls, wait: bool = True) -> None:
+        """Shut down the shared executors. They're created again when needed."""
+        with cls._shared_executors_lock:
+            executors = list(cls._shared_executors.values())
+            cls._shared_executors.clear()
+        for executor in executors:
+            executor.shutdown(wait=wait)
+
+    async def _run[T](self, function: Callable[..., T], *args: Any) -> T:
+        if self.scheduler is not None:
+            return await self.scheduler.run(self.executor, function, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
@@ -0,0 +1,235 @@
+"""
+Calibration of the Argon2 parameters on the current machine.
+
+Run `python -m filuta_fastapi_users.password_calibration` on the deployment hardware
+to benchmark a grid of parameters and print the strongest `PasswordHash` configuration
+meeting a target p99 latency. Pass it to `PasswordHelper`: existing hashes are upgraded
+by `verify_and_update` as users log in.
+"""
+
+import argparse
+import math
+import os
+import time
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+from pwdlib.hashers.bcrypt import BcryptHasher
+
+DEFAULT_TARGET_P99_MS = 250.0
+DEFAULT_ITERATIONS = 20
+DEFAULT_MEMORY_COSTS = (19_456, 47_104, 65_536, 131_072, 262_144)
+DEFAULT_TIME_COSTS = (1, 2, 3, 4, 6)
+DEFAULT_PARALLELISMS = (1, 2, 4)
+BENCHMARK_PASSWORD = "calibration-password"  # nosec B105
+
+
+@dataclass(frozen=True)
+class Argon2Parameters:
+    """
+    Argon2 cost parameters.
+
+    :param time_cost: Number of iterations.
+    :param memory_cost: Memory usage, in KiB.
+    :param parallelism: Number of lanes.
+    """
+
+    time_cost: int
+    memory_cost: int
+    parallelism: int
+
+    @property
+    def cost(self) -> int:
+        return self.time_cost * self.memory_cost
+
+    def get_hasher(self) -> Argon2Hasher:
+        return Argon2Hasher(time_cost=self.time_cost, memory_cost=self.memory_cost, parallelism=self.parallelism)
+
+    def get_password_hash(self) -> PasswordHash:
+        """Build a password hash with these parameters, still accepting bcrypt hashes."""
+        return PasswordHash((self.get_hasher(), BcryptHasher()))
+
+    def to_python(self) -> str:
+        return (
+            "PasswordHash((Argon2Hasher("
+            f"time_cost={self.time_cost}, memory_cost={self.memory_cost}, parallelism={self.parallelism}"
+            "), BcryptHasher()))"
+        )
+
+
+@dataclass(frozen=True)
+class HashingBenchmark:
+    """Latencies, in milliseconds, and throughput, in operations per second, of a set of parameters."""
+
+    parameters: Argon2Parameters
+    hash_p50_ms: float
+    hash_p99_ms: float
+    verify_p50_ms: float
+    verify_p99_ms: float
+    throughput: float
+
+    @property
+    def p99_ms(self) -> float:
+        return max(self.hash_p99_ms, self.verify_p99_ms)
+
+
+def benchmark_argon2(
+    parameters: Argon2Parameters, iterations: int = DEFAULT_ITERATIONS, concurrency: int = 1
+) -> HashingBenchmark:
+    """
+    Measure hash and verify latencies of a set of parameters, then their throughput.
+
+    :param parameters: Argon2 parameters to benchmark.
+    :param iterations: Number of timed hashes and verifications.
+    :param concurrency: Number of threads hashing at once while measuring the throughput,
+    like the workers of the `PasswordHelper` executor.
+    """
+    password_hash = parameters.get_password_hash()
+    hashed_password = password_hash.hash(BENCHMARK_PASSWORD)
+
+    hash_samples = [_time(password_hash.hash, BENCHMARK_PASSWORD) for _ in range(iterations)]
+    verify_samples = [_time(password_hash.verify, BENCHMARK_PASSWORD, hashed_password) for _ in range(iterations)]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        list(executor.map(password_hash.hash, [BENCHMARK_PASSWORD] * iterations))
+        elapsed = time.perf_counter() - start
+
+    return HashingBenchmark(
+        parameters=parameters,
+        hash_p50_ms=_percentile(hash_samples, 50),
+        hash_p99_ms=_percentile(hash_samples, 99),
+        verify_p50_ms=_percentile(verify_samples, 50),
+        verify_p99_ms=_percentile(verify_samples, 99),
+        throughput=iterations / elapsed,
+    )
+
+
+def calibrate_argon2(
+    target_p99_ms: float = DEFAULT_TARGET_P99_MS,
+    candidates: Iterable[Argon2Parameters] | None = None,
+    iterations: int = DEFAULT_ITERATIONS,
+    concurrency: int = 1,
+) -> tuple[HashingBenchmark | None, list[HashingBenchmark]]:
+    """
+    Find the strongest Argon2 parameters meeting a target p99 latency.
+
+    Candidates are benchmarked from the cheapest to the most expensive.
+    Those at least as expensive as a candidate missing the target are skipped.
+
+    :param target_p99_ms: Maximum p99 latency of hashes and verifications, in milliseconds.
+    :param candidates: Optional parameters to benchmark. Defaults to a grid of memory costs, time costs
+    and lanes, see `get_default_candidates`. At the same cost, the fewest lanes are preferred,
+    since each lane takes a CPU away from the concurrent hashes.
+    :param iterations: Number of timed operations per candidate.
+    :param concurrency: Number of threads hashing at once while measuring the throughput.
+    :return: The benchmark of the selected parameters, or `None` if no candidate meets the target,
+    along with all the benchmarks run.
+    """
+    if candidates is None:
+        candidates = get_default_candidates()
+
+    benchmarks: list[HashingBenchmark] = []
+    too_slow: list[Argon2Parameters] = []
+    for parameters in sorted(candidates, key=_get_strength):
+        if any(_dominates(parameters, slow) for slow in too_slow):
+            continue
+
+        benchmark = benchmark_argon2(parameters, iterations, concurrency)
+        benchmarks.append(benchmark)
+        if benchmark.p99_ms > target_p99_ms:
+            too_slow.append(parameters)
+
+    selected = [benchmark for benchmark in benchmarks if benchmark.p99_ms <= target_p99_ms]
+    if not selected:
+        return None, benchmarks
+    return max(selected, key=lambda b: _get_strength(b.parameters)), benchmarks
+
+
+def get_default_candidates(parallelisms: Iterable[int] | None = None) -> list[Argon2Parameters]:
+    """
+    Build the default grid of candidate parameters.
+
+    More lanes compute a hash faster, so that costlier parameters may meet the target latency,
+    but they use more CPUs per hash.
+
+    :param parallelisms: Optional numbers of lanes to try. Defaults to 1, 2 and 4, up to the number of CPUs.
+    """
+    if parallelisms is None:
+        cpu_count = os.cpu_count() or 1
+        parallelisms = {min(parallelism, cpu_count) for parallelism in DEFAULT_PARALLELISMS}
+    return [
+        Argon2Parameters(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        for parallelism in sorted(set(parallelisms))
+        for memory_cost in DEFAULT_MEMORY_COSTS
+        for time_cost in DEFAULT_TIME_COSTS
+        # Argon2 needs at least 8 KiB per lane
+        if memory_cost >= 8 * parallelism
+    ]
+
+
+def _get_strength(parameters: Argon2Parameters) -> tuple[int, int, int]:
+    return parameters.cost, parameters.memory_cost, -parameters.parallelism
+
+
+def _dominates(parameters: Argon2Parameters, other: Argon2Parameters) -> bool:
+    return (
+        parameters.time_cost >= other.time_cost
+        and parameters.memory_cost >= other.memory_cost
+        and parameters.parallelism <= other.parallelism
+    )
+
+
+def _time(function: Callable[..., object], *args: str) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def _percentile(samples: Sequence[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(percentile / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--target-p99-ms", type=float, default=DEFAULT_TARGET_P99_MS)
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument(
+        "--parallelism",
+        type=int,
+        nargs="+",
+        default=None,
+        help="Argon2 lanes to try. Defaults to 1, 2 and 4, up to the CPUs.",
+    )
+    parser.add_argument("--concurrency", type=int, default=1, help="Threads hashing at once for the throughput.")
+    args = parser.parse_args(argv)
+
+    selected, benchmarks = calibrate_argon2(
+        args.target_p99_ms, get_default_candidates(args.parallelism), args.iterations, args.concurrency
+    )
+
+    print(f"{'time':>4} {'memory':>8} {'lanes':>5} {'hash p50':>9} {'hash p99':>9} {'verify p99':>10} {'ops/s':>7}")
+    for benchmark in benchmarks:
+        parameters = benchmark.parameters
+        print(
+            f"{parameters.time_cost:>4} {parameters.memory_cost:>8} {parameters.parallelism:>5} "
+            f"{benchmark.hash_p50_ms:>7.1f}ms {benchmark.hash_p99_ms:>7.1f}ms "
+            f"{benchmark.verify_p99_ms:>8.1f}ms {benchmark.throughput:>7.1f}"
+        )
+
+    if selected is None:
+        print(f"\nNo parameters meet a p99 of {args.target_p99_ms:g} ms on this machine.")
+        return 1
+
+    print(f"\nStrongest parameters with a p99 under {args.target_p99_ms:g} ms:\n")
+    print(selected.parameters.to_python())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
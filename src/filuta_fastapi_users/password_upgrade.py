@@ -0,0 +1,143 @@
+import asyncio
+import contextlib
+import threading
+from collections.abc import Callable
+from contextlib import AbstractAsyncContextManager
+from typing import Any
+
+from filuta_fastapi_users.db import BaseUserDatabase
+
+UserDatabaseFactory = Callable[[], AbstractAsyncContextManager[BaseUserDatabase[Any, Any]]]
+
+
+class PasswordHashUpgrader:
+    """
+    Background writer of the password hashes upgraded on login.
+
+    Instead of updating the user before the login response goes out, `BaseUserManager.authenticate`
+    queues the new hash. A worker task writes the queued hashes in batches,
+    through `BaseUserDatabase.update_password_hashes`. An update only applies if the user
+    still has the hash which was verified, so that a password changed in the meantime is kept.
+    Upgrades which are dropped or fail are harmless: they happen again on the next login.
+    Upgrades may be queued from event loops running in other threads than the worker one.
+
+    :param get_user_db: Factory of an async context manager yielding a user database adapter,
+    with its own session, since the request one is closed when the batch is written.
+    :param batch_size: Maximum number of users updated per batch.
+    :param flush_interval_seconds: Maximum time an upgrade waits for a batch to fill up, in seconds.
+    :param max_pending: Maximum number of queued upgrades. Further ones are dropped.
+    """
+
+    def __init__(
+        self,
+        get_user_db: UserDatabaseFactory,
+        batch_size: int = 100,
+        flush_interval_seconds: float = 1.0,
+        max_pending: int = 10_000,
+    ):
+        self.get_user_db = get_user_db
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending = max_pending
+        self.upgraded = 0
+        self.dropped = 0
+        self.failed = 0
+        self._pending: dict[Any, tuple[str, str]] = {}
+        # Created along with the worker task, on its event loop
+        self._has_pending: asyncio.Event | None = None
+        self._batch_full: asyncio.Event | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def enqueue(self, user_id: Any, old_hashed_password: str, hashed_password: str) -> bool:
+        """
+        Queue a password hash upgrade, without waiting for it to be written.
+
+        :return: Whether the upgrade was queued.
+        """
+        with self._lock:
+            pending = self._pending.get(user_id)
+            if pending is not None:
+                # Concurrent logins verified the same hash, keep the first upgrade
+                return pending[0] == old_hashed_password
+
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+
+            self._pending[user_id] = (old_hashed_password, hashed_password)
+            batch_full = len(self._pending) >= self.batch_size
+
+        task = self.start()
+        if task.get_loop() is asyncio.get_running_loop():
+            self._wake(batch_full)
+        else:
+            task.get_loop().call_soon_threadsafe(self._wake, batch_full)
+        return True
+
+    def start(self) -> asyncio.Task[None]:
+        """Start the worker task on the running event loop, if it's not running yet."""
+        with self._lock:
+            if self._task is None or self._task.done():
+                self._has_pending = asyncio.Event()
+                self._batch_full = asyncio.Event()
+                if self._pending:
+                    self._has_pending.set()
+                self._task = asyncio.get_running_loop().create_task(self._run(self._has_pending, self._batch_full))
+            return self._task
+
+    async def stop(self) -> None:
+        """Stop the worker task, after writing the queued upgrades. Call it from the worker event loop."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    async def flush(self) -> None:
+        """Write the queued upgrades now."""
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+
+        updates = [(user_id, old, new) for user_id, (old, new) in pending.items()]
+        for i in range(0, len(updates), self.batch_size):
+            batch = updates[i : i + self.batch_size]
+            try:
+                async with self.get_user_db() as user_db:
+                    upgraded = await user_db.update_password_hashes(batch)
+            except Exception:
+                with self._lock:
+                    self.failed += len(batch)
+                continue
+            with self._lock:
+                self.upgraded += upgraded
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "upgraded": self.upgraded,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+    def _wake(self, batch_full: bool) -> None:
+        if self._has_pending is None or self._batch_full is None:
+            return  # pragma: no cover
+        self._has_pending.set()
+        if batch_full:
+            self._batch_full.set()
+
+    async def _run(self, has_pending: asyncio.Event, batch_full: asyncio.Event) -> None:
+        while True:
+            await has_pending.wait()
+            with contextlib.suppress(TimeoutError):
+                async with asyncio.timeout(self.flush_interval_seconds):
+                    await batch_full.wait()
+            has_pending.clear()
+            batch_full.clear()
+            await self.flush()
@@ -9,13 +9,38 @@ from filuta_fastapi_users.authentication import (
     RefreshTokenManager,
     RefreshTokenManagerDependency,
     Strategy,
+    StrategyDestroyNotSupportedError,
 )
 from filuta_fastapi_users.manager import BaseUserManager, UserManagerDependency
 from filuta_fastapi_users.openapi import OpenAPIResponseType
-from filuta_fastapi_users.router.common import ErrorCode, ErrorModel
+from filuta_fastapi_users.router.common import (
+    ErrorCode,
+    ErrorModel,
+    get_overloaded_response,
+    handle_password_hashing_overloaded,
+)
 from filuta_fastapi_users.schemas import ValidateLoginRequestBody
 
 
+async def get_token_record_to_renew(
+    strategy: Strategy[models.UP, models.ID, models.AP], user: models.UP, access_token: str | None
+) -> models.AP | None:
+    """
+    Find the access token to renew: the presented one, when it belongs to the user, or the latest one.
+
+    :param strategy: Strategy of the authentication backend.
+    :param user: The owner of the refresh token.
+    :param access_token: The access token presented by the client, if any.
+    """
+    if access_token is None:
+        return await strategy.get_latest_token_for_user(user)
+
+    token_record = await strategy.get_token_record_raw(access_token)
+    if token_record is None or str(token_record.user_id) != str(user.id):
+        return None
+    return token_record
+
+
 def get_auth_router(
     backend: AuthenticationBackend[models.UP, models.ID, models.AP],
     get_user_manager: UserManagerDependency[models.UP, models.ID],
@@ -45,6 +70,7 @@ def get_auth_router(
                 }
             },
         },
+        **get_overloaded_response(ErrorCode.LOGIN_OVERLOADED),
         **backend.transport.get_openapi_login_responses_success(),
     }
 
@@ -60,7 +86,8 @@ def get_auth_router(
         strategy: Strategy[models.UP, models.ID, models.AP] = Depends(backend.get_strategy),
         refresh_token_manager: RefreshTokenManager[models.RTP] = Depends(get_refresh_token_manager),
     ) -> Response:
-        user = await user_manager.authenticate(jsonBody)
+        with handle_password_hashing_overloaded(ErrorCode.LOGIN_OVERLOADED):
+            user = await user_manager.authenticate(jsonBody)
 
         if user is None or not user.is_active:
             raise HTTPException(
@@ -87,6 +114,8 @@ def get_auth_router(
 
     class ValidateRefreshTokenRequestBody(BaseModel):
         refresh_token: str
+        # Required by the strategies which don't store the access tokens, like `JWTStrategy`
+        access_token: str | None = None
 
     @router.post(
         "/renew-access-token",
@@ -111,7 +140,7 @@ def get_auth_router(
             )
 
         user = await user_manager.get(refresh_token_record.user_id)
-        old_token_record = await strategy.get_latest_token_for_user(user)
+        old_token_record = await get_token_record_to_renew(strategy, user, jsonBody.access_token)
 
         if old_token_record is None:
             raise HTTPException(
@@ -129,7 +158,10 @@ def get_auth_router(
         new_token_record = await strategy.insert_token(new_access_token_record)
 
         if new_token_record is not None:
-            await strategy.destroy_token(old_token_record.token)
+            try:
+                await strategy.destroy_token(old_token_record.token)
+            except StrategyDestroyNotSupportedError:
+                pass
 
         return JSONResponse({"access_token": new_token_record.token})
 
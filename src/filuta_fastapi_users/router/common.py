@@ -1,7 +1,13 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
 from enum import StrEnum
 
+from fastapi import HTTPException, status
 from pydantic import BaseModel
 
+from filuta_fastapi_users import exceptions
+from filuta_fastapi_users.openapi import OpenAPIResponseType
+
 
 class ErrorModel(BaseModel):
     detail: str | dict[str, str]
@@ -20,6 +26,8 @@ class ErrorCode(StrEnum):
     OAUTH_INVALID_STATE = "OAUTH_INVALID_STATE"
     LOGIN_BAD_CREDENTIALS = "LOGIN_BAD_CREDENTIALS"
     LOGIN_USER_NOT_VERIFIED = "LOGIN_USER_NOT_VERIFIED"
+    LOGIN_OVERLOADED = "LOGIN_OVERLOADED"
+    PASSWORD_HASHING_OVERLOADED = "PASSWORD_HASHING_OVERLOADED"  # nosec B105
     RESET_PASSWORD_BAD_TOKEN = "RESET_PASSWORD_BAD_TOKEN"  # nosec B105
     RESET_PASSWORD_INVALID_PASSWORD = "RESET_PASSWORD_INVALID_PASSWORD"  # nosec B105
     VERIFY_USER_BAD_TOKEN = "VERIFY_USER_BAD_TOKEN"  # nosec B105
@@ -30,3 +38,43 @@ class ErrorCode(StrEnum):
     ACCESS_TOKEN_DECODE_ERROR = "ACCESS_TOKEN_DECODE_ERROR"  # nosec B105
     RENEW_WRONG_ACCESS_TOKEN = "RENEW_WRONG_ACCESS_TOKEN"  # nosec B105
     RENEW_WRONG_REFRESH_TOKEN = "RENEW_WRONG_REFRESH_TOKEN"  # nosec B105
+
+
+def get_overloaded_response(code: ErrorCode = ErrorCode.PASSWORD_HASHING_OVERLOADED) -> OpenAPIResponseType:
+    """OpenAPI documentation of the 503 response raised by `handle_password_hashing_overloaded`."""
+    return {
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "model": ErrorModel,
+            "content": {
+                "application/json": {
+                    "examples": {
+                        code: {
+                            "summary": "Too many passwords are being hashed, retry after the given delay.",
+                            "value": {"detail": code},
+                        },
+                    }
+                }
+            },
+        },
+    }
+
+
+@contextmanager
+def handle_password_hashing_overloaded(
+    code: ErrorCode = ErrorCode.PASSWORD_HASHING_OVERLOADED,
+) -> Iterator[None]:
+    """
+    Turn `PasswordHashingOverloaded` into a 503 response with a `Retry-After` header.
+
+    Wrap the calls of the user manager methods hashing or verifying passwords with it.
+
+    :param code: The error code returned as the detail of the response.
+    """
+    try:
+        yield
+    except exceptions.PasswordHashingOverloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=code,
+            headers={"Retry-After": str(e.retry_after)},
+        ) from e
@@ -3,6 +3,7 @@ from pydantic import EmailStr
 
 from filuta_fastapi_users import exceptions, models
 from filuta_fastapi_users.manager import BaseUserManager, UserManagerDependency
+from filuta_fastapi_users.router.common import get_overloaded_response, handle_password_hashing_overloaded
 
 
 def get_forgot_password_router(
@@ -15,6 +16,7 @@ def get_forgot_password_router(
         "/forgot-password",
         status_code=status.HTTP_202_ACCEPTED,
         name="reset:forgot_password",
+        responses=get_overloaded_response(),
     )
     async def forgot_password(
         request: Request,
@@ -26,9 +28,10 @@ def get_forgot_password_router(
         except exceptions.UserNotExists:
             return
 
-        try:
-            await user_manager.forgot_password(user, request)
-        except exceptions.UserInactive:
-            pass
+        with handle_password_hashing_overloaded():
+            try:
+                await user_manager.forgot_password(user, request)
+            except exceptions.UserInactive:
+                pass
 
     return router
@@ -12,7 +12,12 @@ from filuta_fastapi_users.authentication import AuthenticationBackend, Authentic
 from filuta_fastapi_users.exceptions import UserAlreadyExists
 from filuta_fastapi_users.jwt import SecretType, decode_jwt, generate_jwt
 from filuta_fastapi_users.manager import BaseUserManager, UserManagerDependency
-from filuta_fastapi_users.router.common import ErrorCode, ErrorModel
+from filuta_fastapi_users.router.common import (
+    ErrorCode,
+    ErrorModel,
+    get_overloaded_response,
+    handle_password_hashing_overloaded,
+)
 
 STATE_TOKEN_AUDIENCE = "fastapi-users:oauth-state"  # nosec B105
 CSRF_TOKEN_KEY = "csrftoken"  # nosec B105
@@ -128,6 +133,7 @@ def get_oauth_router(  # noqa: C901
                     }
                 },
             },
+            **get_overloaded_response(),
         },
     )
     async def callback(
@@ -173,23 +179,24 @@ def get_oauth_router(  # noqa: C901
             )
 
         refresh_token = token.get("refresh_token")
-        try:
-            user = await user_manager.oauth_callback(
-                oauth_client.name,
-                access_token,
-                account_id,
-                account_email,
-                token.get("expires_at"),
-                refresh_token,
-                request,
-                associate_by_email=associate_by_email,
-                is_verified_by_default=is_verified_by_default,
-            )
-        except UserAlreadyExists:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=ErrorCode.OAUTH_USER_ALREADY_EXISTS,
-            )
+        with handle_password_hashing_overloaded():
+            try:
+                user = await user_manager.oauth_callback(
+                    oauth_client.name,
+                    access_token,
+                    account_id,
+                    account_email,
+                    token.get("expires_at"),
+                    refresh_token,
+                    request,
+                    associate_by_email=associate_by_email,
+                    is_verified_by_default=is_verified_by_default,
+                )
+            except UserAlreadyExists:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=ErrorCode.OAUTH_USER_ALREADY_EXISTS,
+                )
 
         if not user.is_active:
             raise HTTPException(
@@ -5,16 +5,21 @@ from fastapi import APIRouter, Depends, Request
 from pydantic import BaseModel
 
 from filuta_fastapi_users import models
-from filuta_fastapi_users.authentication import AuthenticationBackend, Authenticator, Strategy
+from filuta_fastapi_users.authentication import (
+    AuthenticationBackend,
+    Authenticator,
+    Strategy,
+    StrategyTokenNotFoundError,
+)
 from filuta_fastapi_users.authentication.mfa.otp_manager import OtpManager, OtpManagerDependency
 from filuta_fastapi_users.manager import BaseUserManager, UserManagerDependency
 
 
 class OtpResponse(BaseModel):
     status: bool
-    message: str | None
-    error: str | None
-    access_token: Any | None
+    message: str | None = None
+    error: str | None = None
+    access_token: Any | None = None
 
 
 def get_otp_router(  # noqa: C901
@@ -53,7 +58,7 @@ def get_otp_router(  # noqa: C901
         user, token = user_token
         target_mfa_verification = jsonBody.type
 
-        access_token_record = await strategy.get_token_record(token=token)
+        access_token_record = await authenticator.get_token_record(request, backend, strategy, token)
         if access_token_record is not None:
             token_mfas = access_token_record.mfa_scopes
 
@@ -67,7 +72,7 @@ def get_otp_router(  # noqa: C901
             otp_token_record = await otp_manager.create_otp_token(token, otp_token, "email")
 
             await user_manager.on_after_otp_email_created(user, access_token_record, otp_token_record)
-            return OtpResponse(status=True, message="E-mail was sent")  # type: ignore[call-arg]
+            return OtpResponse(status=True, message="E-mail was sent")
 
         """ todo as feature """
         if "sms" in token_mfas and target_mfa_verification == "sms":
@@ -77,7 +82,7 @@ def get_otp_router(  # noqa: C901
         if "authenticator" in token_mfas and target_mfa_verification == "authenticator":
             pass
 
-        return OtpResponse(status=False, error="No MFA")  # type: ignore[call-arg]
+        return OtpResponse(status=False, error="No MFA")
 
     class ValidateOtpTokenRequestBody(BaseModel):
         code: str
@@ -103,9 +108,9 @@ def get_otp_router(  # noqa: C901
         otp_record = await otp_manager.find_otp_token(token, mfa_type, mfa_token, only_valid=True)
 
         if otp_record is not None:
-            token_record = await strategy.get_token_record(token=token)
+            token_record = await authenticator.get_token_record(request, backend, strategy, token)
             if token_record is None:
-                return OtpResponse(status=False, error="no-token")  # type: ignore[call-arg]
+                return OtpResponse(status=False, error="no-token")
 
             token_mfa_scopes = copy.deepcopy(token_record.mfa_scopes)
             token_mfa_scopes[mfa_type] = 1
@@ -115,11 +120,18 @@ def get_otp_router(  # noqa: C901
             else:
                 scopes = "none"
 
-            new_token = await strategy.update_token(token_record, {"mfa_scopes": token_mfa_scopes, "scopes": scopes})
+            try:
+                new_token = await strategy.update_token(
+                    token_record, {"mfa_scopes": token_mfa_scopes, "scopes": scopes}
+                )
+            except StrategyTokenNotFoundError:
+                return OtpResponse(status=False, error="no-token")
+            # Read before the deletion commits the session, which expires the record
+            new_token_value = new_token.token
             await otp_manager.delete_record(otp_record=otp_record)
 
-            return OtpResponse(status=True, message="Approved", access_token=new_token)  # type: ignore[call-arg]
+            return OtpResponse(status=True, message="Approved", access_token=new_token_value)
 
-        return OtpResponse(status=False, error="no-token")  # type: ignore[call-arg]
+        return OtpResponse(status=False, error="no-token")
 
     return router
@@ -2,7 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 
 from filuta_fastapi_users import exceptions, models, schemas
 from filuta_fastapi_users.manager import BaseUserManager, UserManagerDependency
-from filuta_fastapi_users.router.common import ErrorCode, ErrorModel
+from filuta_fastapi_users.router.common import (
+    ErrorCode,
+    ErrorModel,
+    get_overloaded_response,
+    handle_password_hashing_overloaded,
+)
 
 
 def get_register_router(
@@ -41,6 +46,7 @@ def get_register_router(
                     }
                 },
             },
+            **get_overloaded_response(),
         },
     )
     async def register(
@@ -48,21 +54,22 @@ def get_register_router(
         user_create: user_create_schema,  # type: ignore
         user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
     ) -> schemas.U:
-        try:
-            created_user = await user_manager.create(user_create, True, request)
-        except exceptions.UserAlreadyExists:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=ErrorCode.REGISTER_USER_ALREADY_EXISTS,
-            )
-        except exceptions.InvalidPasswordException as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={
-                    "code": ErrorCode.REGISTER_INVALID_PASSWORD,
-                    "reason": e.reason,
-                },
-            )
+        with handle_password_hashing_overloaded():
+            try:
+                created_user = await user_manager.create(user_create, True, request)
+            except exceptions.UserAlreadyExists:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=ErrorCode.REGISTER_USER_ALREADY_EXISTS,
+                )
+            except exceptions.InvalidPasswordException as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={
+                        "code": ErrorCode.REGISTER_INVALID_PASSWORD,
+                        "reason": e.reason,
+                    },
+                )
 
         return user_schema.model_validate(created_user)
 
@@ -3,7 +3,12 @@ from fastapi import APIRouter, Body, Depends, HTTPException, Request, status
 from filuta_fastapi_users import exceptions, models
 from filuta_fastapi_users.manager import BaseUserManager, UserManagerDependency
 from filuta_fastapi_users.openapi import OpenAPIResponseType
-from filuta_fastapi_users.router.common import ErrorCode, ErrorModel
+from filuta_fastapi_users.router.common import (
+    ErrorCode,
+    ErrorModel,
+    get_overloaded_response,
+    handle_password_hashing_overloaded,
+)
 
 RESET_PASSWORD_RESPONSES: OpenAPIResponseType = {
     status.HTTP_400_BAD_REQUEST: {
@@ -28,6 +33,7 @@ RESET_PASSWORD_RESPONSES: OpenAPIResponseType = {
             }
         },
     },
+    **get_overloaded_response(),
 }
 
 
@@ -48,24 +54,25 @@ def get_reset_password_router(
         password: str = Body(...),
         user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
     ) -> None:
-        try:
-            await user_manager.reset_password(token, password, request)
-        except (
-            exceptions.InvalidResetPasswordToken,
-            exceptions.UserNotExists,
-            exceptions.UserInactive,
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=ErrorCode.RESET_PASSWORD_BAD_TOKEN,
-            )
-        except exceptions.InvalidPasswordException as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={
-                    "code": ErrorCode.RESET_PASSWORD_INVALID_PASSWORD,
-                    "reason": e.reason,
-                },
-            )
+        with handle_password_hashing_overloaded():
+            try:
+                await user_manager.reset_password(token, password, request)
+            except (
+                exceptions.InvalidResetPasswordToken,
+                exceptions.UserNotExists,
+                exceptions.UserInactive,
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=ErrorCode.RESET_PASSWORD_BAD_TOKEN,
+                )
+            except exceptions.InvalidPasswordException as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={
+                        "code": ErrorCode.RESET_PASSWORD_INVALID_PASSWORD,
+                        "reason": e.reason,
+                    },
+                )
 
     return router
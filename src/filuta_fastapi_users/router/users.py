@@ -3,7 +3,12 @@ from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from filuta_fastapi_users import exceptions, models, schemas
 from filuta_fastapi_users.authentication import Authenticator
 from filuta_fastapi_users.manager import BaseUserManager, UserManagerDependency
-from filuta_fastapi_users.router.common import ErrorCode, ErrorModel
+from filuta_fastapi_users.router.common import (
+    ErrorCode,
+    ErrorModel,
+    get_overloaded_response,
+    handle_password_hashing_overloaded,
+)
 
 
 def get_users_router(  # noqa: C901
@@ -60,6 +65,7 @@ def get_users_router(  # noqa: C901
                     }
                 },
             },
+            **get_overloaded_response(),
         },
     )
     async def update_me(
@@ -68,22 +74,23 @@ def get_users_router(  # noqa: C901
         user: models.UP = Depends(get_current_active_user),
         user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
     ) -> schemas.U:
-        try:
-            user = await user_manager.update(user_update, user, safe=True, request=request)
-            return user_schema.model_validate(user)
-        except exceptions.InvalidPasswordException as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={
-                    "code": ErrorCode.UPDATE_USER_INVALID_PASSWORD,
-                    "reason": e.reason,
-                },
-            )
-        except exceptions.UserAlreadyExists:
-            raise HTTPException(
-                status.HTTP_400_BAD_REQUEST,
-                detail=ErrorCode.UPDATE_USER_EMAIL_ALREADY_EXISTS,
-            )
+        with handle_password_hashing_overloaded():
+            try:
+                user = await user_manager.update(user_update, user, safe=True, request=request)
+                return user_schema.model_validate(user)
+            except exceptions.InvalidPasswordException as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={
+                        "code": ErrorCode.UPDATE_USER_INVALID_PASSWORD,
+                        "reason": e.reason,
+                    },
+                )
+            except exceptions.UserAlreadyExists:
+                raise HTTPException(
+                    status.HTTP_400_BAD_REQUEST,
+                    detail=ErrorCode.UPDATE_USER_EMAIL_ALREADY_EXISTS,
+                )
 
     @router.get(
         "/{id}",
@@ -142,6 +149,7 @@ def get_users_router(  # noqa: C901
                     }
                 },
             },
+            **get_overloaded_response(),
         },
     )
     async def update_user(
@@ -150,22 +158,23 @@ def get_users_router(  # noqa: C901
         user: models.UP = Depends(get_user_or_404),
         user_manager: BaseUserManager[models.UP, models.ID] = Depends(get_user_manager),
     ) -> schemas.U:
-        try:
-            user = await user_manager.update(user_update, user, safe=False, request=request)
-            return user_schema.model_validate(user)
-        except exceptions.InvalidPasswordException as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={
-                    "code": ErrorCode.UPDATE_USER_INVALID_PASSWORD,
-                    "reason": e.reason,
-                },
-            )
-        except exceptions.UserAlreadyExists:
-            raise HTTPException(
-                status.HTTP_400_BAD_REQUEST,
-                detail=ErrorCode.UPDATE_USER_EMAIL_ALREADY_EXISTS,
-            )
+        with handle_password_hashing_overloaded():
+            try:
+                user = await user_manager.update(user_update, user, safe=False, request=request)
+                return user_schema.model_validate(user)
+            except exceptions.InvalidPasswordException as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={
+                        "code": ErrorCode.UPDATE_USER_INVALID_PASSWORD,
+                        "reason": e.reason,
+                    },
+                )
+            except exceptions.UserAlreadyExists:
+                raise HTTPException(
+                    status.HTTP_400_BAD_REQUEST,
+                    detail=ErrorCode.UPDATE_USER_EMAIL_ALREADY_EXISTS,
+                )
 
     @router.delete(
         "/{id}",
@@ -0,0 +1,421 @@
+import asyncio
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import Depends, FastAPI, Request
+from fastapi.testclient import TestClient
+
+from filuta_fastapi_users.authentication import (
+    AuthenticationBackend,
+    Authenticator,
+    BearerTransport,
+    Principal,
+    Strategy,
+)
+from filuta_fastapi_users.authentication.authenticator import get_user_checks
+
+
+class StrategyMock:
+    def __init__(self, user: Any) -> None:
+        self.user = user
+        self.record = MagicMock(token="TOKEN", scopes="none")
+        self.valid_token = "TOKEN"
+        self.reads: list[tuple[str, bool]] = []
+        self.record_reads = 0
+
+    async def read_token_record(self, token: str | None, user_manager: Any, ignore_expired: bool) -> Any:
+        self.reads.append((token or "", ignore_expired))
+        if token != self.valid_token:
+            return None, None
+        return self.user, self.record
+
+    async def get_token_record(self, token: str | None) -> Any:
+        self.record_reads += 1
+        return self.record if token == self.valid_token else None
+
+
+def get_user_manager() -> MagicMock:
+    return MagicMock()
+
+
+def _get_strategy_getter(strategy: StrategyMock) -> Callable[[], StrategyMock]:
+    def get_strategy() -> StrategyMock:
+        return strategy
+
+    return get_strategy
+
+
+def _get_authenticator(strategy: StrategyMock) -> Authenticator[Any, Any, Any]:
+    transport: BearerTransport[Any] = BearerTransport(tokenUrl="auth/login")
+    backend: AuthenticationBackend[Any, Any, Any] = AuthenticationBackend(
+        name="bearer", transport=transport, get_strategy=_get_strategy_getter(strategy)
+    )
+    return Authenticator([backend], get_user_manager)
+
+
+def test_dependencies_are_memoized() -> None:
+    authenticator = _get_authenticator(StrategyMock(None))
+
+    assert authenticator.current_user(active=True) is authenticator.current_user(active=True)
+    assert authenticator.current_user(active=True) is not authenticator.current_user(active=False)
+    assert authenticator.current_user_token(active=True) is authenticator.current_user_token(active=True)
+    assert authenticator.current_user(active=True) is not authenticator.current_user_token(active=True)
+
+
+def test_token_is_resolved_once_per_request() -> None:
+    user = MagicMock(id=uuid.uuid4(), is_active=True, is_verified=True)
+    strategy = StrategyMock(user)
+    authenticator = _get_authenticator(strategy)
+    app = FastAPI()
+
+    @app.get("/me", dependencies=[Depends(authenticator.current_user(active=True, authorized=False))])
+    async def me(
+        user_token: tuple[Any, str] = Depends(authenticator.current_user_token(active=True, authorized=False)),
+        verified_user: Any = Depends(authenticator.current_user(verified=True, authorized=False)),
+    ) -> dict[str, str]:
+        assert verified_user is user_token[0]
+        return {"token": user_token[1]}
+
+    @app.get("/approved")
+    async def approved(
+        user: Any = Depends(authenticator.current_user(optional=True, authorized=False)),
+        approved_user: Any = Depends(authenticator.current_user(optional=True, authorized=True)),
+    ) -> dict[str, bool]:
+        return {"user": user is not None, "approved_user": approved_user is not None}
+
+    client = TestClient(app)
+
+    response = client.get("/me", headers={"Authorization": "Bearer TOKEN"})
+    assert response.status_code == 200
+    assert response.json() == {"token": "TOKEN"}
+    assert strategy.reads == [("TOKEN", False)]
+
+    strategy.reads.clear()
+    response = client.get("/me", headers={"Authorization": "Bearer INVALID"})
+    assert response.status_code == 401
+    assert strategy.reads == [("INVALID", False)]
+
+    strategy.reads.clear()
+    response = client.get("/approved", headers={"Authorization": "Bearer TOKEN"})
+    assert response.json() == {"user": True, "approved_user": False}
+    assert strategy.reads == [("TOKEN", False)]
+
+    strategy.reads.clear()
+    strategy.record.scopes = "approved"
+    response = client.get("/approved", headers={"Authorization": "Bearer TOKEN"})
+    assert response.json() == {"user": True, "approved_user": True}
+    assert strategy.reads == [("TOKEN", False)]
+
+
+def test_get_token_record_reuses_resolution() -> None:
+    user = MagicMock(id=uuid.uuid4(), is_active=True)
+    strategy = StrategyMock(user)
+    authenticator = _get_authenticator(strategy)
+    backend = authenticator.backends[0]
+    app = FastAPI()
+
+    @app.get("/record")
+    async def record(
+        request: Request,
+        user_token: tuple[Any, str] = Depends(authenticator.current_user_token(authorized=False)),
+    ) -> dict[str, bool]:
+        record = await authenticator.get_token_record(request, backend, strategy, user_token[1])  # type: ignore[arg-type]
+        other_record = await authenticator.get_token_record(request, backend, strategy, "OTHER")  # type: ignore[arg-type]
+        return {"record": record is strategy.record, "other_record": other_record is not None}
+
+    response = TestClient(app).get("/record", headers={"Authorization": "Bearer TOKEN"})
+    assert response.json() == {"record": True, "other_record": False}
+    assert strategy.reads == [("TOKEN", False)]
+    assert strategy.record_reads == 1
+
+
+class MinimalStrategy:
+    """A third-party strategy, implementing only the methods of the original protocol."""
+
+    def __init__(self, user: Any) -> None:
+        self.user = user
+        self.record = MagicMock(token="TOKEN", scopes="approved")
+
+    async def read_token(
+        self, token: str | None, user_manager: Any, authorized: bool = False, ignore_expired: bool = False
+    ) -> Any:
+        return self.user if token == "TOKEN" else None
+
+    async def get_token_record(self, token: str | None) -> Any:
+        return self.record if token == "TOKEN" else None
+
+
+class MinimalStrategySubclass(MinimalStrategy, Strategy[Any, Any, Any]):
+    pass
+
+
+def test_strategy_without_read_token_record() -> None:
+    user = MagicMock(id=uuid.uuid4(), is_active=True)
+
+    for strategy in (MinimalStrategy(user), MinimalStrategySubclass(user)):
+        authenticator = _get_authenticator(strategy)  # type: ignore[arg-type]
+        app = FastAPI()
+
+        @app.get("/me")
+        async def me(user_token: tuple[Any, str] = Depends(authenticator.current_user_token())) -> dict[str, str]:
+            return {"token": user_token[1]}
+
+        client = TestClient(app)
+        response = client.get("/me", headers={"Authorization": "Bearer TOKEN"})
+        assert response.status_code == 200
+        assert response.json() == {"token": "TOKEN"}
+
+        response = client.get("/me", headers={"Authorization": "Bearer INVALID"})
+        assert response.status_code == 401
+
+
+def test_get_user_checks() -> None:
+    assert get_user_checks(False, False, False, False) == ()
+    assert [attribute for attribute, _, _ in get_user_checks(True, True, True, True)] == [
+        "is_active",
+        "is_verified",
+        "is_superuser",
+        "is_poweruser",
+    ]
+
+
+def test_user_checks() -> None:
+    user = MagicMock(id=uuid.uuid4(), is_active=True, is_verified=False, is_superuser=False)
+    authenticator = _get_authenticator(StrategyMock(user))
+    app = FastAPI()
+
+    @app.get("/active", dependencies=[Depends(authenticator.current_user(active=True, authorized=False))])
+    async def active() -> None:
+        pass
+
+    @app.get("/verified", dependencies=[Depends(authenticator.current_user(verified=True, authorized=False))])
+    async def verified() -> None:
+        pass
+
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer TOKEN"}
+
+    assert client.get("/active", headers=headers).status_code == 200
+    response = client.get("/verified", headers=headers)
+    assert response.status_code == 403
+    assert response.json() == {"detail": "no-verified"}
+
+    user.is_active = False
+    response = client.get("/active", headers=headers)
+    assert response.status_code == 401
+    assert response.json() == {"detail": "no-active"}
+
+
+def test_enabled_backends() -> None:
+    user = MagicMock(id=uuid.uuid4(), is_active=True)
+    strategy = StrategyMock(user)
+    authenticator = _get_authenticator(strategy)
+
+    def get_enabled_backends() -> list[Any]:
+        return []
+
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(
+        user: Any = Depends(
+            authenticator.current_user(optional=True, authorized=False, get_enabled_backends=get_enabled_backends)
+        ),
+    ) -> dict[str, bool]:
+        return {"user": user is not None}
+
+    response = TestClient(app).get("/me", headers={"Authorization": "Bearer TOKEN"})
+    assert response.json() == {"user": False}
+    assert strategy.reads == []
+
+
+def test_lazy_strategies() -> None:
+    user = MagicMock(id=uuid.uuid4(), is_active=True)
+    strategies = {"bearer": StrategyMock(user), "cookie": StrategyMock(user)}
+    resolved: list[str] = []
+    closed: list[str] = []
+
+    def get_session() -> Iterator[str]:
+        yield "SESSION"
+        closed.append("SESSION")
+
+    def get_strategy_getter(name: str) -> Callable[..., StrategyMock]:
+        def get_strategy(session: str = Depends(get_session)) -> StrategyMock:
+            resolved.append(name)
+            return strategies[name]
+
+        return get_strategy
+
+    def no_token() -> None:
+        return None
+
+    backends: list[AuthenticationBackend[Any, Any, Any]] = [
+        AuthenticationBackend(
+            name="bearer", transport=BearerTransport(tokenUrl="auth/login"), get_strategy=get_strategy_getter("bearer")
+        ),
+        AuthenticationBackend(
+            name="cookie", transport=MagicMock(scheme=no_token), get_strategy=get_strategy_getter("cookie")
+        ),
+    ]
+
+    for lazy_strategies, expected in [(False, ["bearer", "cookie"]), (True, ["bearer"])]:
+        authenticator: Authenticator[Any, Any, Any] = Authenticator(
+            backends, get_user_manager, lazy_strategies=lazy_strategies
+        )
+        app = FastAPI()
+
+        @app.get("/me", dependencies=[Depends(authenticator.current_user(authorized=False))])
+        async def me() -> None:
+            pass
+
+        resolved.clear()
+        closed.clear()
+        response = TestClient(app).get("/me", headers={"Authorization": "Bearer TOKEN"})
+        assert response.status_code == 200
+        assert resolved == expected
+        assert closed == ["SESSION"]
+
+
+def test_tagged_tokens_are_dispatched() -> None:
+    user = MagicMock(id=uuid.uuid4(), is_active=True)
+    strategies = {tag: StrategyMock(user) for tag in ("a", "b", "c")}
+    for tag, strategy in strategies.items():
+        strategy.valid_token = f"{tag}~TOKEN"
+
+    backends: list[AuthenticationBackend[Any, Any, Any]] = [
+        AuthenticationBackend(
+            name=tag,
+            transport=BearerTransport(tokenUrl="auth/login"),
+            get_strategy=_get_strategy_getter(strategy),
+            token_tag=tag,
+        )
+        for tag, strategy in strategies.items()
+    ]
+    authenticator: Authenticator[Any, Any, Any] = Authenticator(backends, get_user_manager)
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(user: Any = Depends(authenticator.current_user(optional=True, authorized=False))) -> bool:
+        return user is not None
+
+    client = TestClient(app)
+
+    assert client.get("/me", headers={"Authorization": "Bearer c~TOKEN"}).json() is True
+    assert [len(strategy.reads) for strategy in strategies.values()] == [0, 0, 1]
+
+    # Untagged tokens and unknown tags fall back to the ordered scan
+    for token in ("TOKEN", "z~TOKEN"):
+        for strategy in strategies.values():
+            strategy.reads.clear()
+        assert client.get("/me", headers={"Authorization": f"Bearer {token}"}).json() is False
+        assert [len(strategy.reads) for strategy in strategies.values()] == [1, 1, 1]
+
+
+class SlowStrategyMock(StrategyMock):
+    def __init__(self, user: Any, delay: float) -> None:
+        super().__init__(user)
+        self.delay = delay
+        self.cancelled = False
+
+    async def get_token_record(self, token: str | None) -> Any:
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return await super().get_token_record(token)
+
+
+def test_concurrent_backends() -> None:
+    user = MagicMock(id=uuid.uuid4(), is_active=True)
+    strategies = {
+        "slow_failure": SlowStrategyMock(None, 0.05),
+        "success": SlowStrategyMock(user, 0),
+        "hanging": SlowStrategyMock(user, 60),
+    }
+    strategies["slow_failure"].valid_token = "OTHER"
+    strategies["success"].record.user_id = str(user.id)
+
+    async def get_user(id: uuid.UUID) -> Any:
+        # The lookups are over once the user is loaded, so that they may share its session
+        assert strategies["hanging"].cancelled
+        assert id == user.id
+        return user
+
+    user_manager = MagicMock(parse_id=uuid.UUID, get=AsyncMock(side_effect=get_user))
+    backends: list[AuthenticationBackend[Any, Any, Any]] = [
+        AuthenticationBackend(
+            name=name, transport=BearerTransport(tokenUrl="auth/login"), get_strategy=_get_strategy_getter(strategy)
+        )
+        for name, strategy in strategies.items()
+    ]
+    authenticator: Authenticator[Any, Any, Any] = Authenticator(
+        backends, lambda: user_manager, concurrent_backends=True
+    )
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(user: Any = Depends(authenticator.current_user(optional=True, authorized=False))) -> bool:
+        return user is not None
+
+    start = time.perf_counter()
+    assert TestClient(app).get("/me", headers={"Authorization": "Bearer TOKEN"}).json() is True
+    assert time.perf_counter() - start < 10
+
+    assert [strategy.record_reads for strategy in strategies.values()] == [1, 1, 0]
+    assert [strategy.cancelled for strategy in strategies.values()] == [False, False, True]
+    assert [len(strategy.reads) for strategy in strategies.values()] == [0, 0, 0]
+    user_manager.get.assert_awaited_once()
+
+
+def test_current_principal() -> None:
+    user = MagicMock(id=uuid.uuid4(), is_active=True, is_verified=False, is_superuser=False, is_poweruser=False)
+    strategy = StrategyMock(user)
+    strategy.record.user_id = str(user.id)
+    principal_manager = MagicMock()
+    principal_manager.parse_id = uuid.UUID
+    principal_manager.get_principal = AsyncMock(return_value=Principal.from_user(user))
+
+    def get_principal_manager() -> MagicMock:
+        return principal_manager
+
+    transport: BearerTransport[Any] = BearerTransport(tokenUrl="auth/login")
+    backend: AuthenticationBackend[Any, Any, Any] = AuthenticationBackend(
+        name="bearer", transport=transport, get_strategy=_get_strategy_getter(strategy)
+    )
+    authenticator: Authenticator[Any, Any, Any] = Authenticator([backend], get_principal_manager)
+    app = FastAPI()
+
+    @app.get("/principal")
+    async def principal(
+        principal: Principal = Depends(authenticator.current_principal(active=True, authorized=False)),
+    ) -> str:
+        return str(principal.id)
+
+    @app.get("/verified")
+    async def verified(
+        principal: Any = Depends(authenticator.current_principal(verified=True, optional=True, authorized=False)),
+    ) -> bool:
+        return principal is not None
+
+    @app.get("/both")
+    async def both(
+        user: Any = Depends(authenticator.current_user(authorized=False)),
+        principal: Principal = Depends(authenticator.current_principal(authorized=False)),
+    ) -> bool:
+        return principal.id == user.id
+
+    client = TestClient(app)
+    headers = {"Authorization": "Bearer TOKEN"}
+
+    assert client.get("/principal", headers=headers).json() == str(user.id)
+    assert client.get("/verified", headers=headers).json() is False
+    assert strategy.reads == []
+    assert strategy.record_reads == 2
+    assert principal_manager.get_principal.await_count == 2
+
+    assert client.get("/both", headers=headers).json() is True
+    assert principal_manager.get_principal.await_count == 2
@@ -0,0 +1,130 @@
+import uuid
+from datetime import UTC, datetime
+
+import pytest
+
+from filuta_fastapi_users.authentication.principal import Principal, PrincipalCache
+from filuta_fastapi_users.authentication.strategy.db import cache as cache_module
+from filuta_fastapi_users.authentication.strategy.db.cache import (
+    AccessTokenCache,
+    CachedAccessToken,
+    NegativeTokenCache,
+    TTLCache,
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    return clock
+
+
+def cached_token(token: str, user_id: uuid.UUID) -> CachedAccessToken:
+    return CachedAccessToken(token, user_id, datetime.now(UTC), "none", {"email": 0})
+
+
+def test_ttl_cache_expiry(clock: Clock) -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=10, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl_seconds=5)
+    cache.set("c", 3, ttl_seconds=0)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") == 2
+    assert cache.get("c") is None
+
+    clock.now += 10
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+    clock.now += 60
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 0, "hits": 3, "misses": 3, "evictions": 0}
+
+
+def test_ttl_cache_lru_eviction(clock: Clock) -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_access_token_cache_invalidation(clock: Clock) -> None:
+    user_id, other_user_id = uuid.uuid4(), uuid.uuid4()
+    cache = AccessTokenCache()
+    cache.set("a", cached_token("a", user_id))
+    cache.set("b", cached_token("b", user_id))
+    cache.set("c", cached_token("c", other_user_id))
+
+    cache.invalidate("a")
+    assert cache.get("a") is None
+
+    cache.invalidate_user(user_id)
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert len(cache) == 1
+
+
+def test_access_token_cache_invalidation_grace(clock: Clock) -> None:
+    user_id = uuid.uuid4()
+    cache = AccessTokenCache(invalidation_grace_seconds=5)
+    cache.invalidate("a")
+    cache.invalidate_user(user_id)
+
+    # Lookups which read the records before their deletion can't put them back
+    cache.set("a", cached_token("a", uuid.uuid4()))
+    cache.set("b", cached_token("b", user_id))
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+
+    clock.now += 5
+    cache.set("a", cached_token("a", uuid.uuid4()))
+    cache.set("b", cached_token("b", user_id))
+    assert cache.get("a") is not None
+    assert cache.get("b") is not None
+
+
+def test_principal_cache_invalidation_grace(clock: Clock) -> None:
+    user_id = uuid.uuid4()
+    principal = Principal(id=user_id, is_active=True, is_verified=False, is_superuser=False, is_poweruser=False)
+    cache = PrincipalCache(invalidation_grace_seconds=5)
+    cache.set(user_id, principal)
+    cache.invalidate(user_id)
+
+    # A lookup which read the user before its update can't put it back
+    cache.set(user_id, principal)
+    assert cache.get(user_id) is None
+
+    clock.now += 5
+    cache.set(user_id, principal)
+    assert cache.get(user_id) is principal
+
+
+def test_negative_token_cache(clock: Clock) -> None:
+    cache = NegativeTokenCache(maxsize=10, ttl_seconds=5)
+    cache.add("forged" * 1000)
+
+    assert "forged" * 1000 in cache
+    assert "other" not in cache
+
+    cache.discard("forged" * 1000)
+    assert "forged" * 1000 not in cache
+
+    cache.add("forged")
+    clock.now += 5
+    assert "forged" not in cache
@@ -0,0 +1,376 @@
+"""Tests for the database authentication strategy, backed by an in-memory access token adapter."""
+
+import asyncio
+import uuid
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import pytest
+
+from filuta_fastapi_users import exceptions
+from filuta_fastapi_users.authentication.strategy.base import StrategyTokenNotFoundError
+from filuta_fastapi_users.authentication.strategy.db.cache import (
+    AccessTokenCache,
+    CachedAccessToken,
+    NegativeTokenCache,
+)
+from filuta_fastapi_users.authentication.strategy.db.signed_token import generate_signed_token
+from filuta_fastapi_users.authentication.strategy.db.strategy import DatabaseStrategy
+
+
+@dataclass
+class User:
+    id: uuid.UUID = field(default_factory=uuid.uuid4)
+    email: str = "king.arthur@camelot.bt"
+    hashed_password: str = "guinevere"
+    is_active: bool = True
+    is_superuser: bool = False
+    is_poweruser: bool = False
+    is_verified: bool = False
+
+
+@dataclass
+class AccessToken:
+    token: str
+    user_id: uuid.UUID
+    scopes: str = "none"
+    mfa_scopes: dict[str, int] = field(default_factory=lambda: {"email": 0})
+    created_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+
+class AccessTokenDatabaseMock:
+    def __init__(self, users: dict[uuid.UUID, User]) -> None:
+        self.users = users
+        self.store: dict[str, AccessToken] = {}
+        self.queries = 0
+
+    async def get_by_token(
+        self,
+        token: str,
+        max_age: datetime | None = None,
+        authorized: bool = False,
+        ignore_expired: bool = False,
+    ) -> AccessToken | None:
+        self.queries += 1
+        access_token = self.store.get(token)
+        if access_token is None:
+            return None
+        if max_age is not None and not ignore_expired and access_token.created_at < max_age:
+            return None
+        if authorized and access_token.scopes != "approved":
+            return None
+        return access_token
+
+    async def get_by_token_with_user(
+        self,
+        token: str,
+        max_age: datetime | None = None,
+        authorized: bool = False,
+        ignore_expired: bool = False,
+    ) -> tuple[AccessToken, User] | None:
+        access_token = await self.get_by_token(token, max_age, authorized, ignore_expired)
+        if access_token is None:
+            return None
+        return access_token, self.users[access_token.user_id]
+
+    async def create(self, create_dict: dict[str, Any]) -> AccessToken:
+        access_token = AccessToken(**create_dict)
+        self.store[access_token.token] = access_token
+        return access_token
+
+    async def update(self, access_token: AccessToken, update_dict: dict[str, Any]) -> AccessToken:
+        for key, value in update_dict.items():
+            setattr(access_token, key, value)
+        return access_token
+
+    async def delete(self, access_token: AccessToken) -> None:
+        self.store.pop(access_token.token, None)
+
+
+class UserManagerMock:
+    def __init__(self, users: dict[uuid.UUID, User]) -> None:
+        self.users = users
+        self.gets = 0
+
+    def parse_id(self, value: Any) -> uuid.UUID:
+        return value if isinstance(value, uuid.UUID) else uuid.UUID(value)
+
+    async def get(self, id: uuid.UUID) -> User:
+        self.gets += 1
+        try:
+            return self.users[id]
+        except KeyError:
+            raise exceptions.UserNotExists()
+
+
+@pytest.fixture
+def user() -> User:
+    return User()
+
+
+@pytest.fixture
+def users(user: User) -> dict[uuid.UUID, User]:
+    return {user.id: user}
+
+
+@pytest.fixture
+def access_token_db(users: dict[uuid.UUID, User]) -> AccessTokenDatabaseMock:
+    return AccessTokenDatabaseMock(users)
+
+
+@pytest.fixture
+def user_manager(users: dict[uuid.UUID, User]) -> UserManagerMock:
+    return UserManagerMock(users)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("joined_user_lookup", [False, True])
+async def test_read_token(
+    joined_user_lookup: bool,
+    access_token_db: AccessTokenDatabaseMock,
+    user_manager: UserManagerMock,
+    user: User,
+) -> None:
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(
+        access_token_db, 3600, joined_user_lookup=joined_user_lookup
+    )
+    access_token = await strategy.write_token(user)
+
+    assert await strategy.read_token(access_token.token, user_manager) is user  # type: ignore[arg-type]
+    assert await strategy.read_token("UNKNOWN", user_manager) is None  # type: ignore[arg-type]
+    assert await strategy.read_token(access_token.token, user_manager, authorized=True) is None  # type: ignore[arg-type]
+    assert user_manager.gets == (0 if joined_user_lookup else 1)
+
+
+def test_joined_user_lookup_requires_support() -> None:
+    class AccessTokenDatabaseWithoutJoin:
+        async def get_by_token(self, token: str) -> AccessToken | None:
+            return None
+
+    with pytest.raises(ValueError, match="get_by_token_with_user"):
+        DatabaseStrategy(AccessTokenDatabaseWithoutJoin(), joined_user_lookup=True)  # type: ignore[arg-type]
+    DatabaseStrategy(AccessTokenDatabaseWithoutJoin())  # type: ignore[arg-type]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("joined_user_lookup", [False, True])
+async def test_read_token_cached(
+    joined_user_lookup: bool,
+    access_token_db: AccessTokenDatabaseMock,
+    user_manager: UserManagerMock,
+    user: User,
+) -> None:
+    cache = AccessTokenCache(invalidation_grace_seconds=0)
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(
+        access_token_db, 3600, joined_user_lookup=joined_user_lookup, cache=cache
+    )
+    access_token = await strategy.write_token(user)
+
+    # Tokens still going through the MFA aren't cached
+    assert await strategy.read_token(access_token.token, user_manager) is user  # type: ignore[arg-type]
+    assert await strategy.read_token(access_token.token, user_manager, authorized=True) is None  # type: ignore[arg-type]
+    assert access_token_db.queries == 2
+    assert len(cache) == 0
+
+    await strategy.update_token(access_token, {"scopes": "approved"})
+    for _ in range(3):
+        assert await strategy.read_token(access_token.token, user_manager, authorized=True) is user  # type: ignore[arg-type]
+    assert access_token_db.queries == 3
+    assert cache.hits == 2
+
+    await strategy.destroy_token(access_token.token)
+    assert await strategy.read_token(access_token.token, user_manager) is None  # type: ignore[arg-type]
+
+
+@pytest.mark.anyio
+async def test_read_token_cached_expired(
+    access_token_db: AccessTokenDatabaseMock,
+    user_manager: UserManagerMock,
+    user: User,
+) -> None:
+    cache = AccessTokenCache()
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(access_token_db, 3600, cache=cache)
+    access_token = await access_token_db.create(
+        {"token": "TOKEN", "user_id": user.id, "created_at": datetime.now(UTC) - timedelta(hours=2)}
+    )
+
+    assert await strategy.read_token(access_token.token, user_manager) is None  # type: ignore[arg-type]
+    assert await strategy.read_token(access_token.token, user_manager, ignore_expired=True) is user  # type: ignore[arg-type]
+    assert len(cache) == 0
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("cache", [None, AccessTokenCache()])
+async def test_read_token_negative_cache(
+    cache: AccessTokenCache | None,
+    access_token_db: AccessTokenDatabaseMock,
+    user_manager: UserManagerMock,
+    user: User,
+) -> None:
+    negative_cache = NegativeTokenCache()
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(
+        access_token_db, 3600, cache=cache, negative_cache=negative_cache
+    )
+
+    for _ in range(3):
+        assert await strategy.read_token("FORGED", user_manager) is None  # type: ignore[arg-type]
+    assert access_token_db.queries == 1
+
+    await strategy.insert_token({"token": "FORGED", "user_id": user.id})
+    assert await strategy.read_token("FORGED", user_manager) is user  # type: ignore[arg-type]
+
+
+@pytest.mark.anyio
+async def test_read_token_negative_cache_ignores_filtered_tokens(
+    access_token_db: AccessTokenDatabaseMock,
+    user_manager: UserManagerMock,
+    user: User,
+) -> None:
+    negative_cache = NegativeTokenCache()
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(access_token_db, 3600, negative_cache=negative_cache)
+    access_token = await strategy.write_token(user)
+
+    assert await strategy.read_token(access_token.token, user_manager, authorized=True) is None  # type: ignore[arg-type]
+    assert await strategy.read_token(access_token.token, user_manager) is user  # type: ignore[arg-type]
+    assert len(negative_cache) == 0
+
+
+@pytest.mark.anyio
+async def test_read_token_signed(
+    access_token_db: AccessTokenDatabaseMock,
+    user_manager: UserManagerMock,
+    user: User,
+) -> None:
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(access_token_db, 3600, token_secret="SECRET")
+    access_token = await strategy.write_token(user)
+    assert await strategy.read_token(access_token.token, user_manager) is user  # type: ignore[arg-type]
+    assert access_token_db.queries == 1
+
+    forged_token = generate_signed_token("OTHER_SECRET")
+    expired_token = generate_signed_token("SECRET", datetime.now(UTC) - timedelta(hours=2))
+    await access_token_db.create({"token": expired_token, "user_id": user.id})
+    assert await strategy.read_token(forged_token, user_manager) is None  # type: ignore[arg-type]
+    assert await strategy.read_token(expired_token, user_manager) is None  # type: ignore[arg-type]
+    assert access_token_db.queries == 1
+    assert await strategy.read_token(expired_token, user_manager, ignore_expired=True) is user  # type: ignore[arg-type]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("allow_unsigned_tokens", [True, False])
+async def test_read_token_unsigned(
+    allow_unsigned_tokens: bool,
+    access_token_db: AccessTokenDatabaseMock,
+    user_manager: UserManagerMock,
+    user: User,
+) -> None:
+    legacy_token = await DatabaseStrategy(access_token_db).write_token(user)  # type: ignore[var-annotated]
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(
+        access_token_db, 3600, token_secret="SECRET", allow_unsigned_tokens=allow_unsigned_tokens
+    )
+
+    result = await strategy.read_token(legacy_token.token, user_manager)  # type: ignore[arg-type]
+    assert (result is user) is allow_unsigned_tokens
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("cached", [False, True])
+async def test_read_token_record(
+    cached: bool,
+    access_token_db: AccessTokenDatabaseMock,
+    user_manager: UserManagerMock,
+    user: User,
+) -> None:
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(
+        access_token_db, 3600, cache=AccessTokenCache() if cached else None
+    )
+    await access_token_db.create({"token": "TOKEN", "user_id": user.id})
+    await access_token_db.create(
+        {"token": "EXPIRED", "user_id": user.id, "created_at": datetime.now(UTC) - timedelta(hours=2)}
+    )
+
+    resolved_user, access_token = await strategy.read_token_record("TOKEN", user_manager)
+    assert resolved_user is user
+    assert access_token is not None and access_token.scopes == "none"
+
+    assert await strategy.read_token_record("EXPIRED", user_manager) == (None, None)
+    resolved_user, access_token = await strategy.read_token_record("EXPIRED", user_manager, ignore_expired=True)
+    assert resolved_user is user and access_token is not None
+    assert await strategy.read_token_record("UNKNOWN", user_manager) == (None, None)
+
+
+@pytest.mark.anyio
+async def test_update_cached_token(
+    access_token_db: AccessTokenDatabaseMock,
+    user_manager: UserManagerMock,
+    user: User,
+) -> None:
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(access_token_db, 3600, cache=AccessTokenCache())
+    stored_access_token = await access_token_db.create({"token": "TOKEN", "user_id": user.id, "scopes": "approved"})
+    _, access_token = await strategy.read_token_record("TOKEN", user_manager)
+    assert isinstance(access_token, CachedAccessToken)
+
+    updated_access_token = await strategy.update_token(access_token, {"mfa_scopes": {"email": 1}})
+    assert updated_access_token is stored_access_token
+    assert stored_access_token.mfa_scopes == {"email": 1}
+    assert await strategy.read_token("TOKEN", user_manager, authorized=True) is user
+
+    await access_token_db.delete(stored_access_token)
+    with pytest.raises(StrategyTokenNotFoundError):
+        await strategy.update_token(access_token, {"scopes": "none"})
+
+
+@pytest.mark.anyio
+async def test_destroy_token_during_lookup(
+    access_token_db: AccessTokenDatabaseMock,
+    user_manager: UserManagerMock,
+    user: User,
+) -> None:
+    cache = AccessTokenCache()
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(access_token_db, 3600, cache=cache)
+    await access_token_db.create({"token": "TOKEN", "user_id": user.id})
+
+    # The lookup reads the record, then is suspended until the token is destroyed
+    read, resume = asyncio.Event(), asyncio.Event()
+    get_by_token = access_token_db.get_by_token
+
+    async def get_by_token_then_wait(*args: Any, **kwargs: Any) -> AccessToken | None:
+        access_token = await get_by_token(*args, **kwargs)
+        if not read.is_set():
+            read.set()
+            await resume.wait()
+        return access_token
+
+    access_token_db.get_by_token = get_by_token_then_wait  # type: ignore[method-assign]
+    lookup = asyncio.create_task(strategy.read_token_record("TOKEN", user_manager))  # type: ignore[arg-type]
+    await read.wait()
+    await strategy.destroy_token("TOKEN")
+    resume.set()
+    _, access_token = await lookup
+
+    assert access_token is not None
+    assert cache.get("TOKEN") is None
+    assert await strategy.read_token("TOKEN", user_manager) is None  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize("token_secret", [None, "SECRET"])
+def test_generate_tagged_token(token_secret: str | None, access_token_db: AccessTokenDatabaseMock) -> None:
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(
+        access_token_db, 3600, token_secret=token_secret, token_tag="abcd"
+    )
+    token = strategy.generate_token()
+
+    assert token.startswith("abcd~")
+    assert len(token) <= 43
+
+
+@pytest.mark.anyio
+async def test_get_token_record_cached(access_token_db: AccessTokenDatabaseMock, user: User) -> None:
+    strategy: DatabaseStrategy[Any, Any, Any] = DatabaseStrategy(access_token_db, 3600, cache=AccessTokenCache())
+    await access_token_db.create({"token": "TOKEN", "user_id": user.id, "scopes": "approved"})
+
+    for _ in range(2):
+        access_token = await strategy.get_token_record("TOKEN")
+        assert access_token is not None and access_token.user_id == user.id
+    assert await strategy.get_token_record_raw("TOKEN") is not None
+    assert access_token_db.queries == 1
@@ -0,0 +1,624 @@
+"""Tests for the SQLAlchemy database adapters, run against an in-memory SQLite database."""
+
+import uuid
+from collections.abc import AsyncGenerator
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from sqlalchemy import event, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+
+from filuta_fastapi_users import FastAPIUsers
+from filuta_fastapi_users.authentication import AuthenticationBackend, BearerTransport, DatabaseStrategy
+from filuta_fastapi_users.authentication.mfa.otp_manager import OtpManager
+from filuta_fastapi_users.filuta_uds import (
+    SQLAlchemyBaseUserTableUUID,
+    SQLAlchemyNormalizedEmailMixin,
+    SQLAlchemyUserDatabase,
+)
+from filuta_fastapi_users.filuta_uds.access_token import (
+    SQLAlchemyAccessTokenDatabase,
+    SQLAlchemyBaseAccessTokenTableUUID,
+)
+from filuta_fastapi_users.filuta_uds.otp_token import (
+    SQLAlchemyBaseOtpTokenTable,
+    SQLAlchemyOtpTokenDatabase,
+)
+from filuta_fastapi_users.filuta_uds.replica import RecentWrites
+from filuta_fastapi_users.filuta_uds.revoked_token import (
+    SQLAlchemyBaseRevokedTokenTableUUID,
+    SQLAlchemyRevokedTokenDatabase,
+)
+from filuta_fastapi_users.filuta_uds.unit_of_work import get_unit_of_work_dependency
+from filuta_fastapi_users.manager import BaseUserManager, UUIDIDMixin
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class User(SQLAlchemyBaseUserTableUUID, Base):
+    pass
+
+
+class NormalizedEmailUser(SQLAlchemyNormalizedEmailMixin, SQLAlchemyBaseUserTableUUID, Base):
+    __tablename__ = "normalized_email_user"
+
+
+class AccessToken(SQLAlchemyBaseAccessTokenTableUUID, Base):
+    pass
+
+
+class RevokedToken(SQLAlchemyBaseRevokedTokenTableUUID, Base):
+    pass
+
+
+class OtpToken(SQLAlchemyBaseOtpTokenTable[uuid.UUID], Base):
+    pass
+
+
+class UserManager(UUIDIDMixin, BaseUserManager[Any, uuid.UUID]):
+    pass
+
+
+@pytest.fixture
+async def session() -> AsyncGenerator[AsyncSession]:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with async_sessionmaker(engine)() as session:
+        yield session
+
+    await engine.dispose()
+
+
+@pytest.fixture
+async def user(session: AsyncSession) -> User:
+    user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(session, User)
+    return await user_db.create({"email": "king.arthur@camelot.bt", "hashed_password": "guinevere"})
+
+
+@pytest.fixture
+def access_token_db(session: AsyncSession) -> SQLAlchemyAccessTokenDatabase[AccessToken]:
+    return SQLAlchemyAccessTokenDatabase(session, AccessToken, User)
+
+
+@pytest.mark.anyio
+async def test_get_by_token_with_user(
+    access_token_db: SQLAlchemyAccessTokenDatabase[AccessToken],
+    user: User,
+) -> None:
+    await access_token_db.create({"token": "TOKEN", "user_id": user.id, "scopes": "none", "mfa_scopes": {"email": 0}})
+
+    result = await access_token_db.get_by_token_with_user("TOKEN")
+    assert result is not None
+    access_token, token_user = result
+    assert access_token.token == "TOKEN"
+    assert token_user.id == user.id
+
+    assert await access_token_db.get_by_token_with_user("UNKNOWN") is None
+
+
+@pytest.mark.anyio
+async def test_get_by_token_with_user_filters(
+    access_token_db: SQLAlchemyAccessTokenDatabase[AccessToken],
+    user: User,
+) -> None:
+    await access_token_db.create(
+        {
+            "token": "TOKEN",
+            "user_id": user.id,
+            "scopes": "none",
+            "mfa_scopes": {"email": 0},
+            "created_at": datetime.now(UTC) - timedelta(hours=2),
+        }
+    )
+    max_age = datetime.now(UTC) - timedelta(hours=1)
+
+    assert await access_token_db.get_by_token_with_user("TOKEN", max_age) is None
+    assert await access_token_db.get_by_token_with_user("TOKEN", max_age, ignore_expired=True) is not None
+    assert await access_token_db.get_by_token_with_user("TOKEN", authorized=True) is None
+
+
+@pytest.mark.anyio
+async def test_lookup_statements_are_cached(
+    session: AsyncSession,
+    access_token_db: SQLAlchemyAccessTokenDatabase[AccessToken],
+    user: User,
+) -> None:
+    user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(session, User)
+    user_id = user.id
+    await access_token_db.create({"token": "TOKEN", "user_id": user_id, "scopes": "none", "mfa_scopes": {"email": 0}})
+    max_age = datetime.now(UTC) - timedelta(hours=1)
+
+    assert (await user_db.get(user_id)) is user
+    assert (await user_db.get_by_email("KING.ARTHUR@camelot.bt")) is user
+    assert await access_token_db.get_by_token("TOKEN", max_age) is not None
+    assert await access_token_db.get_by_token("TOKEN", max_age, authorized=True) is None
+
+    other_access_token_db = SQLAlchemyAccessTokenDatabase(session, AccessToken, User)
+    assert other_access_token_db._get_token_statement(False, True, False) is access_token_db._get_token_statement(
+        False, True, False
+    )
+    assert access_token_db._get_token_statement(False, True, True) is not access_token_db._get_token_statement(
+        False, True, False
+    )
+    assert SQLAlchemyUserDatabase(session, User)._get_lookup_statement("id") is user_db._get_lookup_statement("id")
+
+
+@pytest.mark.anyio
+async def test_get_by_token_with_user_requires_user_table(session: AsyncSession) -> None:
+    access_token_db: SQLAlchemyAccessTokenDatabase[AccessToken] = SQLAlchemyAccessTokenDatabase(session, AccessToken)
+    with pytest.raises(ValueError, match="user_table"):
+        await access_token_db.get_by_token_with_user("TOKEN")
+
+
+@pytest.mark.anyio
+async def test_revoked_token_database(session: AsyncSession, user: User) -> None:
+    revoked_token_db = SQLAlchemyRevokedTokenDatabase(session, RevokedToken)
+    user_id, now = user.id, datetime.now(UTC)
+    for jti, revoked_at, expires_at in [
+        ("OLD", now - timedelta(minutes=10), now + timedelta(hours=1)),
+        ("RECENT", now, now + timedelta(hours=1)),
+        ("EXPIRED", now - timedelta(hours=2), now - timedelta(hours=1)),
+        ("USER", now, None),
+    ]:
+        await revoked_token_db.create(
+            {"jti": jti, "user_id": user_id, "revoked_at": revoked_at, "expires_at": expires_at}
+        )
+
+    revoked = await revoked_token_db.get_revoked_since()
+    assert {revoked_token.jti for revoked_token in revoked} == {"OLD", "RECENT", "USER"}
+
+    revoked = await revoked_token_db.get_revoked_since(now - timedelta(minutes=1))
+    assert {revoked_token.jti for revoked_token in revoked} == {"RECENT", "USER"}
+
+    await revoked_token_db.delete_expired()
+    assert await session.get(RevokedToken, "EXPIRED") is None
+    assert await session.get(RevokedToken, "OLD") is not None
+
+
+@pytest.mark.anyio
+async def test_update_password_hashes(session: AsyncSession, user: User) -> None:
+    user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(session, User)
+    user_id = user.id
+    other = await user_db.create({"email": "lancelot@camelot.bt", "hashed_password": "CHANGED"})
+    other_id = other.id
+
+    upgraded = await user_db.update_password_hashes([(user_id, "guinevere", "NEW"), (other_id, "OLD", "NEW")])
+
+    assert upgraded == 1
+    session.expire_all()
+    assert (await user_db.get(user_id)).hashed_password == "NEW"
+    assert (await user_db.get(other_id)).hashed_password == "CHANGED"
+    assert await user_db.update_password_hashes([]) == 0
+
+
+@pytest.mark.anyio
+async def test_create_many(session: AsyncSession, user: User) -> None:
+    user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(session, User, insert_chunk_size=2)
+
+    assert await user_db.get_existing_emails(["KING.ARTHUR@camelot.bt", "lancelot@camelot.bt"]) == {
+        "king.arthur@camelot.bt"
+    }
+    assert await user_db.get_existing_emails([]) == set()
+
+    errors = await user_db.create_many(
+        [
+            {"email": "lancelot@camelot.bt", "hashed_password": "HASH"},
+            {"email": "king.arthur@camelot.bt", "hashed_password": "HASH"},
+            {"email": "percival@camelot.bt", "hashed_password": "HASH", "is_verified": True},
+            {"email": "galahad@camelot.bt", "hashed_password": "HASH"},
+        ]
+    )
+
+    assert errors[0] is None
+    assert errors[1] is not None
+    assert errors[2:] == [None, None]
+    assert await user_db.get_existing_emails(["lancelot@camelot.bt", "percival@camelot.bt", "galahad@camelot.bt"]) == {
+        "lancelot@camelot.bt",
+        "percival@camelot.bt",
+        "galahad@camelot.bt",
+    }
+    percival = await user_db.get_by_email("percival@camelot.bt")
+    assert percival.is_verified is True
+    assert percival.id != (await user_db.get_by_email("galahad@camelot.bt")).id
+
+
+@pytest.fixture
+def statements(session: AsyncSession) -> list[str]:
+    """Keywords of the statements sent to the database."""
+    statements: list[str] = []
+
+    def record(connection: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement.split(maxsplit=1)[0])
+
+    assert session.bind is not None
+    event.listen(session.bind.sync_engine, "before_cursor_execute", record)
+    return statements
+
+
+@pytest.mark.anyio
+async def test_writes_skip_refresh(
+    session: AsyncSession,
+    access_token_db: SQLAlchemyAccessTokenDatabase[AccessToken],
+    statements: list[str],
+) -> None:
+    user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(session, User)
+
+    user = await user_db.create({"email": "lancelot@camelot.bt", "hashed_password": "guinevere"})
+    assert statements == ["INSERT"]
+    assert user.is_active is True
+
+    access_token = await access_token_db.create(
+        {"token": "TOKEN", "user_id": user.id, "scopes": "none", "mfa_scopes": {"email": 0}}
+    )
+    access_token = await access_token_db.update(access_token, {"scopes": "approved"})
+    assert statements == ["INSERT", "INSERT", "UPDATE"]
+    assert access_token.created_at is not None
+    assert access_token.scopes == "approved"
+
+    session.expire_all()
+    stored_access_token = await access_token_db.get_by_token("TOKEN")
+    assert stored_access_token is not None
+    assert stored_access_token.scopes == "approved"
+
+
+@pytest.mark.anyio
+async def test_writes_refresh_without_returning(
+    session: AsyncSession,
+    statements: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    assert session.bind is not None
+    monkeypatch.setattr(session.bind.dialect, "insert_returning", False)
+    monkeypatch.setattr(session.bind.dialect, "update_returning", False)
+    user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(session, User)
+
+    user = await user_db.create({"email": "lancelot@camelot.bt", "hashed_password": "guinevere"})
+    user = await user_db.update(user, {"is_verified": True})
+
+    assert statements == ["INSERT", "SELECT", "UPDATE", "SELECT"]
+    assert user.is_verified is True
+
+
+@pytest.fixture
+def commits(session: AsyncSession) -> list[None]:
+    """Transactions committed on the database, savepoints excluded."""
+    commits: list[None] = []
+    assert session.bind is not None
+    event.listen(session.bind.sync_engine, "commit", lambda _: commits.append(None))
+    return commits
+
+
+@pytest.mark.anyio
+async def test_writes_without_autocommit(session: AsyncSession, statements: list[str], commits: list[None]) -> None:
+    user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(session, User, autocommit=False)
+    access_token_db: SQLAlchemyAccessTokenDatabase[AccessToken] = SQLAlchemyAccessTokenDatabase(
+        session, AccessToken, User, autocommit=False
+    )
+
+    user = await user_db.create({"email": "lancelot@camelot.bt", "hashed_password": "guinevere"})
+    access_token = await access_token_db.create(
+        {"token": "TOKEN", "user_id": user.id, "scopes": "none", "mfa_scopes": {"email": 0}}
+    )
+    access_token = await access_token_db.update(access_token, {"scopes": "approved"})
+    errors = await user_db.create_many(
+        [
+            {"email": "lancelot@camelot.bt", "hashed_password": "HASH"},
+            {"email": "percival@camelot.bt", "hashed_password": "HASH"},
+        ]
+    )
+
+    assert commits == []
+    assert "SELECT" not in statements
+    assert access_token.created_at is not None
+    assert errors[0] is not None
+    assert errors[1] is None
+
+    # The failed insert only rolled back its savepoint
+    await session.commit()
+    assert await session.scalar(select(func.count()).select_from(User)) == 2
+    assert await access_token_db.get_by_token("TOKEN") is not None
+
+
+@pytest.mark.anyio
+async def test_unit_of_work_dependency(session: AsyncSession, commits: list[None]) -> None:
+    async def get_session() -> AsyncGenerator[AsyncSession]:
+        yield session
+
+    async def get_user_db(
+        session: AsyncSession = Depends(get_session),
+    ) -> AsyncGenerator[SQLAlchemyUserDatabase[Any, Any, Any]]:
+        yield SQLAlchemyUserDatabase(session, User, autocommit=False)
+
+    app = FastAPI(dependencies=[Depends(get_unit_of_work_dependency(get_session), scope="function")])
+
+    @app.post("/users/{name}")
+    async def create_user(
+        name: str, error: int | None = None, user_db: SQLAlchemyUserDatabase[Any, Any, Any] = Depends(get_user_db)
+    ) -> None:
+        await user_db.create({"email": f"{name}@camelot.bt", "hashed_password": "HASH"})
+        await user_db.create({"email": f"{name}.2@camelot.bt", "hashed_password": "HASH"})
+        if error == 400:
+            raise HTTPException(status_code=400)
+        if error == 500:
+            raise RuntimeError()
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://test"
+    ) as client:
+        assert (await client.post("/users/lancelot")).status_code == 200
+        assert len(commits) == 1
+        assert (await client.post("/users/percival", params={"error": 400})).status_code == 400
+        assert len(commits) == 2
+        assert (await client.post("/users/galahad", params={"error": 500})).status_code == 500
+        assert len(commits) == 2
+
+    emails = set((await session.execute(select(User.email))).scalars())
+    assert emails == {
+        "lancelot@camelot.bt",
+        "lancelot.2@camelot.bt",
+        "percival@camelot.bt",
+        "percival.2@camelot.bt",
+    }
+
+
+@pytest.fixture
+async def sessionmakers(tmp_path: Path) -> AsyncGenerator[tuple[Any, Any, list[str]]]:
+    """Session factories of a primary and a replica database, with the statements sent to the replica."""
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    for engine in (primary, replica):
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+
+    replica_statements: list[str] = []
+
+    def record(connection: Any, cursor: Any, statement: str, *args: Any) -> None:
+        replica_statements.append(statement.split(maxsplit=1)[0])
+
+    event.listen(replica.sync_engine, "before_cursor_execute", record)
+
+    yield async_sessionmaker(primary), async_sessionmaker(replica), replica_statements
+
+    await primary.dispose()
+    await replica.dispose()
+
+
+@pytest.mark.anyio
+async def test_read_replica(sessionmakers: tuple[Any, Any, list[str]]) -> None:
+    primary_sessionmaker, replica_sessionmaker, replica_statements = sessionmakers
+    recent_writes = RecentWrites(window_seconds=60)
+    create_dict = {"token": "TOKEN", "scopes": "none", "mfa_scopes": {"email": 0}}
+
+    async with primary_sessionmaker() as session, replica_sessionmaker() as read_session:
+        user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(
+            session, User, read_session=read_session, recent_writes=recent_writes
+        )
+        user = await user_db.create({"email": "lancelot@camelot.bt", "hashed_password": "guinevere"})
+        user_id = user.id
+        access_token_db: SQLAlchemyAccessTokenDatabase[AccessToken] = SQLAlchemyAccessTokenDatabase(
+            session, AccessToken, User, read_session=read_session, recent_writes=recent_writes
+        )
+        await access_token_db.create({**create_dict, "user_id": user_id})
+
+        # The request reads its own writes
+        assert await access_token_db.get_by_token("TOKEN") is not None
+        assert replica_statements == []
+
+    # Another worker, which doesn't know about the writes of the first one
+    other_recent_writes = RecentWrites(window_seconds=60)
+    async with primary_sessionmaker() as session, replica_sessionmaker() as read_session:
+        user_db = SQLAlchemyUserDatabase(session, User, read_session=read_session, recent_writes=other_recent_writes)
+        access_token_db = SQLAlchemyAccessTokenDatabase(
+            session, AccessToken, User, read_session=read_session, recent_writes=other_recent_writes
+        )
+        # Tokens and users inserted a moment ago, still missing from the replica, are looked up on the primary
+        result = await access_token_db.get_by_token_with_user("TOKEN")
+        assert result is not None
+        assert result[1].id == user_id
+        assert await user_db.get_by_email("Lancelot@camelot.bt") is not None
+        assert await user_db.get(user_id) is not None
+        assert replica_statements == ["SELECT", "SELECT", "SELECT"]
+
+    # The replica catches up
+    async with replica_sessionmaker() as read_session:
+        read_session.add(User(id=user_id, email="lancelot@camelot.bt", hashed_password="guinevere"))
+        read_session.add(AccessToken(**create_dict, user_id=user_id))
+        await read_session.commit()
+    replica_statements.clear()
+
+    async with primary_sessionmaker() as session, replica_sessionmaker() as read_session:
+        access_token_db = SQLAlchemyAccessTokenDatabase(
+            session, AccessToken, User, read_session=read_session, recent_writes=recent_writes
+        )
+        result = await access_token_db.get_by_token_with_user("TOKEN")
+        assert result is not None
+        access_token, token_user = result
+        assert token_user.id == user_id
+        assert replica_statements == ["SELECT"]
+
+        # Rows read from the replica are written to the primary
+        await access_token_db.update(access_token, {"scopes": "approved"})
+
+    async with primary_sessionmaker() as session, replica_sessionmaker() as read_session:
+        access_token_db = SQLAlchemyAccessTokenDatabase(
+            session, AccessToken, User, read_session=read_session, recent_writes=recent_writes
+        )
+        # The replica still has the previous version, the recent write is read from the primary
+        access_token = await access_token_db.get_by_token("TOKEN")
+        assert access_token is not None
+        assert access_token.scopes == "approved"
+
+        primary_statements: list[str] = []
+
+        def record(connection: Any, cursor: Any, statement: str, *args: Any) -> None:
+            primary_statements.append(statement.split(maxsplit=1)[0])
+
+        event.listen(primary_sessionmaker.kw["bind"].sync_engine, "before_cursor_execute", record)
+        assert await access_token_db.get_by_token("UNKNOWN") is None
+        assert replica_statements == ["SELECT", "SELECT", "SELECT"]
+        assert primary_statements == ["SELECT"]
+
+        # Other rows missing from the replica aren't looked up on the primary, unless inserted by this process
+        otp_token_db = SQLAlchemyOtpTokenDatabase(
+            session, OtpToken, read_session=read_session, recent_writes=recent_writes
+        )
+        assert await otp_token_db.get_by_access_token("UNKNOWN") is None
+        assert primary_statements == ["SELECT"]
+
+
+@pytest.mark.anyio
+async def test_read_replica_bulk_insert(sessionmakers: tuple[Any, Any, list[str]]) -> None:
+    primary_sessionmaker, replica_sessionmaker, replica_statements = sessionmakers
+    recent_writes = RecentWrites(window_seconds=60)
+
+    async with primary_sessionmaker() as session, replica_sessionmaker() as read_session:
+        user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(
+            session, User, read_session=read_session, recent_writes=recent_writes
+        )
+        assert await user_db.create_many([{"email": "percival@camelot.bt", "hashed_password": "grail"}]) == [None]
+        assert user_db.reads.sticky
+
+    async with primary_sessionmaker() as session, replica_sessionmaker() as read_session:
+        user_db = SQLAlchemyUserDatabase(session, User, read_session=read_session, recent_writes=recent_writes)
+        assert await user_db.get_by_email("Percival@camelot.bt") is not None
+        assert await user_db.get_by_email("galahad@camelot.bt") is None
+        assert replica_statements == ["SELECT", "SELECT"]
+
+
+@pytest.mark.anyio
+async def test_normalized_email(session: AsyncSession) -> None:
+    user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(session, NormalizedEmailUser)
+    assert user_db.normalizes_emails is True
+    assert SQLAlchemyUserDatabase(session, User).normalizes_emails is False
+
+    user = await user_db.create({"email": "King.Arthur@camelot.bt", "hashed_password": "guinevere"})
+    assert user.normalized_email == "king.arthur@camelot.bt"
+    assert await user_db.get_by_email("KING.ARTHUR@CAMELOT.BT") is user
+
+    user = await user_db.update(user, {"email": "Arthur@camelot.bt"})
+    assert user.normalized_email == "arthur@camelot.bt"
+    assert await user_db.get_by_email("king.arthur@camelot.bt") is None
+    assert await user_db.get_by_email("arthur@camelot.bt") is user
+
+    await user_db.create_many([{"email": "Lancelot@camelot.bt", "hashed_password": "HASH"}])
+    assert await user_db.get_existing_emails(["LANCELOT@camelot.bt", "percival@camelot.bt"]) == {"lancelot@camelot.bt"}
+
+    # Once the normalized emails are backfilled, the lookup searches the index instead of scanning the table
+    user_db = SQLAlchemyUserDatabase(session, NormalizedEmailUser, normalized_emails_backfilled=True)
+    assert await user_db.get_by_email("arthur@camelot.bt") is user
+    statement = user_db._get_lookup_statement("email").compile(session.bind)
+    connection = await session.connection()
+    plan = await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", ("arthur@camelot.bt",))
+    details = [detail for *_, detail in plan]
+    assert details
+    assert all(detail.startswith("SEARCH") for detail in details)
+
+
+@pytest.mark.anyio
+async def test_backfill_normalized_emails(session: AsyncSession) -> None:
+    user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(session, NormalizedEmailUser)
+    table: Any = NormalizedEmailUser.__table__
+    await session.execute(
+        table.insert(),
+        [
+            {
+                "id": uuid.uuid4(),
+                "email": email,
+                "hashed_password": "HASH",
+                "is_active": True,
+                "is_superuser": False,
+                "is_poweruser": False,
+                "is_verified": False,
+            }
+            for email in [*(f"Knight{i}@camelot.bt" for i in range(5)), "ÉLAINE@camelot.bt", "KNIGHT4@camelot.bt"]
+        ],
+    )
+    await session.commit()
+    backfilled_user_db: SQLAlchemyUserDatabase[Any, Any, Any] = SQLAlchemyUserDatabase(
+        session, NormalizedEmailUser, normalized_emails_backfilled=True
+    )
+    assert await backfilled_user_db.get_by_email("knight0@camelot.bt") is None
+    # Until the backfill, the users without a normalized email are found by their lowercased email
+    user = await user_db.get_by_email("knight0@camelot.bt")
+    assert user is not None
+    assert user.email == "Knight0@camelot.bt"
+    assert await user_db.get_existing_emails(["KNIGHT1@camelot.bt", "percival@camelot.bt"]) == {"knight1@camelot.bt"}
+
+    updated, collisions = await user_db.backfill_normalized_emails(batch_size=2)
+    assert updated == 6
+    assert len(collisions) == 1
+    assert await user_db.backfill_normalized_emails() == (0, collisions)
+    colliding_user = await session.get(NormalizedEmailUser, collisions[0])
+    assert colliding_user is not None
+    assert colliding_user.email.lower() == "knight4@camelot.bt"
+    assert colliding_user.normalized_email is None
+
+    user = await backfilled_user_db.get_by_email("KNIGHT3@camelot.bt")
+    assert user is not None
+    assert user.email == "Knight3@camelot.bt"
+    # SQLite's LOWER only folds ASCII characters
+    user = await backfilled_user_db.get_by_email("élaine@camelot.bt")
+    assert user is not None
+    assert user.email == "ÉLAINE@camelot.bt"
+
+    with pytest.raises(NotImplementedError):
+        await SQLAlchemyUserDatabase(session, User).backfill_normalized_emails()
+
+
+@pytest.mark.anyio
+async def test_otp_validation_with_lazy_strategies(sessionmakers: tuple[Any, Any, list[str]]) -> None:
+    primary_sessionmaker, _, _ = sessionmakers
+    async with primary_sessionmaker() as session:
+        user = await SQLAlchemyUserDatabase(session, User).create(
+            {"email": "lancelot@camelot.bt", "hashed_password": "guinevere"}
+        )
+        await SQLAlchemyAccessTokenDatabase(session, AccessToken).create(
+            {"token": "TOKEN", "user_id": user.id, "scopes": "none", "mfa_scopes": {"email": 0}}
+        )
+        await OtpManager(SQLAlchemyOtpTokenDatabase(session, OtpToken)).create_otp_token("TOKEN", "123456", "email")
+
+    # The strategies resolved by the authenticator and by the route have their own sessions
+    async def get_session() -> AsyncGenerator[AsyncSession]:
+        async with primary_sessionmaker() as session:
+            yield session
+
+    def get_user_manager(session: AsyncSession = Depends(get_session)) -> UserManager:
+        return UserManager(SQLAlchemyUserDatabase(session, User), SQLAlchemyAccessTokenDatabase(session, AccessToken), None)  # type: ignore[arg-type]
+
+    def get_strategy(session: AsyncSession = Depends(get_session)) -> DatabaseStrategy[Any, Any, Any]:
+        return DatabaseStrategy(SQLAlchemyAccessTokenDatabase(session, AccessToken, User), joined_user_lookup=True)
+
+    def get_otp_manager(session: AsyncSession = Depends(get_session)) -> OtpManager[Any]:
+        return OtpManager(SQLAlchemyOtpTokenDatabase(session, OtpToken))
+
+    backend: AuthenticationBackend[Any, Any, Any] = AuthenticationBackend(
+        name="bearer", transport=BearerTransport(tokenUrl="auth/login"), get_strategy=get_strategy
+    )
+    fastapi_users: FastAPIUsers[Any, Any, Any] = FastAPIUsers(
+        get_user_manager, [backend], lambda: None, get_otp_manager, lazy_strategies=True
+    )
+    app = FastAPI()
+    app.include_router(fastapi_users.get_otp_router(backend), prefix="/auth")
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post(
+            "/auth/otp/validate-token",
+            json={"code": "123456", "type": "email"},
+            headers={"Authorization": "Bearer TOKEN"},
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {"status": True, "message": "Approved", "error": None, "access_token": "TOKEN"}
+    async with primary_sessionmaker() as session:
+        access_token = await SQLAlchemyAccessTokenDatabase(session, AccessToken).get_by_token("TOKEN")
+        assert access_token is not None
+        assert access_token.scopes == "approved"
@@ -0,0 +1,183 @@
+import uuid
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from filuta_fastapi_users import exceptions
+from filuta_fastapi_users.authentication.strategy.base import StrategyDestroyNotSupportedError
+from filuta_fastapi_users.authentication.strategy.jwt import JWTStrategy
+from filuta_fastapi_users.authentication.strategy.revocation import RevocationList
+from filuta_fastapi_users.manager import UUIDIDMixin
+
+SECRET = "SECRET" * 8
+
+
+@pytest.fixture
+def user() -> MagicMock:
+    return MagicMock(id=uuid.uuid4())
+
+
+@pytest.fixture
+def user_manager(user: MagicMock) -> MagicMock:
+    async def get(id: uuid.UUID) -> MagicMock:
+        if id != user.id:
+            raise exceptions.UserNotExists()
+        return user
+
+    user_manager = MagicMock()
+    user_manager.parse_id = UUIDIDMixin().parse_id
+    user_manager.get = AsyncMock(side_effect=get)
+    return user_manager
+
+
+@pytest.fixture
+def strategy() -> JWTStrategy[Any, Any]:
+    return JWTStrategy(SECRET, 3600)
+
+
+@pytest.mark.anyio
+async def test_write_and_read_token(strategy: JWTStrategy[Any, Any], user: MagicMock, user_manager: MagicMock) -> None:
+    access_token = await strategy.write_token(user)
+
+    assert access_token.scopes == "none"
+    assert access_token.mfa_scopes == {"email": 0}
+    assert await strategy.read_token(access_token.token, user_manager) is user
+    assert await strategy.read_token(access_token.token, user_manager, authorized=True) is None
+    assert await strategy.read_token("not-a-jwt", user_manager) is None
+    assert await strategy.read_token(None, user_manager) is None
+
+
+@pytest.mark.anyio
+async def test_read_token_unknown_user(strategy: JWTStrategy[Any, Any], user_manager: MagicMock) -> None:
+    access_token = await strategy.write_token(MagicMock(id=uuid.uuid4()))
+    assert await strategy.read_token(access_token.token, user_manager) is None
+
+
+@pytest.mark.anyio
+async def test_read_token_expired(strategy: JWTStrategy[Any, Any], user: MagicMock, user_manager: MagicMock) -> None:
+    expired_strategy: JWTStrategy[Any, Any] = JWTStrategy(SECRET, -60)
+    access_token = await expired_strategy.write_token(user)
+
+    assert await strategy.read_token(access_token.token, user_manager) is None
+    assert await strategy.read_token(access_token.token, user_manager, ignore_expired=True) is user
+    assert await strategy.get_token_record(access_token.token) is None
+    assert await strategy.get_token_record_raw(access_token.token) is not None
+
+
+@pytest.mark.anyio
+async def test_update_token_reissues(strategy: JWTStrategy[Any, Any], user: MagicMock, user_manager: MagicMock) -> None:
+    access_token = await strategy.write_token(user)
+    record = await strategy.get_token_record(access_token.token)
+    assert record is not None
+
+    new_access_token = await strategy.update_token(record, {"mfa_scopes": {"email": 1}, "scopes": "approved"})
+
+    assert new_access_token.token != access_token.token
+    assert new_access_token.expires_at is not None and access_token.expires_at is not None
+    assert abs(new_access_token.expires_at - access_token.expires_at) < timedelta(seconds=1)
+    assert await strategy.read_token(new_access_token.token, user_manager, authorized=True) is user
+    new_record = await strategy.get_token_record(new_access_token.token)
+    assert new_record is not None
+    assert new_record.mfa_scopes == {"email": 1}
+
+
+@pytest.mark.anyio
+async def test_insert_token(strategy: JWTStrategy[Any, Any], user: MagicMock) -> None:
+    access_token = await strategy.insert_token(
+        {"user_id": user.id, "token": "JTI", "scopes": "approved", "mfa_scopes": {"email": 1}}
+    )
+    record = await strategy.get_token_record(access_token.token)
+    assert record is not None
+    assert record.jti == "JTI"
+    assert record.user_id == str(user.id)
+    assert record.created_at <= datetime.now(UTC)
+
+
+@pytest.mark.anyio
+async def test_destroy_token_not_supported(strategy: JWTStrategy[Any, Any], user: MagicMock) -> None:
+    access_token = await strategy.write_token(user)
+    with pytest.raises(StrategyDestroyNotSupportedError):
+        await strategy.destroy_token(access_token.token)
+    assert await strategy.get_latest_token_for_user(user) is None
+
+
+@pytest.fixture
+def revocation_list() -> RevocationList:
+    return RevocationList(token_lifetime_seconds=3600)
+
+
+@pytest.fixture
+def revoking_strategy(revocation_list: RevocationList) -> JWTStrategy[Any, Any]:
+    return JWTStrategy(SECRET, 3600, revocation_list=revocation_list)
+
+
+@pytest.mark.anyio
+async def test_destroy_token_revokes(
+    revoking_strategy: JWTStrategy[Any, Any], user: MagicMock, user_manager: MagicMock
+) -> None:
+    access_token = await revoking_strategy.write_token(user)
+    other_access_token = await revoking_strategy.write_token(user)
+
+    await revoking_strategy.destroy_token(access_token.token)
+
+    assert await revoking_strategy.read_token(access_token.token, user_manager) is None
+    assert await revoking_strategy.get_token_record_raw(access_token.token) is None
+    assert await revoking_strategy.read_token(other_access_token.token, user_manager) is user
+
+
+@pytest.mark.anyio
+async def test_update_token_revokes_previous(
+    revoking_strategy: JWTStrategy[Any, Any], user: MagicMock, user_manager: MagicMock
+) -> None:
+    access_token = await revoking_strategy.write_token(user)
+    record = await revoking_strategy.get_token_record(access_token.token)
+    assert record is not None
+
+    new_access_token = await revoking_strategy.update_token(record, {"scopes": "approved"})
+
+    assert await revoking_strategy.read_token(access_token.token, user_manager) is None
+    assert await revoking_strategy.read_token(new_access_token.token, user_manager) is user
+
+
+@pytest.mark.anyio
+async def test_revoke_user_tokens(
+    revoking_strategy: JWTStrategy[Any, Any], revocation_list: RevocationList, user: MagicMock, user_manager: MagicMock
+) -> None:
+    access_token = await revoking_strategy.write_token(user)
+    revocation_list.revoke_user(user.id)
+    new_access_token = await revoking_strategy.write_token(user)
+
+    assert await revoking_strategy.read_token(access_token.token, user_manager) is None
+    assert await revoking_strategy.read_token(new_access_token.token, user_manager) is user
+
+
+@pytest.mark.anyio
+async def test_revocations_are_persisted(
+    revocation_list: RevocationList, user: MagicMock, user_manager: MagicMock
+) -> None:
+    revoked_token_db = AsyncMock()
+    revoked_token_db.get_revoked_since.return_value = []
+    strategy: JWTStrategy[Any, Any] = JWTStrategy(
+        SECRET, 3600, revocation_list=revocation_list, revoked_token_db=revoked_token_db
+    )
+    access_token = await strategy.write_token(user)
+
+    await strategy.destroy_token(access_token.token)
+    assert await strategy.read_token(access_token.token, user_manager) is None
+
+    revoked_token_db.create.assert_awaited_once()
+    create_dict = revoked_token_db.create.await_args.args[0]
+    assert create_dict["jti"] == access_token.jti
+    assert create_dict["all_user_tokens"] is False
+    revoked_token_db.get_revoked_since.assert_awaited_once_with(None)
+
+
+@pytest.mark.anyio
+async def test_tagged_token(user: MagicMock, user_manager: MagicMock) -> None:
+    strategy: JWTStrategy[Any, Any] = JWTStrategy(SECRET, 3600, token_tag="jwt")
+    access_token = await strategy.write_token(user)
+
+    assert access_token.token.startswith("jwt~")
+    assert await strategy.read_token(access_token.token, user_manager) is user
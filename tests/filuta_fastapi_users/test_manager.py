@@ -0,0 +1,340 @@
+"""Tests for the user manager, backed by an in-memory user database."""
+
+import asyncio
+import dataclasses
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.security import OAuth2PasswordRequestForm
+from pwdlib.hashers.bcrypt import BcryptHasher
+
+from filuta_fastapi_users import exceptions, schemas
+from filuta_fastapi_users.authentication.principal import Principal, PrincipalCache
+from filuta_fastapi_users.db import BaseUserDatabase
+from filuta_fastapi_users.manager import BaseUserManager, UUIDIDMixin
+from filuta_fastapi_users.password import PasswordHelper
+from filuta_fastapi_users.password_upgrade import PasswordHashUpgrader
+
+
+@dataclass
+class User:
+    email: str
+    hashed_password: str
+    id: uuid.UUID = field(default_factory=uuid.uuid4)
+    is_active: bool = True
+    is_superuser: bool = False
+    is_poweruser: bool = False
+    is_verified: bool = False
+
+
+class UserDatabaseMock(BaseUserDatabase[User, uuid.UUID]):
+    def __init__(self) -> None:
+        self.store: dict[uuid.UUID, User] = {}
+        self.gets = 0
+
+    async def get(self, id: uuid.UUID) -> User | None:
+        self.gets += 1
+        return self.store.get(id)
+
+    async def get_by_email(self, email: str) -> User | None:
+        return next((user for user in self.store.values() if user.email.lower() == email.lower()), None)
+
+    async def get_existing_emails(self, emails: Sequence[str]) -> set[str]:
+        lowered_emails = {email.lower() for email in emails}
+        return {user.email.lower() for user in self.store.values()} & lowered_emails
+
+    async def create(self, create_dict: dict[str, Any]) -> User:
+        user = User(**create_dict)
+        self.store[user.id] = user
+        return user
+
+    async def create_many(self, create_dicts: Sequence[dict[str, Any]]) -> list[Exception | None]:
+        for create_dict in create_dicts:
+            await self.create(create_dict)
+        return [None] * len(create_dicts)
+
+    async def update(self, user: User, update_dict: dict[str, Any]) -> User:
+        for key, value in update_dict.items():
+            setattr(user, key, value)
+        return user
+
+    async def delete(self, user: User) -> None:
+        self.store.pop(user.id, None)
+
+    async def update_password_hashes(self, updates: Sequence[tuple[uuid.UUID, str, str]]) -> int:
+        upgraded = 0
+        for id, old_hashed_password, hashed_password in updates:
+            user = self.store.get(id)
+            if user is not None and user.hashed_password == old_hashed_password:
+                user.hashed_password = hashed_password
+                upgraded += 1
+        return upgraded
+
+
+class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
+    reset_password_token_secret = "SECRET"
+    verification_token_secret = "SECRET"
+
+
+def _credentials(username: str, password: str) -> OAuth2PasswordRequestForm:
+    return OAuth2PasswordRequestForm(username=username, password=password)
+
+
+@pytest.fixture
+def user_db() -> UserDatabaseMock:
+    return UserDatabaseMock()
+
+
+@pytest.fixture
+def user_manager(user_db: UserDatabaseMock, password_helper: PasswordHelper) -> UserManager:
+    return UserManager(user_db, MagicMock(), AsyncMock(), password_helper)
+
+
+@pytest.fixture
+async def user(user_db: UserDatabaseMock, password_helper: PasswordHelper) -> User:
+    return await user_db.create(
+        {"email": "king.arthur@camelot.bt", "hashed_password": password_helper.hash("guinevere")}
+    )
+
+
+@pytest.mark.anyio
+async def test_get_principal(user_manager: UserManager, user_db: UserDatabaseMock, user: User) -> None:
+    principal = await user_manager.get_principal(user.id)
+
+    assert principal == Principal(id=user.id, is_active=True, is_verified=False, is_superuser=False, is_poweruser=False)
+    with pytest.raises(exceptions.UserNotExists):
+        await user_manager.get_principal(uuid.uuid4())
+
+
+@pytest.mark.anyio
+async def test_get_principal_cached(user_manager: UserManager, user_db: UserDatabaseMock, user: User) -> None:
+    user_manager.principal_cache = PrincipalCache()
+
+    await user_manager.get_principal(user.id)
+    principal = await user_manager.get_principal(user.id)
+    assert principal.is_verified is False
+    assert user_db.gets == 1
+
+    await user_manager._update(user, {"is_verified": True})
+    principal = await user_manager.get_principal(user.id)
+    assert principal.is_verified is True
+    assert user_db.gets == 2
+
+    await user_manager.delete(user)
+    with pytest.raises(exceptions.UserNotExists):
+        await user_manager.get_principal(user.id)
+
+
+@pytest.mark.anyio
+async def test_get_principal_cached_update_race(user_manager: UserManager, user: User) -> None:
+    user_manager.principal_cache = PrincipalCache()
+    get = user_manager.get
+
+    async def get_then_update(id: uuid.UUID) -> User:
+        # The user is updated while the principal of its stale copy is being cached
+        stale_user = dataclasses.replace(await get(id))
+        await user_manager._update(user, {"is_verified": True})
+        return stale_user
+
+    user_manager.get = get_then_update  # type: ignore[method-assign]
+    assert (await user_manager.get_principal(user.id)).is_verified is False
+
+    user_manager.get = get  # type: ignore[method-assign]
+    assert (await user_manager.get_principal(user.id)).is_verified is True
+
+
+@pytest.mark.anyio
+async def test_authenticate(user_manager: UserManager, user: User) -> None:
+    assert await user_manager.authenticate(_credentials("king.arthur@camelot.bt", "guinevere")) is user
+    assert await user_manager.authenticate(_credentials("king.arthur@camelot.bt", "morgana")) is None
+    assert await user_manager.authenticate(_credentials("lancelot@camelot.bt", "guinevere")) is None
+
+
+class SyncPasswordHelper:
+    """A custom password helper, without the async methods of `PasswordHelper`."""
+
+    def __init__(self, password_helper: PasswordHelper) -> None:
+        self.password_helper = password_helper
+
+    def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        return self.password_helper.verify_and_update(plain_password, hashed_password)
+
+    def hash(self, password: str) -> str:
+        return self.password_helper.hash(password)
+
+    def generate(self) -> str:
+        return self.password_helper.generate()
+
+
+@pytest.mark.anyio
+async def test_sync_password_helper(user_db: UserDatabaseMock, password_helper: PasswordHelper, user: User) -> None:
+    user_manager = UserManager(user_db, MagicMock(), AsyncMock(), SyncPasswordHelper(password_helper))
+
+    assert await user_manager.authenticate(_credentials("king.arthur@camelot.bt", "guinevere")) is user
+    assert await user_manager.authenticate(_credentials("king.arthur@camelot.bt", "morgana")) is None
+    assert await user_manager.authenticate(_credentials("lancelot@camelot.bt", "guinevere")) is None
+
+    lancelot = await user_manager.create(schemas.BaseUserCreate(email="lancelot@camelot.bt", password="guinevere"))
+    result = await user_manager.create_many([schemas.BaseUserCreate(email="percival@camelot.bt", password="grail")])
+    assert result.created == 1
+    percival = await user_db.get_by_email("percival@camelot.bt")
+    assert percival is not None
+    assert password_helper.verify_and_update("guinevere", lancelot.hashed_password) == (True, None)
+    assert password_helper.verify_and_update("grail", percival.hashed_password) == (True, None)
+
+
+@pytest.mark.anyio
+async def test_authenticate_upgrades_hash(
+    user_manager: UserManager, user_db: UserDatabaseMock, password_helper: PasswordHelper
+) -> None:
+    user = await user_db.create({"email": "merlin@camelot.bt", "hashed_password": BcryptHasher().hash("excalibur")})
+
+    assert await user_manager.authenticate(_credentials("merlin@camelot.bt", "excalibur")) is user
+    assert user.hashed_password.startswith("$argon2")
+
+
+@pytest.mark.anyio
+async def test_authenticate_defers_hash_upgrade(
+    user_manager: UserManager, user_db: UserDatabaseMock, password_helper: PasswordHelper
+) -> None:
+    """Upgraded hashes are written in the background, unless the password changed meanwhile."""
+
+    @asynccontextmanager
+    async def get_user_db() -> AsyncIterator[UserDatabaseMock]:
+        yield user_db
+
+    upgrader = PasswordHashUpgrader(get_user_db, flush_interval_seconds=60)
+    user_manager.password_hash_upgrader = upgrader
+    merlin = await user_db.create({"email": "merlin@camelot.bt", "hashed_password": BcryptHasher().hash("excalibur")})
+    morgana = await user_db.create({"email": "morgana@camelot.bt", "hashed_password": BcryptHasher().hash("avalon")})
+
+    assert await user_manager.authenticate(_credentials("merlin@camelot.bt", "excalibur")) is merlin
+    assert await user_manager.authenticate(_credentials("morgana@camelot.bt", "avalon")) is morgana
+    assert merlin.hashed_password.startswith("$2b$")
+    assert len(upgrader) == 2
+
+    # Morgana changes her password before the batch is written
+    morgana.hashed_password = password_helper.hash("mordred")
+    await upgrader.stop()
+
+    assert merlin.hashed_password.startswith("$argon2")
+    assert password_helper.verify_and_update("mordred", morgana.hashed_password) == (True, None)
+    assert upgrader.stats() == {"pending": 0, "upgraded": 1, "dropped": 0, "failed": 0}
+
+
+@pytest.mark.anyio
+async def test_password_hash_upgrader_batches(user_db: UserDatabaseMock) -> None:
+    calls: list[int] = []
+
+    class BatchRecordingUserDatabase(UserDatabaseMock):
+        async def update_password_hashes(self, updates: Sequence[tuple[uuid.UUID, str, str]]) -> int:
+            calls.append(len(updates))
+            return await user_db.update_password_hashes(updates)
+
+    @asynccontextmanager
+    async def get_user_db() -> AsyncIterator[UserDatabaseMock]:
+        yield BatchRecordingUserDatabase()
+
+    upgrader = PasswordHashUpgrader(get_user_db, batch_size=2, flush_interval_seconds=60, max_pending=2)
+    users = [await user_db.create({"email": f"knight{i}@camelot.bt", "hashed_password": "OLD"}) for i in range(4)]
+
+    assert [upgrader.enqueue(user.id, "OLD", "NEW") for user in users[:3]] == [True, True, False]
+    # The batch filled up, the worker writes it without waiting for the interval
+    await asyncio.sleep(0.01)
+    assert calls == [2]
+
+    assert upgrader.enqueue(users[3].id, "OLD", "NEW") is True
+    await upgrader.stop()
+    assert calls == [2, 1]
+    assert [user.hashed_password for user in users] == ["NEW", "NEW", "OLD", "NEW"]
+    assert upgrader.stats()["dropped"] == 1
+
+
+def test_password_hash_upgrader_event_loops(user_db: UserDatabaseMock) -> None:
+    """The worker restarts on a new event loop once the previous one is closed."""
+
+    @asynccontextmanager
+    async def get_user_db() -> AsyncIterator[UserDatabaseMock]:
+        yield user_db
+
+    upgrader = PasswordHashUpgrader(get_user_db, batch_size=2, flush_interval_seconds=60)
+    users = [
+        asyncio.run(user_db.create({"email": f"knight{i}@camelot.bt", "hashed_password": "OLD"})) for i in range(2)
+    ]
+
+    async def enqueue(user: User) -> None:
+        upgrader.start()
+        # The worker waits for upgrades on this event loop
+        await asyncio.sleep(0.01)
+        assert upgrader.enqueue(user.id, "OLD", "NEW") is True
+        await asyncio.sleep(0.01)
+
+    # The first worker is cancelled along with its event loop, before the batch is full
+    asyncio.run(enqueue(users[0]))
+    asyncio.run(enqueue(users[1]))
+    assert [user.hashed_password for user in users] == ["NEW", "NEW"]
+
+
+@pytest.mark.anyio
+async def test_create_many(user_db: UserDatabaseMock, password_helper: PasswordHelper, user: User) -> None:
+    class ValidatingUserManager(UserManager):
+        async def validate_password(self, password: str, user: Any) -> None:
+            if len(password) < 8:
+                raise exceptions.InvalidPasswordException(reason="Password too short")
+
+    user_manager = ValidatingUserManager(user_db, MagicMock(), AsyncMock(), password_helper)
+    user_creates = [
+        schemas.BaseUserCreate(email="lancelot@camelot.bt", password="guinevere", is_superuser=True),
+        schemas.BaseUserCreate(email="KING.ARTHUR@camelot.bt", password="excalibur"),
+        schemas.BaseUserCreate(email="percival@camelot.bt", password="grail"),
+        schemas.BaseUserCreate(email="Lancelot@camelot.bt", password="guinevere"),
+        schemas.BaseUserCreate(email="percival@camelot.bt", password="holy-grail"),
+    ]
+
+    result = await user_manager.create_many(user_creates, safe=True, chunk_size=2)
+
+    assert result.created == 2
+    assert isinstance(result.errors[1], exceptions.UserAlreadyExists)
+    assert isinstance(result.errors[2], exceptions.InvalidPasswordException)
+    assert isinstance(result.errors[3], exceptions.UserAlreadyExists)
+    assert set(result.errors) == {1, 2, 3}
+
+    lancelot = await user_db.get_by_email("lancelot@camelot.bt")
+    assert lancelot is not None
+    assert lancelot.is_superuser is False
+    assert password_helper.verify_and_update("guinevere", lancelot.hashed_password) == (True, None)
+    assert await user_db.get_by_email("percival@camelot.bt") is not None
+
+
+@pytest.mark.anyio
+async def test_create_many_insert_failure(user_db: UserDatabaseMock, password_helper: PasswordHelper) -> None:
+    """A repeated email is still created when the insert of its first occurrence fails."""
+    create_many = user_db.create_many
+    error = Exception("Deadlock detected")
+
+    async def create_many_failing_once(create_dicts: Sequence[dict[str, Any]]) -> list[Exception | None]:
+        user_db.create_many = create_many  # type: ignore[method-assign]
+        return [error] * len(create_dicts)
+
+    user_db.create_many = create_many_failing_once  # type: ignore[method-assign]
+    user_manager = UserManager(user_db, MagicMock(), AsyncMock(), password_helper)
+    user_creates = [
+        schemas.BaseUserCreate(email="gawain@camelot.bt", password="guinevere"),
+        schemas.BaseUserCreate(email="Gawain@camelot.bt", password="guinevere"),
+        schemas.BaseUserCreate(email="gawain@camelot.bt", password="guinevere"),
+    ]
+
+    result = await user_manager.create_many(user_creates, chunk_size=2)
+
+    assert result.created == 1
+    assert result.errors[0] is error
+    assert isinstance(result.errors[2], exceptions.UserAlreadyExists)
+    assert set(result.errors) == {0, 2}
+    user = await user_db.get_by_email("gawain@camelot.bt")
+    assert user is not None
+    assert user.email == "Gawain@camelot.bt"
@@ -1,8 +1,14 @@
 """Tests for password hashing, verification, and automatic bcrypt -> argon2 migration."""
 
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
 from pwdlib.hashers.bcrypt import BcryptHasher
 
-from filuta_fastapi_users.password import PasswordHelper
+from filuta_fastapi_users import exceptions
+from filuta_fastapi_users.password import HashingScheduler, PasswordHelper
 
 
 def test_password_helper_hash_uses_argon2(password_helper: PasswordHelper) -> None:
@@ -38,3 +44,114 @@ def test_password_helper_verify_and_update_no_update_for_argon2(password_helper:
 
     assert verified is True
     assert new_hash is None
+
+
+@pytest.mark.anyio
+async def test_password_helper_async(password_helper: PasswordHelper) -> None:
+    """Async hashing gives the same results as the synchronous methods."""
+    hashed = await password_helper.hash_async("async-pass")
+
+    assert hashed.startswith("$argon2")
+    assert await password_helper.verify_and_update_async("async-pass", hashed) == (True, None)
+    assert await password_helper.verify_and_update_async("wrong-pass", hashed) == (False, None)
+
+
+@pytest.mark.anyio
+async def test_password_helper_async_does_not_block_event_loop(password_helper: PasswordHelper) -> None:
+    """The event loop keeps running other tasks while a password is hashed."""
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    ticker = asyncio.ensure_future(tick())
+    await password_helper.hash_async("async-pass")
+    ticker.cancel()
+
+    assert ticks > 1
+
+
+@pytest.mark.anyio
+async def test_password_helper_hash_many_async() -> None:
+    password_helper = PasswordHelper(max_workers=2)
+    passwords = [f"bulk-pass-{i}" for i in range(5)]
+
+    hashed_passwords = await password_helper.hash_many_async(passwords)
+
+    assert len(hashed_passwords) == 5
+    for password, hashed_password in zip(passwords, hashed_passwords, strict=True):
+        assert password_helper.verify_and_update(password, hashed_password) == (True, None)
+    assert await password_helper.hash_many_async([]) == []
+
+
+def test_password_helper_shares_executors() -> None:
+    """Helpers with the same executor settings share the executor."""
+    assert PasswordHelper().executor is PasswordHelper().executor
+    assert PasswordHelper(max_workers=1).executor is not PasswordHelper(max_workers=2).executor
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    assert PasswordHelper(executor=executor).executor is executor
+    executor.shutdown()
+
+
+@pytest.mark.anyio
+async def test_password_helper_process_executor() -> None:
+    """Passwords can be hashed in a process pool."""
+    password_helper = PasswordHelper(executor="process", max_workers=1)
+    try:
+        hashed = await password_helper.hash_async("process-pass")
+        assert password_helper.verify_and_update("process-pass", hashed) == (True, None)
+    finally:
+        password_helper.executor.shutdown()
+        PasswordHelper._shared_executors.pop(("process", 1), None)
+
+
+@pytest.mark.anyio
+async def test_hashing_scheduler_caps_in_flight() -> None:
+    """Operations beyond the in-flight cap wait for a slot."""
+    scheduler = HashingScheduler(max_in_flight=1, max_queue_wait_seconds=5)
+    password_helper = PasswordHelper(scheduler=scheduler)
+
+    hashed = await asyncio.gather(*(password_helper.hash_async(f"pass-{i}") for i in range(3)))
+
+    assert len(hashed) == 3
+    assert scheduler.stats()["admitted"] == 3
+    assert scheduler.stats()["rejected"] == 0
+    assert scheduler.stats()["max_wait_seconds"] > 0
+    assert scheduler.in_flight == 0
+    assert scheduler.queue_depth == 0
+
+
+@pytest.mark.anyio
+async def test_hashing_scheduler_rejects_over_budget() -> None:
+    """Operations which can't get a slot within the queue budget are rejected."""
+    scheduler = HashingScheduler(max_in_flight=1, max_queue_wait_seconds=0.01, max_queue_depth=1)
+    executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+
+    running = asyncio.ensure_future(scheduler.run(executor, release.wait))
+    await asyncio.sleep(0)
+    assert scheduler.in_flight == 1
+
+    with pytest.raises(exceptions.PasswordHashingOverloaded) as excinfo:
+        await scheduler.run(executor, release.wait)
+    assert excinfo.value.retry_after == 1
+
+    waiting = asyncio.ensure_future(scheduler.run(executor, release.wait))
+    await asyncio.sleep(0)
+    assert scheduler.queue_depth == 1
+    with pytest.raises(exceptions.PasswordHashingOverloaded):
+        await scheduler.run(executor, release.wait)
+
+    with pytest.raises(exceptions.PasswordHashingOverloaded):
+        await waiting
+
+    release.set()
+    await running
+    executor.shutdown()
+
+    assert scheduler.stats()["rejected"] == 3
+    assert scheduler.stats()["queue_depth"] == 0
@@ -0,0 +1,99 @@
+import pytest
+
+from filuta_fastapi_users import password_calibration
+from filuta_fastapi_users.password import PasswordHelper
+from filuta_fastapi_users.password_calibration import (
+    Argon2Parameters,
+    benchmark_argon2,
+    calibrate_argon2,
+    get_default_candidates,
+    main,
+)
+
+CANDIDATES = [
+    Argon2Parameters(time_cost=time_cost, memory_cost=memory_cost, parallelism=1)
+    for memory_cost in (8, 16)
+    for time_cost in (1, 2)
+]
+
+
+def test_benchmark_argon2() -> None:
+    benchmark = benchmark_argon2(CANDIDATES[0], iterations=5, concurrency=2)
+
+    assert 0 < benchmark.hash_p50_ms <= benchmark.hash_p99_ms
+    assert 0 < benchmark.verify_p50_ms <= benchmark.verify_p99_ms
+    assert benchmark.p99_ms == max(benchmark.hash_p99_ms, benchmark.verify_p99_ms)
+    assert benchmark.throughput > 0
+
+
+def test_calibrate_argon2_selects_strongest() -> None:
+    selected, benchmarks = calibrate_argon2(float("inf"), CANDIDATES, iterations=2)
+
+    assert len(benchmarks) == len(CANDIDATES)
+    assert selected is not None
+    assert selected.parameters == Argon2Parameters(time_cost=2, memory_cost=16, parallelism=1)
+
+
+def test_calibrate_argon2_skips_dominated_candidates() -> None:
+    selected, benchmarks = calibrate_argon2(0, CANDIDATES, iterations=2)
+
+    assert selected is None
+    # Every other candidate costs at least as much as the cheapest one
+    assert [benchmark.parameters for benchmark in benchmarks] == [CANDIDATES[0]]
+
+
+def test_calibrate_argon2_prefers_fewer_lanes() -> None:
+    candidates = [Argon2Parameters(time_cost=1, memory_cost=16, parallelism=parallelism) for parallelism in (2, 1)]
+    selected, benchmarks = calibrate_argon2(float("inf"), candidates, iterations=2)
+
+    assert len(benchmarks) == 2
+    assert selected is not None
+    assert selected.parameters.parallelism == 1
+
+
+def test_get_default_candidates(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(password_calibration, "DEFAULT_MEMORY_COSTS", (8, 32))
+    monkeypatch.setattr(password_calibration, "DEFAULT_TIME_COSTS", (1,))
+
+    monkeypatch.setattr(password_calibration.os, "cpu_count", lambda: 2)
+    assert get_default_candidates() == [
+        Argon2Parameters(time_cost=1, memory_cost=8, parallelism=1),
+        Argon2Parameters(time_cost=1, memory_cost=32, parallelism=1),
+        Argon2Parameters(time_cost=1, memory_cost=32, parallelism=2),
+    ]
+
+    monkeypatch.setattr(password_calibration.os, "cpu_count", lambda: 16)
+    assert {parameters.parallelism for parameters in get_default_candidates()} == {1, 2, 4}
+    assert {parameters.parallelism for parameters in get_default_candidates([3])} == {3}
+
+
+def test_calibrated_parameters_upgrade_existing_hashes(password_helper: PasswordHelper) -> None:
+    """Hashes made with other parameters are upgraded on the next verification."""
+    hashed_password = password_helper.hash("calibrated-pass")
+    calibrated_helper = PasswordHelper(CANDIDATES[0].get_password_hash())
+
+    verified, updated_hash = calibrated_helper.verify_and_update("calibrated-pass", hashed_password)
+
+    assert verified is True
+    assert updated_hash is not None
+    assert "m=8,t=1,p=1" in updated_hash
+    assert calibrated_helper.verify_and_update("calibrated-pass", updated_hash) == (True, None)
+
+
+def test_main(capsys: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(password_calibration, "DEFAULT_MEMORY_COSTS", (8, 16))
+    monkeypatch.setattr(password_calibration, "DEFAULT_TIME_COSTS", (1, 2))
+
+    assert main(["--target-p99-ms", "100000", "--iterations", "1", "--parallelism", "1"]) == 0
+    output = capsys.readouterr().out
+    assert output.strip().endswith(
+        "PasswordHash((Argon2Hasher(time_cost=2, memory_cost=16, parallelism=1), BcryptHasher()))"
+    )
+
+    assert main(["--target-p99-ms", "100000", "--iterations", "1", "--parallelism", "1", "2"]) == 0
+    output = capsys.readouterr().out
+    assert "parallelism=1" in output.strip().splitlines()[-1]
+    assert " 16     2 " in output
+
+    assert main(["--target-p99-ms", "0", "--iterations", "1", "--parallelism", "1"]) == 1
+    assert "No parameters meet a p99 of 0 ms" in capsys.readouterr().out
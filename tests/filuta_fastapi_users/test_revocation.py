@@ -0,0 +1,143 @@
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import pytest
+
+from filuta_fastapi_users.authentication.strategy import revocation as revocation_module
+from filuta_fastapi_users.authentication.strategy.revocation import BloomFilter, RevocationList
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(revocation_module.time, "time", clock)
+    return clock
+
+
+def _in(clock: Clock, seconds: float) -> datetime:
+    return datetime.fromtimestamp(clock.now + seconds, UTC)
+
+
+def test_bloom_filter() -> None:
+    bloom = BloomFilter(1000, 0.01)
+    keys = [f"token-{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+    assert 42 not in bloom
+
+
+def test_revoke_token(clock: Clock) -> None:
+    revocation_list = RevocationList()
+    revocation_list.revoke("JTI", _in(clock, 60))
+
+    assert revocation_list.is_revoked("JTI")
+    assert not revocation_list.is_revoked("OTHER")
+    assert not revocation_list.is_revoked(None)
+
+
+def test_revocations_are_pruned(clock: Clock) -> None:
+    revocation_list = RevocationList(prune_interval_seconds=10)
+    revocation_list.revoke("JTI", _in(clock, 5))
+    revocation_list.revoke("NEVER_EXPIRES", None)
+    assert len(revocation_list) == 2
+
+    clock.now += 10
+    assert not revocation_list.is_revoked("JTI")
+    assert revocation_list.is_revoked("NEVER_EXPIRES")
+    assert len(revocation_list) == 1
+
+
+def test_filter_grows_past_capacity(clock: Clock) -> None:
+    revocation_list = RevocationList(capacity=8)
+    for i in range(100):
+        revocation_list.revoke(f"JTI-{i}", _in(clock, 60))
+
+    assert all(revocation_list.is_revoked(f"JTI-{i}") for i in range(100))
+    assert not revocation_list.is_revoked("OTHER")
+
+
+def test_revoke_user(clock: Clock) -> None:
+    revocation_list = RevocationList(token_lifetime_seconds=60)
+    issued_before = _in(clock, -1)
+    revoked_at, expires_at = revocation_list.revoke_user("USER", _in(clock, 0))
+
+    assert expires_at == revoked_at + timedelta(seconds=60)
+    assert revocation_list.is_revoked("JTI", "USER", issued_before)
+    assert not revocation_list.is_revoked("JTI", "USER", _in(clock, 1))
+    assert not revocation_list.is_revoked("JTI", "OTHER_USER", issued_before)
+
+    clock.now += 61
+    revocation_list.prune()
+    assert not revocation_list.is_revoked("JTI", "USER", issued_before)
+
+
+class RevokedToken:
+    def __init__(
+        self, jti: str, user_id: Any, revoked_at: datetime, expires_at: datetime | None, all_user_tokens: bool
+    ):
+        self.jti = jti
+        self.user_id = user_id
+        self.revoked_at = revoked_at
+        self.expires_at = expires_at
+        self.all_user_tokens = all_user_tokens
+
+
+class RevokedTokenDatabaseMock:
+    def __init__(self) -> None:
+        self.revoked_tokens: list[RevokedToken] = []
+        self.since: list[datetime | None] = []
+
+    async def create(self, create_dict: dict[str, Any]) -> RevokedToken:
+        revoked_token = RevokedToken(**create_dict)
+        self.revoked_tokens.append(revoked_token)
+        return revoked_token
+
+    async def get_revoked_since(self, since: datetime | None = None) -> list[RevokedToken]:
+        self.since.append(since)
+        return [token for token in self.revoked_tokens if since is None or token.revoked_at >= since]
+
+    async def delete_expired(self) -> None:
+        pass  # pragma: no cover
+
+
+@pytest.mark.anyio
+async def test_sync(clock: Clock) -> None:
+    revoked_token_db = RevokedTokenDatabaseMock()
+    await revoked_token_db.create(
+        {
+            "jti": "JTI",
+            "user_id": "USER",
+            "revoked_at": _in(clock, 0),
+            "expires_at": _in(clock, 60),
+            "all_user_tokens": False,
+        }
+    )
+    await revoked_token_db.create(
+        {"jti": "X", "user_id": "USER_2", "revoked_at": _in(clock, 0), "expires_at": None, "all_user_tokens": True}
+    )
+
+    revocation_list = RevocationList(sync_interval_seconds=30)
+    assert revocation_list.needs_sync()
+    await revocation_list.sync(revoked_token_db)
+
+    assert not revocation_list.needs_sync()
+    assert revocation_list.is_revoked("JTI")
+    assert revocation_list.is_revoked(None, "USER_2", _in(clock, -1))
+
+    clock.now += 30
+    assert revocation_list.needs_sync()
+    await revocation_list.sync(revoked_token_db)
+    assert revoked_token_db.since[0] is None
+    assert revoked_token_db.since[1] is not None
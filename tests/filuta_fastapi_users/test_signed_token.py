@@ -0,0 +1,44 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from filuta_fastapi_users.authentication.strategy.db.signed_token import (
+    generate_signed_token,
+    is_signed_token,
+    read_signed_token,
+)
+
+SECRET = "SECRET"
+
+
+def test_generate_signed_token() -> None:
+    issued_at = datetime(2026, 1, 1, tzinfo=UTC)
+    token = generate_signed_token(SECRET, issued_at)
+
+    assert is_signed_token(token)
+    assert len(token) <= 43
+    assert read_signed_token(token, SECRET) == issued_at
+    assert read_signed_token(token, "OTHER_SECRET") is None
+
+
+def _tamper(token: str) -> str:
+    return token[:-1] + ("B" if token.endswith("A") else "A")
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        "plain-token",
+        "a.b.c",
+        "a..c",
+        "é.€.ü",
+        _tamper(generate_signed_token(SECRET)),
+    ],
+)
+def test_read_signed_token_invalid(token: str) -> None:
+    assert read_signed_token(token, SECRET) is None
+
+
+def test_signed_tokens_are_unique() -> None:
+    issued_at = datetime.now(UTC) - timedelta(seconds=10)
+    assert generate_signed_token(SECRET, issued_at) != generate_signed_token(SECRET, issued_at)
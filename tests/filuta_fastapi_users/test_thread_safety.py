@@ -0,0 +1,219 @@
+"""
+Stress tests of the state shared by event loops running in several threads.
+
+They pass with the GIL too, but only hit real races on the free-threaded build.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import uuid
+from collections.abc import Callable, Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any
+
+import pytest
+from fastapi import Request
+
+from filuta_fastapi_users.authentication import AuthenticationBackend, Authenticator, BearerTransport
+from filuta_fastapi_users.authentication.authenticator import (
+    get_user_checks,
+    name_to_strategy_variable_name,
+    name_to_variable_name,
+)
+from filuta_fastapi_users.authentication.strategy.db.cache import AccessTokenCache, CachedAccessToken
+from filuta_fastapi_users.authentication.strategy.revocation import RevocationList
+from filuta_fastapi_users.password import HashingScheduler, PasswordHelper
+from filuta_fastapi_users.password_upgrade import PasswordHashUpgrader
+
+THREADS = 8
+
+
+def _run_in_threads[T](function: Callable[[int], T], threads: int = THREADS) -> list[T]:
+    barrier = threading.Barrier(threads)
+
+    def run(i: int) -> T:
+        barrier.wait()
+        return function(i)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(run, range(threads)))
+
+
+def _run_event_loops[T](function: Callable[[int], Coroutine[Any, Any, T]], threads: int = THREADS) -> list[T]:
+    """Run a coroutine on its own event loop in each thread."""
+    return _run_in_threads(lambda i: asyncio.run(function(i)), threads)
+
+
+def _cached_token(token: str, user_id: int) -> CachedAccessToken:
+    return CachedAccessToken(token=token, user_id=user_id, created_at=None, scopes="none", mfa_scopes={})  # type: ignore[arg-type]
+
+
+def test_access_token_cache() -> None:
+    cache = AccessTokenCache(maxsize=500)
+
+    def hammer(i: int) -> None:
+        for j in range(2_000):
+            token = f"TOKEN-{i}-{j}"
+            cache.set(token, _cached_token(token, j % 20))
+            cache.get(f"TOKEN-{(i + 1) % THREADS}-{j}")
+            if j % 50 == 0:
+                cache.invalidate_user(j % 20)
+
+    _run_in_threads(hammer)
+
+    # The user index matches the entries exactly
+    indexed_tokens = {token for tokens in cache._tokens_by_user.values() for token in tokens}
+    assert indexed_tokens == set(cache._entries)
+    assert len(cache) <= cache.maxsize
+    stats = cache.stats()
+    assert stats["hits"] + stats["misses"] == THREADS * 2_000
+
+
+def test_revocation_list() -> None:
+    revocation_list = RevocationList(capacity=1_000)
+
+    def revoke(i: int) -> None:
+        for j in range(1_000):
+            revocation_list.revoke(f"JTI-{i}-{j}", None)
+            revocation_list.revoke_user(f"USER-{j % 10}")
+            assert revocation_list.is_revoked(f"JTI-{i}-{j}")
+
+    _run_in_threads(revoke)
+
+    # No revocation is lost, even though the filter was rebuilt while other threads added to it
+    assert all(revocation_list.is_revoked(f"JTI-{i}-{j}") for i in range(THREADS) for j in range(1_000))
+    assert len(revocation_list) == THREADS * 1_000 + 10
+
+
+def test_shared_executors_are_created_once() -> None:
+    executors = _run_in_threads(lambda _: PasswordHelper(max_workers=7).executor)
+
+    try:
+        assert all(executor is executors[0] for executor in executors)
+    finally:
+        PasswordHelper._shared_executors.pop(("thread", 7)).shutdown()
+
+
+def test_hashing_scheduler_across_event_loops() -> None:
+    scheduler = HashingScheduler(max_in_flight=2, max_queue_wait_seconds=30)
+    executor = ThreadPoolExecutor(max_workers=THREADS)
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+
+    def work() -> None:
+        nonlocal running, max_running
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        time.sleep(0.001)
+        with lock:
+            running -= 1
+
+    async def hash_many(_: int) -> None:
+        await asyncio.gather(*(scheduler.run(executor, work) for _ in range(20)))
+
+    _run_event_loops(hash_many)
+    executor.shutdown()
+
+    assert max_running <= 2
+    assert scheduler.stats()["admitted"] == THREADS * 20
+    assert scheduler.stats()["in_flight"] == 0
+    assert scheduler.stats()["queue_depth"] == 0
+
+
+@pytest.mark.anyio
+async def test_password_hash_upgrader_across_event_loops() -> None:
+    updates: list[tuple[Any, str, str]] = []
+
+    class UserDatabase:
+        async def update_password_hashes(self, batch: list[tuple[Any, str, str]]) -> int:
+            updates.extend(batch)
+            return len(batch)
+
+    @asynccontextmanager
+    async def get_user_db() -> Any:
+        yield UserDatabase()
+
+    upgrader = PasswordHashUpgrader(get_user_db, batch_size=50, flush_interval_seconds=0.01)
+    upgrader.start()
+
+    async def enqueue(i: int) -> None:
+        for j in range(100):
+            upgrader.enqueue((i, j), "OLD", "NEW")
+
+    await asyncio.to_thread(_run_event_loops, enqueue)
+    for _ in range(100):
+        if len(updates) == THREADS * 100:
+            break
+        await asyncio.sleep(0.01)
+    await upgrader.stop()
+
+    assert len(updates) == THREADS * 100
+    assert len({user_id for user_id, _, _ in updates}) == THREADS * 100
+
+
+def test_dependencies_are_memoized_across_threads() -> None:
+    transport: BearerTransport[Any] = BearerTransport(tokenUrl="auth/login")
+    backend: AuthenticationBackend[Any, Any, Any] = AuthenticationBackend(
+        name="bearer", transport=transport, get_strategy=lambda: None
+    )
+    authenticator: Authenticator[Any, Any, Any] = Authenticator([backend], lambda: None)
+
+    dependencies = _run_in_threads(lambda _: authenticator.current_user(active=True))
+
+    assert all(dependency is dependencies[0] for dependency in dependencies)
+
+
+class User:
+    id = uuid.uuid4()
+    is_active = True
+    is_verified = True
+    is_superuser = False
+    is_poweruser = False
+
+
+class AccessToken:
+    scopes = "approved"
+
+
+class Strategy:
+    async def read_token_record(self, token: str | None, user_manager: Any, ignore_expired: bool) -> Any:
+        return User(), AccessToken()
+
+
+def _authenticate_in_threads(authenticator: Authenticator[Any, Any, Any], threads: int, iterations: int) -> float:
+    kwargs = {name_to_variable_name("bearer"): "TOKEN", name_to_strategy_variable_name("bearer"): Strategy()}
+    user_checks = get_user_checks(active=True, verified=False, superuser=False, poweruser=False)
+
+    async def authenticate(_: int) -> None:
+        for _ in range(iterations):
+            user, _ = await authenticator._authenticate(
+                request=Request({"type": "http"}), user_manager=None, user_checks=user_checks, **kwargs
+            )
+            assert isinstance(user, User)
+
+    start = time.perf_counter()
+    _run_event_loops(authenticate, threads)
+    return threads * iterations / (time.perf_counter() - start)
+
+
+@pytest.mark.skipif(
+    getattr(sys, "_is_gil_enabled", lambda: True)() or (os.cpu_count() or 1) < 4,
+    reason="Scaling requires the free-threaded build and at least 4 CPUs",
+)
+def test_authentication_scales_across_threads() -> None:
+    transport: BearerTransport[Any] = BearerTransport(tokenUrl="auth/login")
+    backend: AuthenticationBackend[Any, Any, Any] = AuthenticationBackend(
+        name="bearer", transport=transport, get_strategy=Strategy
+    )
+    authenticator: Authenticator[Any, Any, Any] = Authenticator([backend], lambda: None)
+
+    single_thread = _authenticate_in_threads(authenticator, 1, 20_000)
+    four_threads = _authenticate_in_threads(authenticator, 4, 20_000)
+
+    assert four_threads > 2 * single_thread
@@ -0,0 +1,45 @@
+import secrets
+
+import pytest
+
+from filuta_fastapi_users.authentication.strategy.db.signed_token import generate_signed_token, read_signed_token
+from filuta_fastapi_users.authentication.strategy.token_tag import (
+    get_token_tag,
+    tag_token,
+    untag_token,
+    validate_token_tag,
+)
+
+
+def test_tag_token() -> None:
+    token = tag_token("TOKEN", "db")
+
+    assert token == "db~TOKEN"
+    assert get_token_tag(token) == "db"
+    assert untag_token(token) == "TOKEN"
+
+
+@pytest.mark.parametrize("token", [secrets.token_urlsafe(), "eyJhbGciOiJIUzI1NiJ9.e30.sig", "~TOKEN", "toolong~TOKEN"])
+def test_untagged_tokens(token: str) -> None:
+    assert get_token_tag(token) is None
+    assert untag_token(token) == token
+
+
+@pytest.mark.parametrize("tag", ["", "abcde", "a~", "a.b", "é"])
+def test_validate_token_tag_invalid(tag: str) -> None:
+    with pytest.raises(ValueError):
+        validate_token_tag(tag)
+
+
+def test_validate_token_tag() -> None:
+    assert validate_token_tag(None) is None
+    assert validate_token_tag("ab-_") == "ab-_"
+
+
+def test_tagged_signed_token() -> None:
+    token = generate_signed_token("SECRET", tag="abcd")
+
+    assert len(token) <= 43
+    assert get_token_tag(token) == "abcd"
+    assert read_signed_token(token, "SECRET") is not None
+    assert read_signed_token(tag_token(untag_token(token), "efgh"), "SECRET") is None
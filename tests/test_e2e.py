@@ -1,12 +1,15 @@
 """E2E test for main user lifecycle and native OTP flow."""
 
+import asyncio
+import uuid
 from typing import Any
 from unittest.mock import AsyncMock, MagicMock
 
 from fastapi import FastAPI
+from fastapi.testclient import TestClient
 
-from filuta_fastapi_users import FastAPIUsers, schemas
-from filuta_fastapi_users.authentication import AuthenticationBackend
+from filuta_fastapi_users import FastAPIUsers, exceptions, schemas
+from filuta_fastapi_users.authentication import AuthenticationBackend, JWTStrategy
 from filuta_fastapi_users.authentication.transport.bearer import BearerTransport
 
 
@@ -59,3 +62,128 @@ def test_user_registration_login_otp_flow() -> None:
     assert any("/auth/login" in str(p) for p in routes)
     assert any("/auth/otp/send-token" in str(p) for p in routes)
     assert any("/auth/otp/validate-token" in str(p) for p in routes)
+
+
+def test_login_overloaded() -> None:
+    """The login route fails fast when password hashing is over budget."""
+    mock_user_manager = MagicMock()
+    mock_user_manager.authenticate = AsyncMock(side_effect=exceptions.PasswordHashingOverloaded(2))
+
+    def get_user_manager() -> Any:
+        return mock_user_manager
+
+    def get_refresh_token_manager() -> Any:
+        return MagicMock()
+
+    def get_strategy() -> Any:
+        return MagicMock()
+
+    transport: BearerTransport[Any] = BearerTransport(tokenUrl="auth/login")
+    backend = AuthenticationBackend(name="jwt", transport=transport, get_strategy=get_strategy)
+    fastapi_users = FastAPIUsers(
+        get_user_manager=get_user_manager,
+        auth_backends=[backend],
+        get_refresh_token_manager=get_refresh_token_manager,
+        get_otp_manager=MagicMock(),
+    )
+
+    app = FastAPI()
+    app.include_router(fastapi_users.get_auth_router(backend), prefix="/auth")
+    response = TestClient(app).post("/auth/login", json={"username": "king.arthur@camelot.bt", "password": "guinevere"})
+
+    assert response.status_code == 503
+    assert response.json() == {"detail": "LOGIN_OVERLOADED"}
+    assert response.headers["Retry-After"] == "2"
+
+
+def test_register_and_reset_password_overloaded() -> None:
+    """The routes hashing passwords fail fast as well when hashing is over budget."""
+    mock_user_manager = MagicMock()
+    mock_user_manager.create = AsyncMock(side_effect=exceptions.PasswordHashingOverloaded(3))
+    mock_user_manager.reset_password = AsyncMock(side_effect=exceptions.PasswordHashingOverloaded(3))
+
+    def get_user_manager() -> Any:
+        return mock_user_manager
+
+    transport: BearerTransport[Any] = BearerTransport(tokenUrl="auth/login")
+    backend = AuthenticationBackend(name="jwt", transport=transport, get_strategy=MagicMock())
+    fastapi_users = FastAPIUsers(
+        get_user_manager=get_user_manager,
+        auth_backends=[backend],
+        get_refresh_token_manager=MagicMock(),
+        get_otp_manager=MagicMock(),
+    )
+
+    app = FastAPI()
+    app.include_router(
+        fastapi_users.get_register_router(schemas.BaseUser, schemas.BaseUserCreate),
+        prefix="/auth",
+    )
+    app.include_router(fastapi_users.get_reset_password_router(), prefix="/auth")
+    client = TestClient(app)
+
+    response = client.post("/auth/register", json={"email": "king.arthur@camelot.bt", "password": "guinevere"})
+    assert response.status_code == 503
+    assert response.json() == {"detail": "PASSWORD_HASHING_OVERLOADED"}
+    assert response.headers["Retry-After"] == "3"
+
+    response = client.post("/auth/reset-password", json={"token": "foo", "password": "guinevere"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+
+    assert "503" in app.openapi()["paths"]["/auth/register"]["post"]["responses"]
+
+
+def test_renew_access_token_jwt() -> None:
+    """A JWT backend renews the access token presented along with the refresh token."""
+    user = MagicMock(id=uuid.uuid4(), is_active=True)
+    other_user = MagicMock(id=uuid.uuid4())
+    mock_user_manager = MagicMock()
+    mock_user_manager.get = AsyncMock(return_value=user)
+    mock_refresh_token_manager = MagicMock()
+    mock_refresh_token_manager.find_refresh_token = AsyncMock(return_value=MagicMock(user_id=user.id))
+    strategy: JWTStrategy[Any, Any] = JWTStrategy("SECRET" * 8, 3600)
+
+    def get_user_manager() -> Any:
+        return mock_user_manager
+
+    def get_refresh_token_manager() -> Any:
+        return mock_refresh_token_manager
+
+    def get_strategy() -> Any:
+        return strategy
+
+    transport: BearerTransport[Any] = BearerTransport(tokenUrl="auth/login")
+    backend = AuthenticationBackend(name="jwt", transport=transport, get_strategy=get_strategy)
+    fastapi_users = FastAPIUsers(
+        get_user_manager=get_user_manager,
+        auth_backends=[backend],
+        get_refresh_token_manager=get_refresh_token_manager,
+        get_otp_manager=MagicMock(),
+    )
+
+    app = FastAPI()
+    app.include_router(fastapi_users.get_auth_router(backend), prefix="/auth")
+    client = TestClient(app)
+
+    access_token = asyncio.run(strategy.write_token(user))
+    response = client.post(
+        "/auth/renew-access-token", json={"refresh_token": "REFRESH", "access_token": access_token.token}
+    )
+    assert response.status_code == 200
+    renewed = asyncio.run(strategy.get_token_record(response.json()["access_token"]))
+    assert renewed is not None
+    assert renewed.user_id == str(user.id)
+    assert renewed.token != access_token.token
+
+    # Without the access token, there's nothing to renew
+    response = client.post("/auth/renew-access-token", json={"refresh_token": "REFRESH"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "RENEW_WRONG_ACCESS_TOKEN"}
+
+    # The access token must belong to the owner of the refresh token
+    other_access_token = asyncio.run(strategy.write_token(other_user))
+    response = client.post(
+        "/auth/renew-access-token", json={"refresh_token": "REFRESH", "access_token": other_access_token.token}
+    )
+    assert response.status_code == 400